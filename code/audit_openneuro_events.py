@@ -8,7 +8,11 @@ import csv
 import hashlib
 import json
 import os
-from collections.abc import Sequence
+import re
+from collections.abc import Iterable, Sequence
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from functools import partial
 from pathlib import Path
 
 from convert_behavior import (
@@ -25,10 +29,48 @@ from convert_behavior import (
 from pipeline_utils import read_subject_list
 
 
+REFERENCE_EVENTS_RE = re.compile(
+    r"^sub-(?P<subject>[^_]+)(?:_ses-(?P<session>[^_]+))?_task-(?P<task>[^_]+)"
+    r"_run-(?P<run>[12])_events\.tsv$"
+)
+ReferenceRun = tuple[str, Path, int, list[tuple[str, ...]]]
+ReferenceKey = tuple[str, str, str, int]
+
+
 class ReferenceDataError(ConversionError):
     """Raised when the frozen public reference cannot be interpreted."""
 
 
+@dataclass
+class ReferenceIndex:
+    """Hashed OpenNeuro reference runs keyed by (subject, session, task, run)."""
+
+    found: dict[ReferenceKey, ReferenceRun] = field(default_factory=dict)
+    errors: dict[ReferenceKey, str] = field(default_factory=dict)
+
+    def fingerprints(
+        self, subject: str, session: str, task: str
+    ) -> tuple[dict[int, ReferenceRun], dict[int, str]]:
+        found = {
+            run: self.found[(subject, session, task, run)]
+            for run in (1, 2)
+            if (subject, session, task, run) in self.found
+        }
+        errors = {
+            run: self.errors[(subject, session, task, run)]
+            for run in (1, 2)
+            if (subject, session, task, run) in self.errors
+        }
+        return found, errors
+
+    def subset(self, subject: str, session: str, task: str) -> ReferenceIndex:
+        wanted = {(subject, session, task, run) for run in (1, 2)}
+        return ReferenceIndex(
+            {key: value for key, value in self.found.items() if key in wanted},
+            {key: value for key, value in self.errors.items() if key in wanted},
+        )
+
+
 def _read_events(path: Path) -> list[dict[str, str]]:
     with path.open("r", encoding="utf-8-sig", errors="replace", newline="") as handle:
         reader = csv.DictReader(handle, delimiter="\t")
@@ -185,61 +227,196 @@ def _reference_path(root: Path, key: RunKey) -> Path | None:
     return next((path for path in candidates if path.is_file()), None)
 
 
+def _load_reference_run(task: str, path: Path) -> ReferenceRun | str:
+    """Return the hashed reference records, or an error message for the report."""
+    try:
+        records = _reference_records(task, _read_events(path))
+    except (ReferenceDataError, OSError, csv.Error) as exc:
+        return str(exc)
+    if not records:
+        return "reference events have no usable trial-identity records"
+    return (_hash_records(records), path, len(records), records)
+
+
 def _reference_fingerprints(
     root: Path, subject: str, session: str, task: str
-) -> tuple[dict[int, tuple[str, Path, int, list[tuple[str, ...]]]], dict[int, str]]:
-    found: dict[int, tuple[str, Path, int, list[tuple[str, ...]]]] = {}
+) -> tuple[dict[int, ReferenceRun], dict[int, str]]:
+    found: dict[int, ReferenceRun] = {}
     errors: dict[int, str] = {}
     for run in (1, 2):
         key = RunKey(subject, session, task, run)
         path = _reference_path(root, key)
         if path is None:
             continue
-        try:
-            records = _reference_records(task, _read_events(path))
-        except (ReferenceDataError, OSError, csv.Error) as exc:
-            errors[run] = str(exc)
-            continue
-        if records:
-            found[run] = (_hash_records(records), path, len(records), records)
+        loaded = _load_reference_run(task, path)
+        if isinstance(loaded, str):
+            errors[run] = loaded
         else:
-            errors[run] = "reference events have no usable trial-identity records"
+            found[run] = loaded
     return found, errors
 
 
-def _records_match(
-    private: list[tuple[str, ...]], reference: list[tuple[str, ...]]
-) -> bool:
-    if len(private) != len(reference):
-        return False
-    return all(_record_matches(left, right) for left, right in zip(private, reference))
+def _reference_events_paths(
+    root: Path, subjects: Iterable[str] | None, tasks: Sequence[str]
+) -> dict[ReferenceKey, Path]:
+    """Resolve every reference run once, with the same precedence as _reference_path."""
+    subject_dirs = (
+        [root / f"sub-{subject}" for subject in subjects]
+        if subjects is not None
+        else sorted(root.glob("sub-*"))
+    )
+    paths: dict[ReferenceKey, Path] = {}
+    sessionless: dict[ReferenceKey, Path] = {}
+    for subject_dir in subject_dirs:
+        subject = subject_dir.name.removeprefix("sub-")
+        func_dirs = [(None, subject_dir / "func")]
+        func_dirs.extend(
+            (session_dir.name.removeprefix("ses-"), session_dir / "func")
+            for session_dir in sorted(subject_dir.glob("ses-*"))
+        )
+        for session, func in func_dirs:
+            for path in sorted(func.glob("*_events.tsv")):
+                match = REFERENCE_EVENTS_RE.match(path.name)
+                if (
+                    not match
+                    or match.group("subject") != subject
+                    or match.group("session") != session
+                    or match.group("task") not in tasks
+                    or not path.is_file()
+                ):
+                    continue
+                key = (subject, session or "01", match.group("task"), int(match.group("run")))
+                (paths if session else sessionless)[key] = path
+    for key, path in sessionless.items():
+        paths.setdefault(key, path)
+    return paths
+
+
+def _load_reference_item(item: tuple[str, Path]) -> ReferenceRun | str:
+    return _load_reference_run(*item)
+
+
+def build_reference_index(
+    root: Path,
+    subjects: Iterable[str] | None = None,
+    tasks: Sequence[str] = TASKS,
+    jobs: int = 1,
+) -> ReferenceIndex:
+    """Read and hash each reference run once, optionally in a process pool."""
+    paths = _reference_events_paths(root, subjects, tasks)
+    items = [(key[2], path) for key, path in paths.items()]
+    if jobs == 1 or len(items) < 2:
+        loaded = list(map(_load_reference_item, items))
+    else:
+        with ProcessPoolExecutor(max_workers=min(jobs, len(items))) as pool:
+            loaded = list(pool.map(_load_reference_item, items, chunksize=16))
+    index = ReferenceIndex()
+    for key, value in zip(paths, loaded):
+        if isinstance(value, str):
+            index.errors[key] = value
+        else:
+            index.found[key] = value
+    return index
+
+
+class PrivateRecordIndex:
+    """Bitset index over one private run's ordered trial-identity records.
+
+    Each record field is interned to an integer ID, and every (column, ID) pair
+    holds a bitmask of the private positions carrying it. Private ``n/a``
+    fields are wildcards and are kept as one mask per column. The private
+    positions that match a reference record are then a handful of integer
+    ANDs, so equality, subsequence, and repeat checks are linear in the
+    reference length.
+    """
+
+    def __init__(self, records: Sequence[tuple[str, ...]]):
+        self.records = list(records)
+        self.width = len(self.records[0]) if self.records else 0
+        self._ids: dict[str, int] = {}
+        self._masks: list[dict[int, int]] = [{} for _ in range(self.width)]
+        self._wildcards = [0] * self.width
+        self._all = 0
+        for position, record in enumerate(self.records):
+            bit = 1 << position
+            if len(record) != self.width:
+                continue
+            self._all |= bit
+            for column, value in enumerate(record):
+                if value == "n/a":
+                    self._wildcards[column] |= bit
+                    continue
+                value_id = self._ids.setdefault(value, len(self._ids))
+                masks = self._masks[column]
+                masks[value_id] = masks.get(value_id, 0) | bit
+        self._matches: dict[tuple[str, ...], int] = {}
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def matches(self, reference_record: tuple[str, ...]) -> int:
+        """Return a bitmask of private positions matching one reference record."""
+        cached = self._matches.get(reference_record)
+        if cached is not None:
+            return cached
+        positions = self._all if len(reference_record) == self.width else 0
+        for column, value in enumerate(reference_record):
+            if not positions:
+                break
+            value_id = self._ids.get(value)
+            mask = self._masks[column].get(value_id, 0) if value_id is not None else 0
+            positions &= mask | self._wildcards[column]
+        self._matches[reference_record] = positions
+        return positions
+
+    def mismatches(self, reference: Sequence[tuple[str, ...]], offset: int = 0) -> list[int]:
+        """Return zero-based positions where aligned records disagree."""
+        length = min(len(self.records), len(reference) - offset)
+        return [
+            position
+            for position in range(length)
+            if not (self.matches(reference[offset + position]) >> position) & 1
+        ]
 
+    def equals(self, reference: Sequence[tuple[str, ...]]) -> bool:
+        return len(reference) == len(self.records) and not self.mismatches(reference)
+
+    def subsequence(self, reference: Sequence[tuple[str, ...]]) -> list[int] | None:
+        """Return the earliest private positions holding ``reference`` in order."""
+        if not reference:
+            return None
+        aligned: list[int] = []
+        position = 0
+        for reference_record in reference:
+            remaining = self.matches(reference_record) >> position
+            if not remaining:
+                return None
+            position += (remaining & -remaining).bit_length() - 1
+            aligned.append(position)
+            position += 1
+        return aligned
 
-def _record_matches(private: tuple[str, ...], reference: tuple[str, ...]) -> bool:
-    return len(private) == len(reference) and all(
-        a == b or a == "n/a" for a, b in zip(private, reference)
-    )
+    def repeats(self, reference: Sequence[tuple[str, ...]]) -> int:
+        """Return how many whole copies of the private run ``reference`` holds."""
+        length = len(self.records)
+        if not length or len(reference) <= length or len(reference) % length:
+            return 0
+        if any(self.mismatches(reference, start) for start in range(0, len(reference), length)):
+            return 0
+        return len(reference) // length
 
 
-def _is_reference_subsequence(
-    private: list[tuple[str, ...]], reference: list[tuple[str, ...]]
-) -> bool:
-    position = 0
-    for reference_record in reference:
-        while position < len(private) and not _record_matches(
-            private[position], reference_record
-        ):
-            position += 1
-        if position == len(private):
-            return False
-        position += 1
-    return bool(reference)
+def _trial_list(positions: Iterable[int], limit: int = 5) -> str:
+    numbers = [str(position + 1) for position in positions]
+    suffix = f", ... ({len(numbers)} total)" if len(numbers) > limit else ""
+    return ", ".join(numbers[:limit]) + suffix
 
 
 def audit_key(
     key: RunKey,
     behavior_root: Path,
     openneuro_root: Path,
+    reference_index: ReferenceIndex | None = None,
 ) -> dict[str, str]:
     resolution = resolve_sources(
         behavior_root, key.subject, key.session, key.task, [key.run]
@@ -278,9 +455,14 @@ def audit_key(
         result["detail"] = str(exc)
         return result
     try:
-        references, reference_errors = _reference_fingerprints(
-            openneuro_root, key.subject, key.session, key.task
-        )
+        if reference_index is None:
+            references, reference_errors = _reference_fingerprints(
+                openneuro_root, key.subject, key.session, key.task
+            )
+        else:
+            references, reference_errors = reference_index.fingerprints(
+                key.subject, key.session, key.task
+            )
     except (ReferenceDataError, OSError, csv.Error) as exc:
         result["status"] = "reference_invalid"
         result["detail"] = str(exc)
@@ -296,10 +478,9 @@ def audit_key(
         return result
     result["reference"] = str(same[1])
     result["reference_fingerprint"] = same[0]
+    source_index = PrivateRecordIndex(source_records)
     matching_runs = sorted(
-        run
-        for run, value in references.items()
-        if _records_match(source_records, value[3])
+        run for run, value in references.items() if source_index.equals(value[3])
     )
     if key.run in matching_runs and len(matching_runs) == 1:
         if ambiguous_lone_run:
@@ -315,34 +496,38 @@ def audit_key(
     elif matching_runs:
         result["status"] = "run_swap_risk"
         result["detail"] = f"private source matches OpenNeuro run(s) {matching_runs}"
-    elif len(same[3]) < len(source_records) and _is_reference_subsequence(
-        source_records, same[3]
-    ):
+    elif len(same[3]) < len(source_records) and (
+        aligned := source_index.subsequence(same[3])
+    ) is not None:
+        retained = set(aligned)
         result["status"] = "partial_reference_match"
         result["detail"] = (
-            f"OpenNeuro retains {same[2]}/{len(source_records)} ordered trial(s)"
-        )
-    elif (
-        len(same[3]) > len(source_records)
-        and len(same[3]) % len(source_records) == 0
-        and all(
-            _records_match(source_records, same[3][start : start + len(source_records)])
-            for start in range(0, len(same[3]), len(source_records))
+            f"OpenNeuro retains {same[2]}/{len(source_records)} ordered trial(s); "
+            "omitted private trial(s) "
+            + _trial_list(p for p in range(len(source_records)) if p not in retained)
         )
-    ):
+    elif copies := source_index.repeats(same[3]):
         result["status"] = "duplicated_reference_match"
-        result["detail"] = (
-            f"OpenNeuro contains {len(same[3]) // len(source_records)} copies of the run"
-        )
+        result["detail"] = f"OpenNeuro contains {copies} copies of the run"
     else:
         result["status"] = "reference_mismatch"
         result["detail"] = (
             f"private sequence has {len(source_records)} trial(s); "
             f"same-run OpenNeuro sequence has {same[2]}"
         )
+        mismatched = source_index.mismatches(same[3])
+        if mismatched:
+            result["detail"] += f"; first differing trial(s) {_trial_list(mismatched)}"
     return result
 
 
+def _audit_with_references(
+    item: tuple[RunKey, ReferenceIndex], behavior_root: Path, openneuro_root: Path
+) -> dict[str, str]:
+    key, reference_index = item
+    return audit_key(key, behavior_root, openneuro_root, reference_index)
+
+
 def build_parser() -> argparse.ArgumentParser:
     project_root = Path(__file__).resolve().parents[1]
     parser = argparse.ArgumentParser(description=__doc__)
@@ -363,6 +548,12 @@ def build_parser() -> argparse.ArgumentParser:
     )
     parser.add_argument("--bids-root", type=Path, default=project_root / "bids")
     parser.add_argument("--report-tsv", type=Path, required=True)
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help="worker processes for reference indexing and per-run audits",
+    )
     parser.add_argument(
         "--informational",
         action="store_true",
@@ -380,13 +571,35 @@ def main(argv: Sequence[str] | None = None) -> int:
         parser.error(str(exc))
     if not args.openneuro_root.is_dir():
         parser.error(f"OpenNeuro root is not a directory: {args.openneuro_root}")
+    if args.jobs < 1:
+        parser.error("--jobs must be at least 1")
     subjects = [args.subject] if args.subject else read_subject_list(args.sublist)
     sessions = tuple(dict.fromkeys(args.sessions or ["01", "02"]))
-    rows: list[dict[str, str]] = []
-    for subject in subjects:
-        for session in sessions:
-            for key in discover_bold_runs(args.bids_root, subject, session, tasks):
-                rows.append(audit_key(key, args.behavior_root, args.openneuro_root))
+    keys = [
+        key
+        for subject in subjects
+        for session in sessions
+        for key in discover_bold_runs(args.bids_root, subject, session, tasks)
+    ]
+    references = build_reference_index(
+        args.openneuro_root, subjects, tasks, jobs=args.jobs
+    )
+    if args.jobs == 1 or len(keys) < 2:
+        rows = [
+            audit_key(key, args.behavior_root, args.openneuro_root, references)
+            for key in keys
+        ]
+    else:
+        audit = partial(
+            _audit_with_references,
+            behavior_root=args.behavior_root,
+            openneuro_root=args.openneuro_root,
+        )
+        items = [
+            (key, references.subset(key.subject, key.session, key.task)) for key in keys
+        ]
+        with ProcessPoolExecutor(max_workers=min(args.jobs, len(keys))) as pool:
+            rows = list(pool.map(audit, items))
     columns = (
         "subject",
         "session",
@@ -7,7 +7,6 @@ import argparse
 import csv
 import hashlib
 import importlib
-import importlib.metadata
 import json
 import math
 import os
@@ -18,7 +17,10 @@ from dataclasses import dataclass
 from datetime import datetime, timezone
 from functools import lru_cache
 from pathlib import Path
-from typing import Any, Iterable
+from typing import Any, Callable, Iterable
+
+from mriqc_iqms import TABLE_SUBDIR, parse_iqm_json, read_index, read_iqms
+from pipeline_utils import tsv_records, write_tsv_records
 
 
 TARGET_SPACE = "MNI152NLin6Asym"
@@ -266,13 +268,15 @@ def finite_float(value: Any) -> float | None:
     return result if math.isfinite(result) else None
 
 
-def extract_mriqc(paths: list[Path]) -> tuple[dict[str, float | None], list[str]]:
+def extract_mriqc(
+    paths: list[Path], read: Callable[[Path], dict[str, Any]] = parse_iqm_json
+) -> tuple[dict[str, float | None], list[str]]:
     values = {"tsnr": None, "fd_mean": None}
     if len(paths) != 1:
         issue = "missing_mriqc_json" if not paths else "ambiguous_mriqc_json"
         return values, [f"tsnr:{issue}", f"fd_mean:{issue}"]
     try:
-        data = json.loads(paths[0].read_text())
+        data = read(paths[0])
     except Exception:
         return values, ["tsnr:invalid_mriqc_json", "fd_mean:invalid_mriqc_json"]
     missing: list[str] = []
@@ -585,6 +589,7 @@ def build_rows(
         tasks,
         lambda _path, ent: ent.get("echo") == "2" and ent.get("part") == "mag",
     )
+    iqm_index = read_index(project_root / TABLE_SUBDIR)
     tedana = index_run_files(tedana_root, "*_desc-tedana_metrics.tsv", tasks)
     masks = index_run_files(
         fmriprep_root,
@@ -597,7 +602,9 @@ def build_rows(
         missing: list[str] = []
         if len(bold_paths) != 1:
             missing.append("bids_bold:ambiguous_inventory")
-        mriqc_values, mriqc_missing = extract_mriqc(mriqc.get(key, []))
+        mriqc_values, mriqc_missing = extract_mriqc(
+            mriqc.get(key, []), lambda path: read_iqms(path, mriqc_root, iqm_index)
+        )
         tedana_values, tedana_missing = extract_tedana(tedana.get(key, []))
         missing.extend(mriqc_missing)
         missing.extend(tedana_missing)
@@ -668,14 +675,9 @@ def output_value(value: Any) -> Any:
 def write_tsv(path: Path, rows: list[dict[str, Any]], columns: list[str]) -> None:
     path.parent.mkdir(parents=True, exist_ok=True)
     with path.open("w", newline="") as handle:
-        writer = csv.DictWriter(
-            handle, fieldnames=columns, delimiter="\t", lineterminator="\n"
+        write_tsv_records(
+            handle, columns, tsv_records(rows, columns, default=output_value)
         )
-        writer.writeheader()
-        for row in rows:
-            writer.writerow(
-                {column: output_value(row.get(column)) for column in columns}
-            )
 
 
 def read_tsv(path: Path) -> list[dict[str, str]]:
@@ -856,6 +858,10 @@ def generated_by(root: Path, project_root: Path) -> dict[str, Any]:
 
 
 def package_versions() -> dict[str, str]:
+    # Deferred: importlib.metadata costs more to import than the rest of this
+    # module's standard-library dependencies, and only provenance needs it.
+    import importlib.metadata
+
     versions: dict[str, str] = {}
     for name in (
         "numpy",
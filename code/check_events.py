@@ -7,8 +7,11 @@ import argparse
 import csv
 import os
 import re
+import sys
 from collections import Counter
 from collections.abc import Sequence
+from dataclasses import dataclass, field
+from functools import partial
 from pathlib import Path
 
 from convert_behavior import (
@@ -19,9 +22,11 @@ from convert_behavior import (
     ConversionError,
     ConvertedRun,
     RunKey,
+    approvals_by_session,
     convert_source,
     discover_bold_runs,
     event_path,
+    events_sha256,
     issue_is_approved,
     load_curation_approvals,
     normalize_run,
@@ -30,7 +35,8 @@ from convert_behavior import (
     parse_tasks,
     resolve_sources,
 )
-from pipeline_utils import read_subject_list
+from events_manifest import read_events_digests
+from pipeline_utils import read_subject_list, sha256_file
 
 
 EVENT_RE = re.compile(
@@ -137,6 +143,29 @@ def _matches_canonical_events(
     return True
 
 
+def _matches_events_digest(
+    path: Path,
+    converted: ConvertedRun,
+    digests: dict[str, dict[str, object]],
+) -> bool:
+    """Return whether ``path`` holds exactly the canonical bytes for ``converted``.
+
+    A digest recorded at write time is trusted while the file's size and
+    mtime are unchanged; otherwise the file itself is hashed. A mismatch is
+    not a verdict: callers fall back to the cell-wise comparison.
+    """
+    expected = events_sha256(converted)
+    stat = path.stat()
+    record = digests.get(path.name)
+    if (
+        record is not None
+        and record.get("size") == stat.st_size
+        and record.get("mtime_ns") == stat.st_mtime_ns
+    ):
+        return record.get("sha256") == expected
+    return sha256_file(path) == expected
+
+
 def _add_review(
     findings: list[dict[str, str]] | None,
     key: RunKey,
@@ -170,11 +199,12 @@ def _report_review_issues(
     approvals: dict[CurationKey, CurationApproval],
     counts: Counter[str],
     review_findings: list[dict[str, str]] | None,
+    lines: list[str],
 ) -> bool:
     unapproved = False
     for issue in converted.review_issues:
         if issue_is_approved(key, issue, converted, approvals):
-            print(f"APPROVED REVIEW {key.event_name}: {issue}")
+            lines.append(f"APPROVED REVIEW {key.event_name}: {issue}")
             counts["approved human review"] += 1
             continue
         detail = issue
@@ -186,7 +216,7 @@ def _report_review_issues(
             counts["unexpected trial count"] += 1
         elif issue == "behaviorally_poor":
             counts["behaviorally poor"] += 1
-        print(
+        lines.append(
             f"REVIEW REQUIRED {key.event_name}: {detail}; "
             f"source_sha256={converted.source_sha256}; "
             f"trial_fingerprint={converted.trial_fingerprint}"
@@ -203,166 +233,132 @@ def _report_review_issues(
             converted.trial_fingerprint,
         )
     for note in converted.notes:
-        print(f"SOURCE NOTE {key.event_name}: {note}")
+        lines.append(f"SOURCE NOTE {key.event_name}: {note}")
         counts["source note"] += 1
     return unapproved
 
 
-def audit_subject_session(
+@dataclass
+class TaskAudit:
+    """Buffered report lines, counts, and review rows for one task."""
+
+    lines: list[str] = field(default_factory=list)
+    counts: Counter[str] = field(default_factory=Counter)
+    review_findings: list[dict[str, str]] = field(default_factory=list)
+    sidecar_lines: list[str] = field(default_factory=list)
+    failed: int = 0
+
+
+def _audit_task(
     bids_root: Path,
     behavior_root: Path,
     subject: str,
     session: str,
-    tasks: Sequence[str],
-    quiet_ok: bool = False,
-    approvals: dict[CurationKey, CurationApproval] | None = None,
-    review_findings: list[dict[str, str]] | None = None,
-    runs: Sequence[int] | None = None,
-) -> tuple[int, Counter[str]]:
-    approvals = approvals or {}
-    bold_keys = set(discover_bold_runs(bids_root, subject, session, tasks))
-    events_keys = _event_runs(bids_root, subject, session, tasks)
-    if runs is not None:
-        selected_runs = set(runs)
-        bold_keys = {key for key in bold_keys if key.run in selected_runs}
-        events_keys = {key for key in events_keys if key.run in selected_runs}
-    failed = 0
-    counts: Counter[str] = Counter()
+    task: str,
+    bold_keys: set[RunKey],
+    events_keys: set[RunKey],
+    digests: dict[str, dict[str, object]],
+    quiet_ok: bool,
+    approvals: dict[CurationKey, CurationApproval],
+    runs: Sequence[int] | None,
+    source_listings: dict[Path, list[Path]],
+) -> TaskAudit:
+    audit = TaskAudit()
+    lines = audit.lines
+    counts = audit.counts
+    review_findings = audit.review_findings
+    bold_runs = {key.run for key in bold_keys if key.task == task}
+    event_runs = {key.run for key in events_keys if key.task == task}
+    observed_runs = bold_runs | event_runs
+    candidate_runs = (
+        sorted(set(runs))
+        if runs is not None
+        else sorted(observed_runs or set(STANDARD_RUNS[task]))
+    )
+    resolutions = resolve_sources(
+        behavior_root,
+        subject,
+        session,
+        task,
+        candidate_runs,
+        approvals,
+        source_listings,
+    )
+    for run in candidate_runs:
+        key = RunKey(subject, session, task, run)
+        has_bold = key in bold_keys
+        has_events = key in events_keys
+        source = resolutions[run]
+        if not has_bold and not has_events and source.status == "missing":
+            continue
+        if has_bold:
+            counts["BOLD runs found"] += 1
+        if has_events:
+            counts["events files found"] += 1
+        if source.status == "available":
+            counts["behavioral source runs found"] += 1
+            if source.detail:
+                lines.append(f"SOURCE NOTE {key.event_name}: {source.detail}")
+                counts["source note"] += 1
+
+        if source.status == "ambiguous":
+            lines.append(f"BEHAVIOR SOURCE AMBIGUOUS {key.event_name}: {source.detail}")
+            counts["behavior source ambiguous"] += 1
+            counts["review required"] += 1
+            audit.failed = 1
+            source_digest = ""
+            trial_digest = ""
+            if source.path is not None:
+                try:
+                    candidate = convert_source(task, source.path)
+                    source_digest = candidate.source_sha256
+                    trial_digest = candidate.trial_fingerprint
+                except (ConversionError, OSError, csv.Error):
+                    pass
+            _add_review(
+                review_findings,
+                key,
+                (
+                    "ambiguous_run_label"
+                    if source.path is not None and "lone raw run-1" in source.detail
+                    else "source_ambiguous"
+                ),
+                source.detail,
+                source.path,
+                source_digest,
+                trial_digest,
+            )
+            continue
 
-    for task in tasks:
-        bold_runs = {key.run for key in bold_keys if key.task == task}
-        event_runs = {key.run for key in events_keys if key.task == task}
-        observed_runs = bold_runs | event_runs
-        candidate_runs = (
-            sorted(set(runs))
-            if runs is not None
-            else sorted(observed_runs or set(STANDARD_RUNS[task]))
-        )
-        resolutions = resolve_sources(
-            behavior_root, subject, session, task, candidate_runs, approvals
-        )
-        for run in candidate_runs:
-            key = RunKey(subject, session, task, run)
-            has_bold = key in bold_keys
-            has_events = key in events_keys
-            source = resolutions[run]
-            if not has_bold and not has_events and source.status == "missing":
-                continue
-            if has_bold:
-                counts["BOLD runs found"] += 1
+        if not has_bold:
+            lines.append(f"BOLD MISSING {key.event_name}")
+            counts["BOLD missing"] += 1
             if has_events:
-                counts["events files found"] += 1
-            if source.status == "available":
-                counts["behavioral source runs found"] += 1
-                if source.detail:
-                    print(f"SOURCE NOTE {key.event_name}: {source.detail}")
-                    counts["source note"] += 1
-
-            if source.status == "ambiguous":
-                print(f"BEHAVIOR SOURCE AMBIGUOUS {key.event_name}: {source.detail}")
-                counts["behavior source ambiguous"] += 1
-                counts["review required"] += 1
-                failed = 1
-                source_digest = ""
-                trial_digest = ""
-                if source.path is not None:
-                    try:
-                        candidate = convert_source(task, source.path)
-                        source_digest = candidate.source_sha256
-                        trial_digest = candidate.trial_fingerprint
-                    except (ConversionError, OSError, csv.Error):
-                        pass
-                _add_review(
-                    review_findings,
-                    key,
-                    (
-                        "ambiguous_run_label"
-                        if source.path is not None and "lone raw run-1" in source.detail
-                        else "source_ambiguous"
-                    ),
-                    source.detail,
-                    source.path,
-                    source_digest,
-                    trial_digest,
-                )
-                continue
-
-            if not has_bold:
-                print(f"BOLD MISSING {key.event_name}")
-                counts["BOLD missing"] += 1
-                if has_events:
-                    failed = 1
-                continue
-
-            if source.status == "missing":
-                print(f"REVIEW REQUIRED {key.event_name}: behavior source missing")
-                counts["behavior source missing"] += 1
-                counts["review required"] += 1
-                _add_review(
-                    review_findings,
-                    key,
-                    "source_missing",
-                    "BOLD run has no uniquely resolved private behavioral source",
-                )
-                failed = 1
-                if not has_events:
-                    continue
-
-            converted = None
-            if source.status == "available" and source.path is not None:
-                try:
-                    converted = convert_source(task, source.path)
-                except (ConversionError, OSError, csv.Error) as exc:
-                    print(f"CONVERSION FAILED {key.event_name}: {exc}")
-                    counts["conversion failed"] += 1
-                    failed = 1
-                    _add_review(
-                        review_findings,
-                        key,
-                        "conversion_failed",
-                        str(exc),
-                        source.path,
-                    )
-                    continue
+                audit.failed = 1
+            continue
 
+        if source.status == "missing":
+            lines.append(f"REVIEW REQUIRED {key.event_name}: behavior source missing")
+            counts["behavior source missing"] += 1
+            counts["review required"] += 1
+            _add_review(
+                review_findings,
+                key,
+                "source_missing",
+                "BOLD run has no uniquely resolved private behavioral source",
+            )
+            audit.failed = 1
             if not has_events:
-                if converted is not None and _report_review_issues(
-                    key,
-                    converted,
-                    source.path,
-                    approvals,
-                    counts,
-                    review_findings,
-                ):
-                    failed = 1
-                    continue
-                print(f"EVENTS MISSING {key.event_name}")
-                counts["events missing"] += 1
-                failed = 1
-                _add_review(
-                    review_findings,
-                    key,
-                    "events_missing",
-                    "behavioral source and BOLD exist but events file is missing",
-                    source.path,
-                )
                 continue
 
-            destination = event_path(bids_root, key)
+        converted = None
+        if source.status == "available" and source.path is not None:
             try:
-                event_rows, observed_rows, observed_columns = _validate_event_file(
-                    destination
-                )
-                if converted is not None and not _matches_canonical_events(
-                    observed_rows, observed_columns, converted
-                ):
-                    raise ConversionError(
-                        "events contents differ from canonical source conversion"
-                    )
+                converted = convert_source(task, source.path)
             except (ConversionError, OSError, csv.Error) as exc:
-                print(f"CONVERSION FAILED {key.event_name}: {exc}")
+                lines.append(f"CONVERSION FAILED {key.event_name}: {exc}")
                 counts["conversion failed"] += 1
-                failed = 1
+                audit.failed = 1
                 _add_review(
                     review_findings,
                     key,
@@ -372,31 +368,169 @@ def audit_subject_session(
                 )
                 continue
 
-            if converted is None:
-                continue
-            if _report_review_issues(
+        if not has_events:
+            if converted is not None and _report_review_issues(
                 key,
                 converted,
                 source.path,
                 approvals,
                 counts,
                 review_findings,
+                lines,
             ):
-                failed = 1
-            if not quiet_ok:
-                print(f"OK {key.event_name}: {event_rows} event row(s)")
-            counts["OK"] += 1
+                audit.failed = 1
+                continue
+            lines.append(f"EVENTS MISSING {key.event_name}")
+            counts["events missing"] += 1
+            audit.failed = 1
+            _add_review(
+                review_findings,
+                key,
+                "events_missing",
+                "behavioral source and BOLD exist but events file is missing",
+                source.path,
+            )
+            continue
 
-    event_tasks = {key.task for key in events_keys if key in bold_keys}
-    for task in sorted(event_tasks):
+        destination = event_path(bids_root, key)
+        try:
+            if converted is not None and _matches_events_digest(
+                destination, converted, digests
+            ):
+                event_rows = len(converted.rows)
+            else:
+                event_rows, observed_rows, observed_columns = _validate_event_file(
+                    destination
+                )
+                if converted is not None and not _matches_canonical_events(
+                    observed_rows, observed_columns, converted
+                ):
+                    raise ConversionError(
+                        "events contents differ from canonical source conversion"
+                    )
+        except (ConversionError, OSError, csv.Error) as exc:
+            lines.append(f"CONVERSION FAILED {key.event_name}: {exc}")
+            counts["conversion failed"] += 1
+            audit.failed = 1
+            _add_review(
+                review_findings,
+                key,
+                "conversion_failed",
+                str(exc),
+                source.path,
+            )
+            continue
+
+        if converted is None:
+            continue
+        if _report_review_issues(
+            key,
+            converted,
+            source.path,
+            approvals,
+            counts,
+            review_findings,
+            lines,
+        ):
+            audit.failed = 1
+        if not quiet_ok:
+            lines.append(f"OK {key.event_name}: {event_rows} event row(s)")
+        counts["OK"] += 1
+
+    if any(key.task == task and key in bold_keys for key in events_keys):
         sidecar = bids_root / f"task-{task}_events.json"
         if not sidecar.is_file():
-            print(f"EVENTS SIDECAR MISSING {sidecar}")
+            audit.sidecar_lines.append(f"EVENTS SIDECAR MISSING {sidecar}")
             counts["events missing"] += 1
-            failed = 1
+            audit.failed = 1
+    return audit
+
+
+def audit_subject_tasks(
+    bids_root: Path,
+    behavior_root: Path,
+    subject: str,
+    session: str,
+    tasks: Sequence[str],
+    quiet_ok: bool = False,
+    approvals: dict[CurationKey, CurationApproval] | None = None,
+    runs: Sequence[int] | None = None,
+) -> dict[str, TaskAudit]:
+    """Audit every task of one subject/session from a single ``func/`` scan."""
+    approvals = approvals or {}
+    bold_keys = set(discover_bold_runs(bids_root, subject, session, tasks))
+    events_keys = _event_runs(bids_root, subject, session, tasks)
+    if runs is not None:
+        selected_runs = set(runs)
+        bold_keys = {key for key in bold_keys if key.run in selected_runs}
+        events_keys = {key for key in events_keys if key.run in selected_runs}
+    func = bids_root / f"sub-{subject}" / f"ses-{session}" / "func"
+    digests = read_events_digests(func) if events_keys else {}
+    source_listings: dict[Path, list[Path]] = {}
+    return {
+        task: _audit_task(
+            bids_root,
+            behavior_root,
+            subject,
+            session,
+            task,
+            bold_keys,
+            events_keys,
+            digests,
+            quiet_ok,
+            approvals,
+            runs,
+            source_listings,
+        )
+        for task in tasks
+    }
+
+
+def audit_subject_session(
+    bids_root: Path,
+    behavior_root: Path,
+    subject: str,
+    session: str,
+    tasks: Sequence[str],
+    quiet_ok: bool = False,
+    approvals: dict[CurationKey, CurationApproval] | None = None,
+    review_findings: list[dict[str, str]] | None = None,
+    runs: Sequence[int] | None = None,
+) -> tuple[int, Counter[str]]:
+    audits = audit_subject_tasks(
+        bids_root, behavior_root, subject, session, tasks, quiet_ok, approvals, runs
+    )
+    failed = 0
+    counts: Counter[str] = Counter()
+    for audit in audits.values():
+        for line in audit.lines:
+            print(line)
+        failed = max(failed, audit.failed)
+        counts.update(audit.counts)
+        if review_findings is not None:
+            review_findings.extend(audit.review_findings)
+    for task in sorted(audits):
+        for line in audits[task].sidecar_lines:
+            print(line)
     return failed, counts
 
 
+def _audit_item(
+    item: tuple[str, str],
+    bids_root: Path,
+    behavior_root: Path,
+    tasks: Sequence[str],
+    quiet_ok: bool,
+    session_approvals: dict[tuple[str, str], dict[CurationKey, CurationApproval]],
+    runs: Sequence[int] | None,
+) -> dict[str, TaskAudit]:
+    subject, session = item
+    approvals = session_approvals.get(item, {})
+    return audit_subject_tasks(
+        bids_root, behavior_root, subject, session, tasks, quiet_ok, approvals, runs
+    )
+
+
 def _subjects(args: argparse.Namespace) -> list[str]:
     if args.subject:
         return [args.subject]
@@ -446,12 +580,20 @@ def build_parser() -> argparse.ArgumentParser:
         help="write unresolved cases for independent human review",
     )
     parser.add_argument("--quiet-ok", action="store_true")
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help="subject/session audits to run concurrently; report order is unchanged",
+    )
     return parser
 
 
 def main(argv: Sequence[str] | None = None) -> int:
     parser = build_parser()
     args = parser.parse_args(argv)
+    if args.jobs < 1:
+        parser.error("--jobs must be at least 1")
     try:
         tasks = parse_tasks(args.tasks)
     except argparse.ArgumentTypeError as exc:
@@ -465,29 +607,64 @@ def main(argv: Sequence[str] | None = None) -> int:
     except (ConversionError, OSError, csv.Error) as exc:
         print(f"CHECK FAILED: invalid behavioral curation file: {exc}")
         return 1
+    items = [(subject, session) for session in sessions for subject in subjects]
+    audit = partial(
+        _audit_item,
+        bids_root=args.bids_root.resolve(),
+        behavior_root=args.behavior_root.resolve(),
+        tasks=tasks,
+        quiet_ok=args.quiet_ok,
+        session_approvals=approvals_by_session(approvals),
+        runs=args.runs,
+    )
     review_findings: list[dict[str, str]] = []
     total: Counter[str] = Counter()
     failed = 0
-    breakdown: dict[tuple[str, str], Counter[str]] = {}
-    for session in sessions:
-        for task in tasks:
-            subtotal: Counter[str] = Counter()
-            for subject in subjects:
-                session_failed, counts = audit_subject_session(
-                    args.bids_root.resolve(),
-                    args.behavior_root.resolve(),
-                    subject,
-                    session,
-                    (task,),
-                    quiet_ok=args.quiet_ok,
-                    approvals=approvals,
-                    review_findings=review_findings,
-                    runs=args.runs,
-                )
-                failed = max(failed, session_failed)
-                subtotal.update(counts)
-                total.update(counts)
-            breakdown[(session, task)] = subtotal
+    breakdown: dict[tuple[str, str], Counter[str]] = {
+        (session, task): Counter() for session in sessions for task in tasks
+    }
+    # Report lines keep session, task, subject order. Each is printed as soon
+    # as its subject/session audit has finished and every earlier line is out,
+    # so progress streams and a crash keeps what was already printed.
+    report_order = [
+        (session, task, subject) for session in sessions for task in tasks for subject in subjects
+    ]
+    results: dict[tuple[str, str], dict[str, TaskAudit]] = {}
+    printed = 0
+
+    def print_ready() -> None:
+        nonlocal failed, printed
+        while printed < len(report_order):
+            session, task, subject = report_order[printed]
+            audits = results.get((subject, session))
+            if audits is None:
+                return
+            task_audit = audits[task]
+            for line in task_audit.lines + task_audit.sidecar_lines:
+                print(line)
+            failed = max(failed, task_audit.failed)
+            breakdown[(session, task)].update(task_audit.counts)
+            total.update(task_audit.counts)
+            review_findings.extend(task_audit.review_findings)
+            printed += 1
+        sys.stdout.flush()
+
+    pool = None
+    if args.jobs == 1 or len(items) < 2:
+        audits_in_order = map(audit, items)
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+
+        pool = ProcessPoolExecutor(max_workers=min(args.jobs, len(items)))
+        audits_in_order = pool.map(audit, items)
+    try:
+        for item, audits in zip(items, audits_in_order):
+            results[item] = audits
+            print_ready()
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+
     print("Events audit summary:")
     for status in (
         "BOLD runs found",
@@ -554,5 +731,3 @@ def main(argv: Sequence[str] | None = None) -> int:
 
 if __name__ == "__main__":
     raise SystemExit(main())
-    issue_is_approved,
-    load_curation_approvals,
@@ -4,6 +4,7 @@
 from __future__ import annotations
 
 import argparse
+from collections.abc import Sequence
 from pathlib import Path
 
 from pipeline_utils import (
@@ -13,6 +14,7 @@ from pipeline_utils import (
     is_fmriprep_complete,
     is_tedana_complete,
     missing_paths,
+    source_manifest,
     tedana_expected_outputs,
     warpkit_required_inputs,
 )
@@ -23,7 +25,7 @@ def print_missing(paths: list[Path]) -> None:
         print(f"MISSING {path}")
 
 
-def main() -> int:
+def main(argv: Sequence[str] | None = None) -> int:
     parser = argparse.ArgumentParser(description=__doc__)
     subparsers = parser.add_subparsers(dest="command", required=True)
 
@@ -52,7 +54,14 @@ def main() -> int:
     tedana.add_argument("run")
     tedana.add_argument("--list", action="store_true")
 
-    args = parser.parse_args()
+    manifest = subparsers.add_parser("source-manifest")
+    manifest.add_argument("scans", type=Path)
+    manifest.add_argument("--cache-dir", type=Path)
+    manifest.add_argument(
+        "--no-write", action="store_true", help="Read the cache but do not update it (for dry runs)."
+    )
+
+    args = parser.parse_args(argv)
     if args.command == "safe-child":
         ensure_safe_child_path(args.root, args.target)
         print(args.target.resolve())
@@ -90,6 +99,11 @@ def main() -> int:
         print_missing(missing_paths(expected))
         return 1
 
+    if args.command == "source-manifest":
+        summary = source_manifest(args.scans, args.cache_dir, write_cache=not args.no_write)
+        print(f"{summary.file_count}\t{summary.series_count}\t{int(summary.newest_mtime)}")
+        return 0
+
     raise AssertionError(f"unhandled command: {args.command}")
 
 
@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+"""Cache fMRIPrep confounds TSVs as memory-mapped per-column NumPy arrays."""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable, Iterable
+
+from pipeline_utils import (
+    atomic_write_json,
+    file_fingerprint,
+    fingerprint_is_current,
+    read_subject_list,
+)
+
+if TYPE_CHECKING:
+    import numpy as np
+    import pandas as pd
+
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+DEFAULT_CACHE_DIR = PROJECT_ROOT / "derivatives" / "cache" / "fmriprep-confounds"
+CONFOUNDS_GLOB = "sub-*/ses-*/func/*_desc-confounds_timeseries.tsv"
+CACHE_VERSION = 2
+
+
+def science_modules():
+    """Import NumPy and pandas only when confounds are read or cached."""
+    import numpy as np
+    import pandas as pd
+
+    return np, pd
+
+
+class ConfoundsTable:
+    """Read-only column access to one confounds TSV.
+
+    Columns come from the binary cache as memory-mapped arrays when one is
+    available; the TSV is always the source of truth and is parsed directly
+    when no cache directory is given.
+    """
+
+    def __init__(self, source: Path, columns: dict[str, Callable[[], np.ndarray]], rows: int):
+        self.source = source
+        self._loaders = columns
+        self._arrays: dict[str, np.ndarray] = {}
+        self.rows = rows
+
+    @property
+    def columns(self) -> list[str]:
+        return list(self._loaders)
+
+    def column(self, name: str) -> np.ndarray:
+        if name not in self._arrays:
+            self._arrays[name] = self._loaders[name]()
+        return self._arrays[name]
+
+    def to_frame(self, wanted: Callable[[str], bool] | None = None) -> pd.DataFrame:
+        _, pd = science_modules()
+        names = [name for name in self.columns if wanted is None or wanted(name)]
+        return pd.DataFrame(
+            {name: self.column(name) for name in names},
+            index=pd.RangeIndex(self.rows),
+            columns=names,
+        )
+
+
+def _table_from_frame(source: Path, frame: pd.DataFrame) -> ConfoundsTable:
+    loaders = {name: (lambda series=frame[name]: series.to_numpy()) for name in frame.columns}
+    return ConfoundsTable(source, loaders, len(frame))
+
+
+def _source_pointer(cache_dir: Path, source: Path) -> Path:
+    key = hashlib.sha256(str(source.resolve()).encode()).hexdigest()[:16]
+    return cache_dir / "sources" / f"{key}.json"
+
+
+def _entry_dir(cache_dir: Path, sha256: str) -> Path:
+    return cache_dir / sha256[:2] / sha256
+
+
+def _read_entry(entry: Path) -> dict | None:
+    try:
+        manifest = json.loads((entry / "columns.json").read_text())
+    except (OSError, ValueError):
+        return None
+    if manifest.get("version") != CACHE_VERSION:
+        return None
+    return manifest
+
+
+def _load_column(entry: Path, column: dict) -> np.ndarray:
+    """Load one cached column; text columns get their missing cells back as NaN."""
+    np, _ = science_modules()
+    values = np.load(entry / column["file"], mmap_mode="r")
+    if "missing" not in column:
+        return values
+    values = values.astype(object)
+    values[np.load(entry / column["missing"])] = np.nan
+    return values
+
+
+def _table_from_entry(source: Path, entry: Path, manifest: dict) -> ConfoundsTable:
+    loaders = {
+        column["name"]: (lambda column=column: _load_column(entry, column))
+        for column in manifest["columns"]
+    }
+    return ConfoundsTable(source, loaders, int(manifest["rows"]))
+
+
+def _write_entry(entry: Path, source: Path, sha256: str, frame: pd.DataFrame) -> None:
+    np, _ = science_modules()
+    entry.parent.mkdir(parents=True, exist_ok=True)
+    staging = Path(tempfile.mkdtemp(prefix=f".{entry.name}.", dir=str(entry.parent)))
+    try:
+        columns = []
+        for index, name in enumerate(frame.columns):
+            values = frame[name].to_numpy()
+            filename = f"{index:04d}.npy"
+            column = {"name": name, "file": filename}
+            if values.dtype == object:
+                # Text is stored as fixed-width strings, so missing cells
+                # need a mask rather than becoming the literal "nan".
+                missing = frame[name].isna().to_numpy()
+                values = np.where(missing, "", values).astype(str)
+                if missing.any():
+                    column["missing"] = f"{index:04d}.missing.npy"
+                    np.save(staging / column["missing"], missing, allow_pickle=False)
+            np.save(staging / filename, values, allow_pickle=False)
+            columns.append({**column, "dtype": str(values.dtype)})
+        atomic_write_json(
+            staging / "columns.json",
+            {
+                "version": CACHE_VERSION,
+                "source": str(source),
+                "sha256": sha256,
+                "rows": len(frame),
+                "columns": columns,
+            },
+        )
+        try:
+            staging.rename(entry)
+        except OSError:
+            # Another process cached the same content first.
+            if _read_entry(entry) is None:
+                raise
+    finally:
+        if staging.exists():
+            shutil.rmtree(staging)
+
+
+def _referenced_hashes(cache_dir: Path) -> set[str]:
+    hashes = set()
+    for path in (cache_dir / "sources").glob("*.json"):
+        try:
+            pointer = json.loads(path.read_text())
+        except (OSError, ValueError):
+            continue
+        if isinstance(pointer, dict) and isinstance(pointer.get("sha256"), str):
+            hashes.add(pointer["sha256"])
+    return hashes
+
+
+def prune_entry(cache_dir: Path, sha256: str) -> bool:
+    """Remove the entry for ``sha256`` unless a source pointer still names it.
+
+    Entries are content-addressed, so two identical sources share one; the
+    entry goes only when no pointer refers to it any more. Arrays a reader
+    already memory-mapped stay valid after removal.
+    """
+    entry = _entry_dir(cache_dir, sha256)
+    if not entry.is_dir() or sha256 in _referenced_hashes(cache_dir):
+        return False
+    shutil.rmtree(entry, ignore_errors=True)
+    return True
+
+
+def cache_confounds(source: Path, cache_dir: Path) -> tuple[Path, bool]:
+    """Ensure ``source`` has a cache entry, returning ``(entry, built)``.
+
+    When the source changed, the entry for its previous content is pruned
+    once no other source pointer refers to it.
+    """
+    pointer_path = _source_pointer(cache_dir, source)
+    try:
+        pointer = json.loads(pointer_path.read_text())
+    except (OSError, ValueError):
+        pointer = None
+    if not isinstance(pointer, dict) or not isinstance(pointer.get("sha256"), str):
+        pointer = None
+    if pointer is not None and fingerprint_is_current(pointer):
+        entry = _entry_dir(cache_dir, pointer["sha256"])
+        if _read_entry(entry) is not None:
+            return entry, False
+
+    fingerprint = file_fingerprint(source)
+    entry = _entry_dir(cache_dir, fingerprint["sha256"])
+    built = False
+    if _read_entry(entry) is None:
+        _, pd = science_modules()
+        _write_entry(entry, source, fingerprint["sha256"], pd.read_csv(source, sep="\t"))
+        built = True
+    pointer_path.parent.mkdir(parents=True, exist_ok=True)
+    atomic_write_json(pointer_path, fingerprint)
+    if pointer is not None and pointer["sha256"] != fingerprint["sha256"]:
+        prune_entry(cache_dir, pointer["sha256"])
+    return entry, built
+
+
+def load_confounds(source: Path, cache_dir: Path | None = None) -> ConfoundsTable:
+    """Return column access to an fMRIPrep confounds TSV, caching it if requested."""
+    if cache_dir is None:
+        _, pd = science_modules()
+        return _table_from_frame(source, pd.read_csv(source, sep="\t"))
+    entry, _ = cache_confounds(source, cache_dir)
+    manifest = _read_entry(entry)
+    assert manifest is not None
+    return _table_from_entry(source, entry, manifest)
+
+
+def discover_confounds(fmriprep_dir: Path, subjects: Iterable[str] | None = None) -> list[Path]:
+    wanted = {subject.removeprefix("sub-") for subject in subjects} if subjects is not None else None
+    paths = []
+    for path in sorted(fmriprep_dir.glob(CONFOUNDS_GLOB)):
+        if wanted is not None and path.parents[2].name.removeprefix("sub-") not in wanted:
+            continue
+        paths.append(path)
+    return paths
+
+
+def _cache_one(item: tuple[Path, Path]) -> tuple[str, str | None]:
+    source, cache_dir = item
+    try:
+        _, built = cache_confounds(source, cache_dir)
+    except Exception as exc:  # noqa: BLE001 - keep batch processing and report all failures.
+        return "failed", str(exc)
+    return ("built" if built else "current"), None
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--fmriprep-dir", type=Path, default=PROJECT_ROOT / "derivatives" / "fmriprep")
+    parser.add_argument("--cache-dir", type=Path, default=DEFAULT_CACHE_DIR)
+    parser.add_argument("--sublist", type=Path, help="Optional subject list limiting which confounds are cached.")
+    parser.add_argument("--jobs", type=int, default=1, help="Confounds files to cache concurrently.")
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+    if args.jobs < 1:
+        parser.error("--jobs must be at least 1")
+
+    subjects = read_subject_list(args.sublist) if args.sublist else None
+    sources = discover_confounds(args.fmriprep_dir, subjects)
+    if args.dry_run:
+        for source in sources:
+            print(f"Would cache: {source}")
+        print(f"Found {len(sources)} fMRIPrep confounds file(s).")
+        return 0
+
+    items = [(source, args.cache_dir) for source in sources]
+    if args.jobs == 1 or len(items) < 2:
+        results = list(map(_cache_one, items))
+    else:
+        with ProcessPoolExecutor(max_workers=min(args.jobs, len(items))) as pool:
+            results = list(pool.map(_cache_one, items))
+
+    counts = {"built": 0, "current": 0, "failed": 0}
+    for source, (status, error) in zip(sources, results):
+        counts[status] += 1
+        if error is not None:
+            print(f"Failed {source}: {error}")
+    print(
+        f"Confounds cache: {counts['built']} built, {counts['current']} current, "
+        f"{counts['failed']} failed."
+    )
+    return 1 if counts["failed"] else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
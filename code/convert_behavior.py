@@ -6,15 +6,27 @@ from __future__ import annotations
 import argparse
 import csv
 import hashlib
+import io
 import json
 import math
 import os
 import re
 import shutil
 import tempfile
-from collections.abc import Iterable, Sequence
+import traceback
+from collections.abc import Callable, Iterable, Iterator, Mapping, Sequence
+from contextlib import nullcontext, redirect_stdout
 from dataclasses import dataclass, field
+from functools import partial
 from pathlib import Path
+from typing import Any, TextIO
+
+from events_manifest import (
+    read_events_digests,
+    record_events_digest,
+    update_events_manifest,
+)
+from pipeline_utils import read_subject_list, tsv_records, write_tsv_records
 
 
 TASKS = ("sharedreward", "trust", "ugr", "socialdoors", "doors")
@@ -62,7 +74,7 @@ class SourceResolution:
 
 @dataclass
 class ConvertedRun:
-    rows: list[dict[str, object]]
+    rows: Sequence[dict[str, object]]
     columns: tuple[str, ...]
     trial_count: int
     expected_trial_count: int | None = None
@@ -276,12 +288,53 @@ def _resolve_numbered_sources(
     return resolutions
 
 
+def _socialdoors_identity(task: str, path: Path) -> Iterator[list[str]]:
+    """Yield each Social Doors/Doors row's formatted trial-fingerprint fields.
+
+    Only the identity columns hashed by ``_trial_fingerprint`` are kept, so a
+    candidate export can be compared with the historical canonical events and
+    abandoned at its first differing row without converting or hashing it.
+    """
+    fields = FINGERPRINT_FIELDS[task]
+    with path.open("r", encoding="utf-8-sig", errors="replace", newline="") as handle:
+        reader, header = _source_reader(handle, path, "\t")
+        if not {"onset", "duration", "trial_type"}.issubset(header):
+            raise ConversionError("Social Doors/Doors source lacks required BIDS columns")
+        positions = [header.index(name) if name in header else None for name in fields]
+        for line_number, raw in enumerate(reader, start=2):
+            values = [value.strip() for value in raw]
+            if not any(values):
+                continue
+            if len(values) != len(header) or [
+                value.lstrip("\ufeff") for value in values
+            ] == header:
+                raise ConversionError(f"malformed source row {line_number}: {path}")
+            yield [
+                "n/a" if index is None else _format_value(values[index])
+                for index in positions
+            ]
+
+
+def _matches_socialdoors_identity(
+    task: str, path: Path, reference: list[list[str]]
+) -> bool:
+    count = 0
+    try:
+        for count, record in enumerate(_socialdoors_identity(task, path), start=1):
+            if count > len(reference) or record != reference[count - 1]:
+                return False
+    except (ConversionError, OSError, csv.Error):
+        return False
+    return count == len(reference)
+
+
 def _resolve_socialdoors_sources(
     behavior_root: Path,
     subject: str,
     session: str,
     task: str,
     expected_runs: Sequence[int],
+    source_listings: dict[Path, list[Path]] | None = None,
 ) -> dict[int, SourceResolution]:
     resolutions = {run: SourceResolution("missing") for run in expected_runs}
     if 1 not in resolutions:
@@ -295,8 +348,13 @@ def _resolve_socialdoors_sources(
         rf"{raw_task}[AB][1-4]_events\.tsv$",
         re.IGNORECASE,
     )
+    if source_listings is None:
+        source_listings = {}
+    if source_dir not in source_listings:
+        # Social Doors and Doors exports share one directory per subject.
+        source_listings[source_dir] = sorted(source_dir.glob("*_events.tsv"))
     matches: list[Path] = []
-    for path in sorted(source_dir.glob("*_events.tsv")):
+    for path in source_listings[source_dir]:
         match = pattern.match(path.name)
         if not match or not _same_subject(match.group("subject"), subject):
             continue
@@ -311,16 +369,18 @@ def _resolve_socialdoors_sources(
             / f"sub-{subject}{session_entity}_task-{task}_run-1_events.tsv"
         )
         matching: list[Path] = []
+        reference: list[list[str]] = []
         if historical.is_file():
             try:
-                fingerprint = convert_source(task, historical).trial_fingerprint
-                matching = [
-                    path
-                    for path in matches
-                    if convert_source(task, path).trial_fingerprint == fingerprint
-                ]
+                reference = list(_socialdoors_identity(task, historical))
             except (ConversionError, OSError, csv.Error):
-                matching = []
+                reference = []
+        if reference:
+            matching = [
+                path
+                for path in matches
+                if _matches_socialdoors_identity(task, path, reference)
+            ]
         if len(matching) == 1:
             resolutions[1] = SourceResolution(
                 "available",
@@ -341,98 +401,182 @@ def resolve_sources(
     task: str,
     expected_runs: Sequence[int],
     approvals: dict[CurationKey, CurationApproval] | None = None,
+    source_listings: dict[Path, list[Path]] | None = None,
 ) -> dict[int, SourceResolution]:
     if task in {"socialdoors", "doors"}:
         return _resolve_socialdoors_sources(
-            behavior_root, subject, session, task, expected_runs
+            behavior_root, subject, session, task, expected_runs, source_listings
         )
     return _resolve_numbered_sources(
         behavior_root, subject, session, task, expected_runs, approvals
     )
 
 
-def _read_delimited(path: Path, delimiter: str) -> list[dict[str, str]]:
+TRIAL_NUMBER_COLUMNS = ("TrialNumber", "Trial", "nTrial")
+SEGMENT_ONSET_COLUMNS = ("decision_onset", "onset")
+UNRUN_VALUES = frozenset({"0", "0.0", "false", "no"})
+STARTED_VALUES = frozenset({"1", "1.0", "true", "yes"})
+
+
+@dataclass(frozen=True)
+class SourceTable:
+    """One tokenized source log, stored column-major.
+
+    ``records`` keeps the stripped fields of each nonblank data row and
+    ``lines`` their one-based source line numbers. Columns are transposed
+    once from the records; row dictionaries are only built on request.
+    """
+
+    header: tuple[str, ...]
+    records: list[list[str]]
+    lines: list[int]
+    columns: dict[str, list[str]] = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        transposed = zip(*self.records) if self.records else ([] for _ in self.header)
+        object.__setattr__(
+            self, "columns", dict(zip(self.header, map(list, transposed)))
+        )
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def column(self, name: str) -> list[str]:
+        values = self.columns.get(name)
+        return values if values is not None else [""] * len(self.records)
+
+    def row(self, index: int) -> dict[str, str]:
+        row = dict(zip(self.header, self.records[index]))
+        row["__source_line__"] = str(self.lines[index])
+        return row
+
+    def rows(self) -> list[dict[str, str]]:
+        return [self.row(index) for index in range(len(self.records))]
+
+
+def _first_nonempty(table: SourceTable, names: Sequence[str]) -> list[str]:
+    merged = [""] * len(table)
+    for name in names:
+        if name in table.columns:
+            merged = [left or right for left, right in zip(merged, table.columns[name])]
+    return merged
+
+
+def _parsed_trial(text: str) -> int | None:
+    try:
+        return int(float(text)) if text else None
+    except (ValueError, OverflowError):
+        return None
+
+
+def _parsed_onset(text: str) -> float | None:
+    try:
+        onset = float(text) if text else None
+    except ValueError:
+        return None
+    return onset if onset is not None and math.isfinite(onset) else None
+
+
+def _segment_break(table: SourceTable) -> tuple[int, str] | None:
+    """Return the first row index and message where a second run segment starts."""
+    first_reset: int | None = None
+    previous_trial: int | None = None
+    trials = map(_parsed_trial, _first_nonempty(table, TRIAL_NUMBER_COLUMNS))
+    for index, trial in enumerate(trials):
+        if trial is None:
+            continue
+        if trial == 1 and previous_trial is not None and previous_trial > 1:
+            first_reset = index
+            break
+        previous_trial = trial
+
+    first_decrease: int | None = None
+    previous_onset: float | None = None
+    onsets = map(_parsed_onset, _first_nonempty(table, SEGMENT_ONSET_COLUMNS))
+    for index, onset in enumerate(onsets):
+        if first_reset is not None and index >= first_reset:
+            break
+        if onset is None:
+            continue
+        if previous_onset is not None and onset + 1e-6 < previous_onset:
+            first_decrease = index
+            break
+        previous_onset = onset
+
+    if first_decrease is not None:
+        return first_decrease, "onset decreases"
+    if first_reset is not None:
+        return first_reset, "trial numbering resets"
+    return None
+
+
+def _source_reader(
+    handle: TextIO, path: Path, delimiter: str
+) -> tuple[Iterator[list[str]], list[str]]:
+    """Return a CSV reader positioned after the validated source header."""
+    first_line = handle.readline()
+    alternate = "\t" if delimiter == "," else ","
+    if delimiter not in first_line and alternate in first_line:
+        delimiter = alternate
+    handle.seek(0)
+    reader = csv.reader(handle, delimiter=delimiter)
+    try:
+        raw_header = next(reader)
+    except StopIteration as exc:
+        raise ConversionError(f"source has no header: {path}") from exc
+    header = [name.lstrip("\ufeff").strip() for name in raw_header]
+    if not header or not any(header):
+        raise ConversionError(f"source has no header: {path}")
+    if any(not name for name in header):
+        raise ConversionError(f"source header contains an empty column: {path}")
+    duplicates = sorted({name for name in header if header.count(name) > 1})
+    if duplicates:
+        raise ConversionError(
+            f"source header contains duplicate column(s): {', '.join(duplicates)}"
+        )
+    return reader, header
+
+
+def _read_source_table(path: Path, delimiter: str) -> SourceTable:
     with path.open("r", encoding="utf-8-sig", errors="replace", newline="") as handle:
-        first_line = handle.readline()
-        alternate = "\t" if delimiter == "," else ","
-        if delimiter not in first_line and alternate in first_line:
-            delimiter = alternate
-        handle.seek(0)
-        reader = csv.reader(handle, delimiter=delimiter)
-        try:
-            raw_header = next(reader)
-        except StopIteration as exc:
-            raise ConversionError(f"source has no header: {path}") from exc
-        header = [name.lstrip("\ufeff").strip() for name in raw_header]
-        if not header or not any(header):
-            raise ConversionError(f"source has no header: {path}")
-        if any(not name for name in header):
-            raise ConversionError(f"source header contains an empty column: {path}")
-        duplicates = sorted({name for name in header if header.count(name) > 1})
-        if duplicates:
-            raise ConversionError(
-                f"source header contains duplicate column(s): {', '.join(duplicates)}"
-            )
-        rows: list[dict[str, str]] = []
-        previous_trial: int | None = None
-        previous_onset: float | None = None
+        reader, header = _source_reader(handle, path, delimiter)
+        records: list[list[str]] = []
+        lines: list[int] = []
+        malformed: ConversionError | None = None
         for line_number, raw in enumerate(reader, start=2):
             values = [value.strip() for value in raw]
             if not any(values):
                 continue
-            normalized_values = [value.lstrip("\ufeff") for value in values]
-            if normalized_values == header:
-                raise ConversionError(
+            if [value.lstrip("\ufeff") for value in values] == header:
+                malformed = ConversionError(
                     f"multiple run segments: repeated header at source row {line_number}"
                 )
+                break
             if len(values) != len(header):
-                raise ConversionError(
+                malformed = ConversionError(
                     f"source row {line_number} has {len(values)} field(s); "
                     f"header has {len(header)}"
                 )
-            row = dict(zip(header, values))
-            row["__source_line__"] = str(line_number)
-
-            trial_text = next(
-                (
-                    row[name]
-                    for name in ("TrialNumber", "Trial", "nTrial")
-                    if row.get(name)
-                ),
-                "",
-            )
-            try:
-                trial = int(float(trial_text)) if trial_text else None
-            except ValueError:
-                trial = None
-            if trial == 1 and previous_trial is not None and previous_trial > 1:
-                raise ConversionError(
-                    f"multiple run segments: trial numbering resets at source row {line_number}"
-                )
-            if trial is not None:
-                previous_trial = trial
+                break
+            records.append(values)
+            lines.append(line_number)
+
+    table = SourceTable(tuple(header), records, lines)
+    # Rows before a malformed line were checked first when rows were read one
+    # at a time, so a segment break among them still takes precedence.
+    segment_break = _segment_break(table)
+    if segment_break is not None:
+        index, reason = segment_break
+        raise ConversionError(
+            f"multiple run segments: {reason} at source row {table.lines[index]}"
+        )
+    if malformed is not None:
+        raise malformed
+    return table
 
-            onset_text = next(
-                (row[name] for name in ("decision_onset", "onset") if row.get(name)),
-                "",
-            )
-            try:
-                onset = float(onset_text) if onset_text else None
-            except ValueError:
-                onset = None
-            if (
-                onset is not None
-                and math.isfinite(onset)
-                and previous_onset is not None
-                and onset + 1e-6 < previous_onset
-            ):
-                raise ConversionError(
-                    f"multiple run segments: onset decreases at source row {line_number}"
-                )
-            if onset is not None and math.isfinite(onset):
-                previous_onset = onset
-            rows.append(row)
-        return rows
+
+def _read_delimited(path: Path, delimiter: str) -> list[dict[str, str]]:
+    return _read_source_table(path, delimiter).rows()
 
 
 def _source_line(row: dict[str, str], fallback: int) -> str:
@@ -441,36 +585,40 @@ def _source_line(row: dict[str, str], fallback: int) -> str:
 
 def _is_unrun_placeholder(row: dict[str, str]) -> bool:
     value = row.get("ran", "").strip().lower()
-    return value in {"0", "0.0", "false", "no"}
+    return value in UNRUN_VALUES
 
 
 def _explicitly_started(row: dict[str, str]) -> bool:
     value = row.get("ran", "").strip().lower()
-    return value in {"1", "1.0", "true", "yes"}
+    return value in STARTED_VALUES
 
 
 def _trial_rows(
-    source_rows: Sequence[dict[str, str]], marker_column: str, task_label: str
+    table: SourceTable, marker_column: str, task_label: str
 ) -> tuple[list[dict[str, str]], int, int]:
+    ran = [value.lower() for value in table.column("ran")]
+    markers = [value.lower() for value in table.column(marker_column)]
+    unrun = [value in UNRUN_VALUES for value in ran]
+    # Index of the last row that is not an explicit ran=0 placeholder; every
+    # row at or after it is followed only by placeholders.
+    last_run = max((index for index, flag in enumerate(unrun) if not flag), default=-1)
+    missing_markers = {marker_column.lower(), "nan", "n/a", "--", "none"}
     trials: list[dict[str, str]] = []
     placeholders = 0
     incomplete_terminal = 0
-    for index, row in enumerate(source_rows, start=1):
-        marker = row.get(marker_column, "").strip().lower()
-        if _is_unrun_placeholder(row):
+    for index, marker in enumerate(markers):
+        if unrun[index]:
             placeholders += 1
             continue
-        if not marker or marker in {marker_column.lower(), "nan", "n/a", "--", "none"}:
-            if _explicitly_started(row) and all(
-                _is_unrun_placeholder(later) for later in source_rows[index:]
-            ):
+        if not marker or marker in missing_markers:
+            if ran[index] in STARTED_VALUES and index >= last_run:
                 incomplete_terminal += 1
                 continue
             raise ConversionError(
-                f"{task_label} source row {_source_line(row, index)} claims to have run "
+                f"{task_label} source row {table.lines[index]} claims to have run "
                 f"but lacks {marker_column}"
             )
-        trials.append(row)
+        trials.append(table.row(index))
     return trials, placeholders, incomplete_terminal
 
 
@@ -535,11 +683,42 @@ CURATION_COLUMNS = (
 )
 
 
+_CURATION_CACHE: dict[tuple[Path, str], dict[CurationKey, CurationApproval]] = {}
+
+
 def load_curation_approvals(path: Path | None) -> dict[CurationKey, CurationApproval]:
+    """Return validated approvals from ``path``, parsing each file content once.
+
+    Parsed approvals are kept per process keyed by the file's SHA-256, so
+    repeated conversions and audits reuse them until the TSV changes. Each
+    caller gets its own copy, so one cannot alter another's approvals.
+    """
     if path is None or not path.exists():
         return {}
+    content = path.read_bytes()
+    cache_key = (path, hashlib.sha256(content).hexdigest())
+    if cache_key not in _CURATION_CACHE:
+        _CURATION_CACHE[cache_key] = _parse_curation_approvals(path, content)
+    return dict(_CURATION_CACHE[cache_key])
+
+
+def approvals_by_session(
+    approvals: Mapping[CurationKey, CurationApproval],
+) -> dict[tuple[str, str], dict[CurationKey, CurationApproval]]:
+    """Index approvals by ``(subject, session)`` for per-session batch work."""
+    index: dict[tuple[str, str], dict[CurationKey, CurationApproval]] = {}
+    for curation_key, approval in approvals.items():
+        key = curation_key[0]
+        index.setdefault((key.subject, key.session), {})[curation_key] = approval
+    return index
+
+
+def _parse_curation_approvals(
+    path: Path, content: bytes
+) -> dict[CurationKey, CurationApproval]:
     approvals: dict[CurationKey, CurationApproval] = {}
-    with path.open("r", encoding="utf-8-sig", newline="") as handle:
+    text = content.decode("utf-8-sig")
+    with io.StringIO(text, newline="") as handle:
         reader = csv.DictReader(handle, delimiter="\t")
         if reader.fieldnames is None:
             raise ConversionError(f"curation file has no header: {path}")
@@ -650,102 +829,183 @@ def _trial_id(row: dict[str, str], fallback: int) -> str:
     return str(fallback)
 
 
-def _convert_sharedreward(path: Path) -> ConvertedRun:
+TrialValue = Callable[["_Trial"], object]
+
+
+@dataclass(frozen=True)
+class Ref:
+    """Name of a per-trial value used as an event column."""
+
+    name: str
+
+
+@dataclass(frozen=True)
+class EventPhase:
+    """One event row emitted for each trial for which ``when`` holds.
+
+    ``trial_type`` is a format template over the trial's values. ``requires``
+    names values to evaluate, in order, before the row's columns so error
+    precedence follows the task's historical validation order.
+    """
+
+    trial_type: str
+    onset: Ref
+    duration: Ref | float
+    values: Mapping[str, Ref | object] = field(default_factory=dict)
+    when: TrialValue | None = None
+    requires: tuple[str, ...] = ()
+
+
+@dataclass(frozen=True)
+class TaskSchema:
+    """Declarative description of one behavioral task's events conversion."""
+
+    label: str
+    marker_column: str
+    columns: tuple[str, ...]
+    expected_trial_count: int
+    values: Mapping[str, TrialValue]
+    requires: tuple[str, ...]
+    common: Mapping[str, Ref | object]
+    phases: tuple[EventPhase, ...]
+    terminal_fields: tuple[str, ...] = ()
+    notes: tuple[str, ...] = ()
+
+
+class _Trial:
+    """Lazily evaluated, memoized values for one source trial row."""
+
+    def __init__(
+        self, values: Mapping[str, TrialValue], row: dict[str, str], index: int
+    ):
+        self._specs = values
+        self.row = row
+        self.index = index
+        self._values: dict[str, object] = {}
+
+    def __getitem__(self, name: str) -> Any:
+        try:
+            return self._values[name]
+        except KeyError:
+            value = self._values[name] = self._specs[name](self)
+            return value
+
+
+class EventRows(Sequence[dict[str, object]]):
+    """Converted event rows stored column-wise; row dicts are built on access."""
+
+    def __init__(self, columns: Mapping[str, list[object]]):
+        self.columns = dict(columns)
+        self._length = len(next(iter(self.columns.values()), []))
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __getitem__(self, index: Any) -> Any:
+        if isinstance(index, slice):
+            return [self[position] for position in range(*index.indices(self._length))]
+        return {name: values[index] for name, values in self.columns.items()}
+
+
+def _source_number(column: str) -> TrialValue:
+    return lambda trial: _number(trial.row.get(column), column)
+
+
+def _source_integer(column: str) -> TrialValue:
+    return lambda trial: _integer(trial.row.get(column), column)
+
+
+def _coded(code: str, mapping: Mapping[int, str], message: str) -> TrialValue:
+    def lookup(trial: _Trial) -> str:
+        label = mapping.get(trial[code])
+        if label is None:
+            raise ConversionError(message.format_map(_TemplateValues(trial)))
+        return label
+
+    return lookup
+
+
+def _interval(start: str, stop: str, name: str) -> TrialValue:
+    return lambda trial: _duration(trial[start], trial[stop], name)
+
+
+class _TemplateValues(dict):
+    """``str.format_map`` adapter that resolves names through a trial."""
+
+    def __init__(self, trial: _Trial):
+        super().__init__()
+        self.trial = trial
+
+    def __missing__(self, name: str) -> object:
+        return self.trial[name]
+
+
+def _resolve(value: Ref | object, trial: _Trial) -> object:
+    return trial[value.name] if isinstance(value, Ref) else value
+
+
+def _format_template(template: str, trial: _Trial) -> str:
+    return template.format_map(_TemplateValues(trial))
+
+
+CompiledPhase = tuple[TrialValue | None, tuple[str, ...], tuple[TrialValue, ...]]
+
+
+def _compile_phase(schema: TaskSchema, phase: EventPhase) -> CompiledPhase:
+    """Resolve one phase to a getter per output column, in column order."""
+    sources: dict[str, Ref | object] = {
+        **schema.common,
+        **phase.values,
+        "onset": phase.onset,
+        "duration": phase.duration,
+    }
+    getters: list[TrialValue] = []
+    for column in schema.columns:
+        if column == "trial_type":
+            getters.append(partial(_format_template, phase.trial_type))
+        else:
+            getters.append(partial(_resolve, sources[column]))
+    return phase.when, phase.requires, tuple(getters)
+
+
+def _convert_with_schema(schema: TaskSchema, path: Path) -> ConvertedRun:
     source_rows, placeholders, incomplete_terminal = _trial_rows(
-        _read_delimited(path, ","), "decision_onset", "Shared Reward"
+        _read_source_table(path, ","), schema.marker_column, schema.label
     )
-    output: list[dict[str, object]] = []
+    phases = [_compile_phase(schema, phase) for phase in schema.phases]
+    columns: dict[str, list[object]] = {name: [] for name in schema.columns}
     trial_count = 0
-    partner_map = {1: "computer", 2: "stranger", 3: "friend"}
-    feedback_map = {1: "punish", 2: "neutral", 3: "reward"}
-    face_map = {1: "computer_non-face", 2: "stranger_face", 3: "friend_face"}
     for index, row in enumerate(source_rows, start=1):
         if (
-            index == len(source_rows)
+            schema.terminal_fields
+            and index == len(source_rows)
             and _explicitly_started(row)
-            and any(
-                _missing_number(row, name)
-                for name in ("resp", "outcome_onset", "outcome_offset")
-            )
+            and any(_missing_number(row, name) for name in schema.terminal_fields)
         ):
             incomplete_terminal += 1
             continue
-        checkpoint = len(output)
+        trial = _Trial(schema.values, row, index)
+        emitted: list[list[object]] = []
         try:
-            decision_onset = _number(row.get("decision_onset"), "decision_onset")
-            outcome_onset = _number(row.get("outcome_onset"), "outcome_onset")
-            outcome_offset = _number(row.get("outcome_offset"), "outcome_offset")
-            response = _number(row.get("resp"), "resp")
-            partner_code = _integer(row.get("Partner"), "Partner")
-            feedback_code = _integer(row.get("Feedback"), "Feedback")
-            if partner_code not in partner_map or feedback_code not in feedback_map:
-                raise ConversionError("unknown Shared Reward partner or feedback code")
-            partner = partner_map[partner_code]
-            trial_id = _trial_id(row, index)
-            outcome_duration = _duration(
-                outcome_onset, outcome_offset, "Shared Reward outcome duration"
-            )
-            if response <= 0:
-                common = {
-                    "response_time": "n/a",
-                    "partner": partner,
-                    "feedback": "n/a",
-                    "trial_id": trial_id,
-                }
-                output.append(
-                    {
-                        "onset": decision_onset,
-                        "duration": _duration(
-                            decision_onset,
-                            outcome_onset,
-                            "Shared Reward missed-decision duration",
-                        ),
-                        "trial_type": "missed_decision",
-                        **common,
-                    }
-                )
-                output.append(
-                    {
-                        "onset": outcome_onset,
-                        "duration": outcome_duration,
-                        "trial_type": "missed_outcome",
-                        **common,
-                    }
-                )
-            else:
-                response_time = _number(row.get("rt"), "rt")
-                feedback = feedback_map[feedback_code]
-                common = {
-                    "response_time": response_time,
-                    "partner": partner,
-                    "feedback": feedback,
-                    "trial_id": trial_id,
-                }
-                output.append(
-                    {
-                        "onset": decision_onset,
-                        "duration": response_time,
-                        "trial_type": face_map[partner_code],
-                        **common,
-                    }
-                )
-                output.append(
-                    {
-                        "onset": outcome_onset,
-                        "duration": outcome_duration,
-                        "trial_type": f"event_{partner}_{feedback}",
-                        **common,
-                    }
-                )
+            for name in schema.requires:
+                trial[name]
+            for when, requires, getters in phases:
+                if when is not None and not when(trial):
+                    continue
+                for name in requires:
+                    trial[name]
+                emitted.append([getter(trial) for getter in getters])
         except ConversionError as exc:
-            del output[checkpoint:]
             raise ConversionError(
-                f"Shared Reward source row {_source_line(row, index)} is invalid: {exc}"
+                f"{schema.label} source row {_source_line(row, index)} is invalid: {exc}"
             ) from exc
+        for values in emitted:
+            for name, value in zip(schema.columns, values):
+                columns[name].append(value)
         trial_count += 1
-    if not output:
-        raise ConversionError("no usable Shared Reward trials")
-    notes: list[str] = []
+    if not columns[schema.columns[0]]:
+        raise ConversionError(f"no usable {schema.label} trials")
+    notes = list(schema.notes)
     if placeholders:
         notes.append(f"omitted {placeholders} explicit ran=0 placeholder row(s)")
     if incomplete_terminal:
@@ -753,146 +1013,234 @@ def _convert_sharedreward(path: Path) -> ConvertedRun:
             f"omitted {incomplete_terminal} terminal interrupted trial row(s)"
         )
     return ConvertedRun(
-        output,
-        (
-            "onset",
-            "duration",
-            "trial_type",
-            "response_time",
-            "partner",
-            "feedback",
-            "trial_id",
-        ),
+        EventRows(columns),
+        schema.columns,
         trial_count,
-        expected_trial_count=54,
+        expected_trial_count=schema.expected_trial_count,
         notes=notes,
     )
 
 
-def _convert_trust(path: Path) -> ConvertedRun:
-    source_rows, placeholders, incomplete_terminal = _trial_rows(
-        _read_delimited(path, ","), "onset", "Trust"
-    )
-    output: list[dict[str, object]] = []
-    trial_count = 0
-    partner_map = {1: "computer", 2: "stranger", 3: "friend"}
-    for index, row in enumerate(source_rows, start=1):
-        checkpoint = len(output)
-        try:
-            onset = _number(row.get("onset"), "onset")
-            response = _number(row.get("resp"), "resp")
-            partner_code = _integer(row.get("Partner"), "Partner")
-            if partner_code not in partner_map:
-                raise ConversionError("unknown Trust partner code")
-            partner = partner_map[partner_code]
-            left = _integer(row.get("cLeft"), "cLeft")
-            right = _integer(row.get("cRight"), "cRight")
-            low, high = min(left, right), max(left, right)
-            trial_id = _trial_id(row, index)
-            if response == 999:
-                isi_onset_text = row.get("ISI_onset", "").strip()
-                if isi_onset_text:
-                    decision_duration = _duration(
-                        onset,
-                        _number(isi_onset_text, "ISI_onset"),
-                        "Trust missed-decision duration",
-                    )
-                else:
-                    decision_duration = 3.0
-                output.append(
-                    {
-                        "onset": onset,
-                        "duration": decision_duration,
-                        "trial_type": "missed_trial",
-                        "response_time": "n/a",
-                        "trust_value": "n/a",
-                        "choice": "n/a",
-                        "cLow": low,
-                        "cHigh": high,
-                        "partner": partner,
-                        "reciprocate": "n/a",
-                        "trial_id": trial_id,
-                    }
-                )
-            else:
-                response_time = _number(row.get("rt"), "rt")
-                choice = row.get("highlow", "").strip().lower()
-                if choice not in {"high", "low"}:
-                    choice = "n/a"
-                common = {
-                    "response_time": response_time,
-                    "trust_value": int(response),
-                    "choice": choice,
-                    "cLow": low,
-                    "cHigh": high,
-                    "partner": partner,
-                    "trial_id": trial_id,
-                }
-                output.append(
-                    {
-                        "onset": onset,
-                        "duration": response_time,
-                        "trial_type": f"choice_{partner}",
-                        "reciprocate": "n/a",
-                        **common,
-                    }
-                )
-                if response > 0:
-                    outcome_onset = _number(row.get("outcome_onset"), "outcome_onset")
-                    outcome_offset = _number(
-                        row.get("outcome_offset"), "outcome_offset"
-                    )
-                    reciprocate = _integer(row.get("Reciprocate"), "Reciprocate")
-                    if reciprocate not in {0, 1}:
-                        raise ConversionError("unknown Trust reciprocation code")
-                    outcome_label = "recip" if reciprocate else "defect"
-                    output.append(
-                        {
-                            "onset": outcome_onset,
-                            "duration": _duration(
-                                outcome_onset, outcome_offset, "Trust outcome duration"
-                            ),
-                            "trial_type": f"outcome_{partner}_{outcome_label}",
-                            "reciprocate": outcome_label,
-                            **common,
-                        }
-                    )
-        except ConversionError as exc:
-            del output[checkpoint:]
-            raise ConversionError(
-                f"Trust source row {_source_line(row, index)} is invalid: {exc}"
-            ) from exc
-        trial_count += 1
-    if not output:
-        raise ConversionError("no usable Trust trials")
-    notes: list[str] = []
-    if placeholders:
-        notes.append(f"omitted {placeholders} explicit ran=0 placeholder row(s)")
-    if incomplete_terminal:
-        notes.append(
-            f"omitted {incomplete_terminal} terminal interrupted trial row(s)"
-        )
-    return ConvertedRun(
-        output,
-        (
-            "onset",
-            "duration",
-            "trial_type",
-            "response_time",
-            "trust_value",
-            "choice",
-            "cLow",
-            "cHigh",
-            "partner",
-            "reciprocate",
-            "trial_id",
+def _trial_id_value(trial: _Trial) -> str:
+    return _trial_id(trial.row, trial.index)
+
+
+def _sharedreward_missed(trial: _Trial) -> bool:
+    return trial["response"] <= 0
+
+
+PARTNER_LABELS = {1: "computer", 2: "stranger", 3: "friend"}
+
+SHAREDREWARD_SCHEMA = TaskSchema(
+    label="Shared Reward",
+    marker_column="decision_onset",
+    columns=(
+        "onset",
+        "duration",
+        "trial_type",
+        "response_time",
+        "partner",
+        "feedback",
+        "trial_id",
+    ),
+    expected_trial_count=54,
+    values={
+        "decision_onset": _source_number("decision_onset"),
+        "outcome_onset": _source_number("outcome_onset"),
+        "outcome_offset": _source_number("outcome_offset"),
+        "response": _source_number("resp"),
+        "partner_code": _source_integer("Partner"),
+        "feedback_code": _source_integer("Feedback"),
+        "partner": _coded(
+            "partner_code",
+            PARTNER_LABELS,
+            "unknown Shared Reward partner or feedback code",
         ),
-        trial_count,
-        expected_trial_count=42,
-        notes=notes,
+        "feedback": _coded(
+            "feedback_code",
+            {1: "punish", 2: "neutral", 3: "reward"},
+            "unknown Shared Reward partner or feedback code",
+        ),
+        "face": _coded(
+            "partner_code",
+            {1: "computer_non-face", 2: "stranger_face", 3: "friend_face"},
+            "unknown Shared Reward partner or feedback code",
+        ),
+        "trial_id": _trial_id_value,
+        "outcome_duration": _interval(
+            "outcome_onset", "outcome_offset", "Shared Reward outcome duration"
+        ),
+        "missed_duration": _interval(
+            "decision_onset", "outcome_onset", "Shared Reward missed-decision duration"
+        ),
+        "response_time": _source_number("rt"),
+    },
+    requires=(
+        "decision_onset",
+        "outcome_onset",
+        "outcome_offset",
+        "response",
+        "partner_code",
+        "feedback_code",
+        "partner",
+        "feedback",
+        "outcome_duration",
+    ),
+    common={"partner": Ref("partner"), "trial_id": Ref("trial_id")},
+    phases=(
+        EventPhase(
+            "missed_decision",
+            Ref("decision_onset"),
+            Ref("missed_duration"),
+            {"response_time": "n/a", "feedback": "n/a"},
+            when=_sharedreward_missed,
+        ),
+        EventPhase(
+            "missed_outcome",
+            Ref("outcome_onset"),
+            Ref("outcome_duration"),
+            {"response_time": "n/a", "feedback": "n/a"},
+            when=_sharedreward_missed,
+        ),
+        EventPhase(
+            "{face}",
+            Ref("decision_onset"),
+            Ref("response_time"),
+            {"response_time": Ref("response_time"), "feedback": Ref("feedback")},
+            when=lambda trial: not _sharedreward_missed(trial),
+        ),
+        EventPhase(
+            "event_{partner}_{feedback}",
+            Ref("outcome_onset"),
+            Ref("outcome_duration"),
+            {"response_time": Ref("response_time"), "feedback": Ref("feedback")},
+            when=lambda trial: not _sharedreward_missed(trial),
+        ),
+    ),
+    terminal_fields=("resp", "outcome_onset", "outcome_offset"),
+)
+
+
+def _trust_missed_duration(trial: _Trial) -> float:
+    isi_onset_text = trial.row.get("ISI_onset", "").strip()
+    if not isi_onset_text:
+        return 3.0
+    return _duration(
+        trial["onset"],
+        _number(isi_onset_text, "ISI_onset"),
+        "Trust missed-decision duration",
     )
 
 
+def _trust_choice(trial: _Trial) -> str:
+    choice = trial.row.get("highlow", "").strip().lower()
+    return choice if choice in {"high", "low"} else "n/a"
+
+
+def _missed_999(trial: _Trial) -> bool:
+    return trial["response"] == 999
+
+
+def _responded_999(trial: _Trial) -> bool:
+    return trial["response"] != 999
+
+
+TRUST_CHOICE_VALUES = {
+    "response_time": Ref("response_time"),
+    "trust_value": Ref("trust_value"),
+    "choice": Ref("choice"),
+}
+
+TRUST_SCHEMA = TaskSchema(
+    label="Trust",
+    marker_column="onset",
+    columns=(
+        "onset",
+        "duration",
+        "trial_type",
+        "response_time",
+        "trust_value",
+        "choice",
+        "cLow",
+        "cHigh",
+        "partner",
+        "reciprocate",
+        "trial_id",
+    ),
+    expected_trial_count=42,
+    values={
+        "onset": _source_number("onset"),
+        "response": _source_number("resp"),
+        "partner_code": _source_integer("Partner"),
+        "partner": _coded(
+            "partner_code", PARTNER_LABELS, "unknown Trust partner code"
+        ),
+        "left": _source_integer("cLeft"),
+        "right": _source_integer("cRight"),
+        "low": lambda trial: min(trial["left"], trial["right"]),
+        "high": lambda trial: max(trial["left"], trial["right"]),
+        "trial_id": _trial_id_value,
+        "missed_duration": _trust_missed_duration,
+        "response_time": _source_number("rt"),
+        "trust_value": lambda trial: int(trial["response"]),
+        "choice": _trust_choice,
+        "outcome_onset": _source_number("outcome_onset"),
+        "outcome_offset": _source_number("outcome_offset"),
+        "reciprocate_code": _source_integer("Reciprocate"),
+        "reciprocate": _coded(
+            "reciprocate_code",
+            {0: "defect", 1: "recip"},
+            "unknown Trust reciprocation code",
+        ),
+        "outcome_duration": _interval(
+            "outcome_onset", "outcome_offset", "Trust outcome duration"
+        ),
+    },
+    requires=("onset", "response", "partner_code", "partner", "left", "right"),
+    common={
+        "cLow": Ref("low"),
+        "cHigh": Ref("high"),
+        "partner": Ref("partner"),
+        "trial_id": Ref("trial_id"),
+    },
+    phases=(
+        EventPhase(
+            "missed_trial",
+            Ref("onset"),
+            Ref("missed_duration"),
+            {
+                "response_time": "n/a",
+                "trust_value": "n/a",
+                "choice": "n/a",
+                "reciprocate": "n/a",
+            },
+            when=_missed_999,
+        ),
+        EventPhase(
+            "choice_{partner}",
+            Ref("onset"),
+            Ref("response_time"),
+            {**TRUST_CHOICE_VALUES, "reciprocate": "n/a"},
+            when=_responded_999,
+            requires=("response_time", "choice"),
+        ),
+        EventPhase(
+            "outcome_{partner}_{reciprocate}",
+            Ref("outcome_onset"),
+            Ref("outcome_duration"),
+            {**TRUST_CHOICE_VALUES, "reciprocate": Ref("reciprocate")},
+            when=lambda trial: _responded_999(trial) and trial["response"] > 0,
+            requires=(
+                "outcome_onset",
+                "outcome_offset",
+                "reciprocate_code",
+                "reciprocate",
+            ),
+        ),
+    ),
+)
+
+
 def _ugr_decision(response: int, left: int, right: int) -> str:
     if response == 1:
         return "accept" if left > 0 else "reject"
@@ -901,172 +1249,182 @@ def _ugr_decision(response: int, left: int, right: int) -> str:
     return "n/a"
 
 
-def _convert_ugr(path: Path) -> ConvertedRun:
-    source_rows, placeholders, incomplete_terminal = _trial_rows(
-        _read_delimited(path, ","), "decision_onset", "UGR"
-    )
-    output: list[dict[str, object]] = []
-    trial_count = 0
-    for index, row in enumerate(source_rows, start=1):
-        checkpoint = len(output)
-        try:
-            decision_onset = _number(row.get("decision_onset"), "decision_onset")
-            isi = _number(row.get("ISI"), "ISI")
-            block = _integer(row.get("Block"), "Block")
-            sociality = {2: "nonsocial", 3: "social"}.get(block)
-            if sociality is None:
-                raise ConversionError(f"unknown UGR Block code: {block}")
-            endowment = _integer(row.get("Endowment"), "Endowment")
-            left = _integer(row.get("L_Option"), "L_Option")
-            right = _integer(row.get("R_Option"), "R_Option")
-            offer = max(left, right)
-            response = _integer(row.get("resp"), "resp")
-            trial_id = _trial_id(row, index)
-            partner_cue_onset = decision_onset - isi - 1.5
-            if partner_cue_onset < 0:
-                raise ConversionError("reconstructed UGR partner cue onset is negative")
-            decision = _ugr_decision(response, left, right)
-            common = {
-                "trial_id": trial_id,
-                "sociality": sociality,
-                "endowment": endowment,
-                "offer": offer,
-                "decision": decision,
-                "response": response if response in {1, 2} else "n/a",
-                "left_option": left,
-                "right_option": right,
-            }
-            output.append(
-                {
-                    "onset": partner_cue_onset,
-                    "duration": 0.5,
-                    "trial_type": "partner_cue",
-                    "response_time": "n/a",
-                    "phase": "partner_cue",
-                    "timing_source": "reconstructed_from_decision_onset_and_isi",
-                    **common,
-                }
-            )
-            endowment_onset = partner_cue_onset + 0.5
-            output.append(
-                {
-                    "onset": endowment_onset,
-                    "duration": _duration(
-                        endowment_onset,
-                        decision_onset,
-                        "UGR endowment display duration",
-                    ),
-                    "trial_type": "endowment",
-                    "response_time": "n/a",
-                    "phase": "endowment",
-                    "timing_source": "reconstructed_visible_interval",
-                    **common,
-                }
-            )
-            decision_offset = _number(row.get("decision_offset"), "decision_offset")
-            if response == 999:
-                decision_duration = _duration(
-                    decision_onset, decision_offset, "UGR missed-decision duration"
-                )
-                output.append(
-                    {
-                        "onset": decision_onset,
-                        "duration": decision_duration,
-                        "trial_type": "missed_decision",
-                        "response_time": "n/a",
-                        "phase": "decision",
-                        "timing_source": "logged_boundaries",
-                        **common,
-                    }
-                )
-                output.append(
-                    {
-                        "onset": decision_offset,
-                        "duration": 0.5,
-                        "trial_type": "missed_feedback",
-                        "response_time": "n/a",
-                        "phase": "missed_feedback",
-                        "timing_source": "reconstructed_from_task_sequence",
-                        **common,
-                    }
-                )
-            else:
-                if response not in {1, 2}:
-                    raise ConversionError(f"unknown UGR response code: {response}")
-                response_time = _number(row.get("rt"), "rt")
-                response_onset = _number(row.get("resp_onset"), "resp_onset")
-                output.append(
-                    {
-                        "onset": decision_onset,
-                        "duration": response_time,
-                        "trial_type": "decision",
-                        "response_time": response_time,
-                        "phase": "decision",
-                        "timing_source": "logged",
-                        **common,
-                    }
-                )
-                output.append(
-                    {
-                        "onset": response_onset,
-                        "duration": _duration(
-                            response_onset,
-                            decision_offset,
-                            "UGR choice-feedback duration",
-                        ),
-                        "trial_type": "choice_feedback",
-                        "response_time": response_time,
-                        "phase": "choice_feedback",
-                        "timing_source": "logged_boundaries",
-                        **common,
-                    }
-                )
-        except ConversionError as exc:
-            del output[checkpoint:]
-            raise ConversionError(
-                f"UGR source row {_source_line(row, index)} is invalid: {exc}"
-            ) from exc
-        trial_count += 1
-    if not output:
-        raise ConversionError("no usable UGR trials")
-    return ConvertedRun(
-        output,
-        (
-            "onset",
-            "duration",
-            "trial_type",
-            "response_time",
-            "trial_id",
-            "phase",
-            "sociality",
+def _ugr_partner_cue_onset(trial: _Trial) -> float:
+    onset = trial["decision_onset"] - trial["isi"] - 1.5
+    if onset < 0:
+        raise ConversionError("reconstructed UGR partner cue onset is negative")
+    return onset
+
+
+def _ugr_response_code(trial: _Trial) -> int:
+    response = trial["response"]
+    if response not in {1, 2}:
+        raise ConversionError(f"unknown UGR response code: {response}")
+    return response
+
+
+
+UGR_SCHEMA = TaskSchema(
+    label="UGR",
+    marker_column="decision_onset",
+    columns=(
+        "onset",
+        "duration",
+        "trial_type",
+        "response_time",
+        "trial_id",
+        "phase",
+        "sociality",
+        "endowment",
+        "offer",
+        "decision",
+        "response",
+        "left_option",
+        "right_option",
+        "timing_source",
+    ),
+    expected_trial_count=48,
+    values={
+        "decision_onset": _source_number("decision_onset"),
+        "isi": _source_number("ISI"),
+        "block": _source_integer("Block"),
+        "sociality": _coded(
+            "block", {2: "nonsocial", 3: "social"}, "unknown UGR Block code: {block}"
+        ),
+        "endowment": _source_integer("Endowment"),
+        "left": _source_integer("L_Option"),
+        "right": _source_integer("R_Option"),
+        "offer": lambda trial: max(trial["left"], trial["right"]),
+        "response": _source_integer("resp"),
+        "trial_id": _trial_id_value,
+        "partner_cue_onset": _ugr_partner_cue_onset,
+        "decision": lambda trial: _ugr_decision(
+            trial["response"], trial["left"], trial["right"]
+        ),
+        "response_label": lambda trial: (
+            trial["response"] if trial["response"] in {1, 2} else "n/a"
+        ),
+        "endowment_onset": lambda trial: trial["partner_cue_onset"] + 0.5,
+        "endowment_duration": _interval(
+            "endowment_onset", "decision_onset", "UGR endowment display duration"
+        ),
+        "decision_offset": _source_number("decision_offset"),
+        "missed_duration": _interval(
+            "decision_onset", "decision_offset", "UGR missed-decision duration"
+        ),
+        "response_code": _ugr_response_code,
+        "response_time": _source_number("rt"),
+        "response_onset": _source_number("resp_onset"),
+        "feedback_duration": _interval(
+            "response_onset", "decision_offset", "UGR choice-feedback duration"
+        ),
+    },
+    requires=(
+        "decision_onset",
+        "isi",
+        "block",
+        "sociality",
+        "endowment",
+        "left",
+        "right",
+        "offer",
+        "response",
+        "partner_cue_onset",
+        "decision",
+    ),
+    common={
+        "trial_id": Ref("trial_id"),
+        "sociality": Ref("sociality"),
+        "endowment": Ref("endowment"),
+        "offer": Ref("offer"),
+        "decision": Ref("decision"),
+        "response": Ref("response_label"),
+        "left_option": Ref("left"),
+        "right_option": Ref("right"),
+    },
+    phases=(
+        EventPhase(
+            "partner_cue",
+            Ref("partner_cue_onset"),
+            0.5,
+            {
+                "response_time": "n/a",
+                "phase": "partner_cue",
+                "timing_source": "reconstructed_from_decision_onset_and_isi",
+            },
+        ),
+        EventPhase(
             "endowment",
-            "offer",
+            Ref("endowment_onset"),
+            Ref("endowment_duration"),
+            {
+                "response_time": "n/a",
+                "phase": "endowment",
+                "timing_source": "reconstructed_visible_interval",
+            },
+        ),
+        EventPhase(
+            "missed_decision",
+            Ref("decision_onset"),
+            Ref("missed_duration"),
+            {
+                "response_time": "n/a",
+                "phase": "decision",
+                "timing_source": "logged_boundaries",
+            },
+            when=_missed_999,
+            requires=("decision_offset",),
+        ),
+        EventPhase(
+            "missed_feedback",
+            Ref("decision_offset"),
+            0.5,
+            {
+                "response_time": "n/a",
+                "phase": "missed_feedback",
+                "timing_source": "reconstructed_from_task_sequence",
+            },
+            when=_missed_999,
+        ),
+        EventPhase(
             "decision",
-            "response",
-            "left_option",
-            "right_option",
-            "timing_source",
+            Ref("decision_onset"),
+            Ref("response_time"),
+            {
+                "response_time": Ref("response_time"),
+                "phase": "decision",
+                "timing_source": "logged",
+            },
+            when=_responded_999,
+            requires=(
+                "decision_offset",
+                "response_code",
+                "response_time",
+                "response_onset",
+            ),
         ),
-        trial_count,
-        expected_trial_count=48,
-        notes=(
-            [
-                "Historical cue_Onset was overwritten each frame; partner-cue timing is reconstructed."
-            ]
-            + (
-                [f"omitted {placeholders} explicit ran=0 placeholder row(s)"]
-                if placeholders
-                else []
-            )
-            + (
-                [
-                    f"omitted {incomplete_terminal} terminal interrupted trial row(s)"
-                ]
-                if incomplete_terminal
-                else []
-            )
+        EventPhase(
+            "choice_feedback",
+            Ref("response_onset"),
+            Ref("feedback_duration"),
+            {
+                "response_time": Ref("response_time"),
+                "phase": "choice_feedback",
+                "timing_source": "logged_boundaries",
+            },
+            when=_responded_999,
         ),
-    )
+    ),
+    notes=(
+        "Historical cue_Onset was overwritten each frame; partner-cue timing is reconstructed.",
+    ),
+)
+
+TASK_SCHEMAS = {
+    "sharedreward": SHAREDREWARD_SCHEMA,
+    "trust": TRUST_SCHEMA,
+    "ugr": UGR_SCHEMA,
+}
 
 
 def _convert_socialdoors(path: Path) -> ConvertedRun:
@@ -1110,12 +1468,8 @@ def _convert_socialdoors(path: Path) -> ConvertedRun:
 
 
 def convert_source(task: str, path: Path) -> ConvertedRun:
-    if task == "sharedreward":
-        converted = _convert_sharedreward(path)
-    elif task == "trust":
-        converted = _convert_trust(path)
-    elif task == "ugr":
-        converted = _convert_ugr(path)
+    if task in TASK_SCHEMAS:
+        converted = _convert_with_schema(TASK_SCHEMAS[task], path)
     elif task in {"socialdoors", "doors"}:
         converted = _convert_socialdoors(path)
     else:
@@ -1125,18 +1479,60 @@ def convert_source(task: str, path: Path) -> ConvertedRun:
     return converted
 
 
+def _format_float(value: float) -> str:
+    if not math.isfinite(value):
+        return "n/a"
+    text = f"{value:.6f}".rstrip("0").rstrip(".")
+    return text if text and text != "-0" else "0"
+
+
 def _format_value(value: object) -> str:
     if value is None:
         return "n/a"
     if isinstance(value, float):
-        if not math.isfinite(value):
-            return "n/a"
-        text = f"{value:.6f}".rstrip("0").rstrip(".")
-        return text if text and text != "-0" else "0"
+        return _format_float(value)
     text = str(value).strip()
     return text if text else "n/a"
 
 
+def _format_timing(value: object) -> str:
+    # Converters always emit onset and duration as floats; anything else
+    # still gets the general rules.
+    return _format_float(value) if type(value) is float else _format_value(value)
+
+
+EVENT_COLUMN_FORMATTERS = {"onset": _format_timing, "duration": _format_timing}
+
+
+def _event_records(converted: ConvertedRun) -> Iterable[tuple[str, ...]]:
+    formatters = [
+        EVENT_COLUMN_FORMATTERS.get(column, _format_value) for column in converted.columns
+    ]
+    rows = converted.rows
+    if isinstance(rows, EventRows):
+        missing = [None] * len(rows)
+        return zip(
+            *(
+                list(map(formatter, rows.columns.get(column, missing)))
+                for column, formatter in zip(converted.columns, formatters)
+            )
+        )
+    return tsv_records(
+        rows, converted.columns, dict(zip(converted.columns, formatters))
+    )
+
+
+def render_events(converted: ConvertedRun) -> bytes:
+    """Return the exact bytes of the canonical events TSV for ``converted``."""
+    buffer = io.StringIO(newline="")
+    write_tsv_records(buffer, converted.columns, _event_records(converted))
+    return buffer.getvalue().encode("utf-8")
+
+
+def events_sha256(converted: ConvertedRun) -> str:
+    return hashlib.sha256(render_events(converted)).hexdigest()
+
+
 def _atomic_write_tsv(
     path: Path,
     converted: ConvertedRun,
@@ -1148,25 +1544,29 @@ def _atomic_write_tsv(
     if dry_run:
         return
     path.parent.mkdir(parents=True, exist_ok=True)
+    content = render_events(converted)
     fd, temporary = tempfile.mkstemp(prefix=f".{path.name}.", dir=path.parent)
     try:
-        with os.fdopen(fd, "w", encoding="utf-8", newline="") as handle:
-            writer = csv.DictWriter(
-                handle,
-                fieldnames=converted.columns,
-                delimiter="\t",
-                lineterminator="\n",
-                extrasaction="ignore",
-            )
-            writer.writeheader()
-            for row in converted.rows:
-                writer.writerow(
-                    {name: _format_value(row.get(name)) for name in converted.columns}
-                )
+        with os.fdopen(fd, "wb") as handle:
+            handle.write(content)
         os.replace(temporary, path)
     finally:
         if os.path.exists(temporary):
             os.unlink(temporary)
+    stat = path.stat()
+    record_events_digest(
+        path,
+        {
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "sha256": hashlib.sha256(content).hexdigest(),
+            "source_sha256": converted.source_sha256,
+            "trial_fingerprint": converted.trial_fingerprint,
+            "rows": len(converted.rows),
+            "trials": converted.trial_count,
+            "columns": list(converted.columns),
+        },
+    )
 
 
 def _sidecars() -> dict[str, dict[str, object]]:
@@ -1338,6 +1738,9 @@ def preserve_existing_events(
         if not dry_run:
             target.parent.mkdir(parents=True, exist_ok=True)
             shutil.copy2(source, target)
+            entry = read_events_digests(source.parent).get(source.name)
+            if entry is not None:
+                record_events_digest(target, entry)
     return copied
 
 
@@ -1365,23 +1768,27 @@ def convert_behavior(
     preserve_from: Path | None = None,
     curation_file: Path | None = None,
     runs: Sequence[int] | None = None,
+    approvals: dict[CurationKey, CurationApproval] | None = None,
 ) -> int:
-    try:
-        approvals = load_curation_approvals(curation_file)
-    except (ConversionError, OSError, csv.Error) as exc:
-        print(f"CONVERSION FAILED curation file: {exc}")
-        return 1
+    if approvals is None:
+        try:
+            approvals = load_curation_approvals(curation_file)
+        except (ConversionError, OSError, csv.Error) as exc:
+            print(f"CONVERSION FAILED curation file: {exc}")
+            return 1
     keys = discover_bold_runs(bids_root, subject, session, tasks)
     if runs is not None:
         selected_runs = set(runs)
         keys = [key for key in keys if key.run in selected_runs]
+    written = 0
     if preserve_from is not None:
-        preserve_existing_events(bids_root, preserve_from, keys, dry_run)
+        written += preserve_existing_events(bids_root, preserve_from, keys, dry_run)
     if not keys:
         print(f"BOLD MISSING sub-{subject} ses-{session}: no selected task runs")
         return 1 if runs is not None else 0
 
     failed = 0
+    source_listings: dict[Path, list[Path]] = {}
     for task in tasks:
         task_keys = [key for key in keys if key.task == task]
         if not task_keys:
@@ -1393,6 +1800,7 @@ def convert_behavior(
             task,
             [key.run for key in task_keys],
             approvals,
+            source_listings,
         )
         for key in task_keys:
             resolution = resolutions[key.run]
@@ -1425,6 +1833,7 @@ def convert_behavior(
                     failed = 1
                     continue
                 _atomic_write_tsv(destination, converted, overwrite, dry_run)
+                written += 1
             except (ConversionError, OSError, csv.Error) as exc:
                 print(f"CONVERSION FAILED {key.event_name}: {exc}")
                 failed = 1
@@ -1457,14 +1866,30 @@ def convert_behavior(
         except ConversionError as exc:
             print(f"CONVERSION FAILED sidecars: {exc}")
             failed = 1
+    if written and not dry_run:
+        func_dir = bids_root / f"sub-{subject}" / f"ses-{session}" / "func"
+        try:
+            update_events_manifest(bids_root, [func_dir])
+        except OSError as exc:
+            print(f"CONVERSION FAILED events manifest: {exc}")
+            failed = 1
     return failed
 
 
 def build_parser() -> argparse.ArgumentParser:
     project_root = Path(__file__).resolve().parents[1]
     parser = argparse.ArgumentParser(description=__doc__)
-    parser.add_argument("--subject", required=True, type=normalize_subject)
-    parser.add_argument("--session", required=True, type=normalize_session)
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument("--subject", type=normalize_subject)
+    group.add_argument("--sublist", type=Path)
+    parser.add_argument(
+        "--session",
+        action="append",
+        required=True,
+        type=normalize_session,
+        dest="sessions",
+        help="session to convert; repeat to convert several",
+    )
     parser.add_argument("--tasks", nargs="+", default=list(TASKS))
     parser.add_argument(
         "--run",
@@ -1494,22 +1919,75 @@ def build_parser() -> argparse.ArgumentParser:
     )
     parser.add_argument("--dry-run", action="store_true")
     parser.add_argument("--overwrite", action="store_true")
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help="subject/sessions to convert concurrently",
+    )
     return parser
 
 
+def _convert_item(
+    item: tuple[str, str],
+    tasks: Sequence[str],
+    behavior_root: Path,
+    bids_root: Path,
+    session_approvals: dict[tuple[str, str], dict[CurationKey, CurationApproval]],
+    capture: bool = True,
+    **options: Any,
+) -> tuple[str, int]:
+    """Convert one subject/session, returning its report and failure status.
+
+    Any exception fails only this item: its traceback is reported in place of
+    the remaining output. With ``capture=False`` the report is printed as it
+    is produced and the returned text is empty.
+    """
+    subject, session = item
+    output = io.StringIO()
+    with redirect_stdout(output) if capture else nullcontext():
+        try:
+            failed = convert_behavior(
+                subject,
+                session,
+                tasks,
+                behavior_root,
+                bids_root,
+                approvals=session_approvals.get(item, {}),
+                **options,
+            )
+        except Exception:  # noqa: BLE001 - one bad subject must not stop the batch.
+            print(f"CONVERSION FAILED sub-{subject} ses-{session}: unexpected error")
+            print(traceback.format_exc(), end="")
+            failed = 1
+    return output.getvalue(), failed
+
+
 def main(argv: Sequence[str] | None = None) -> int:
     parser = build_parser()
     args = parser.parse_args(argv)
+    if args.jobs < 1:
+        parser.error("--jobs must be at least 1")
     try:
         tasks = parse_tasks(args.tasks)
     except argparse.ArgumentTypeError as exc:
         parser.error(str(exc))
-    return convert_behavior(
-        args.subject,
-        args.session,
-        tasks,
-        args.behavior_root.resolve(),
-        args.bids_root.resolve(),
+    try:
+        approvals = load_curation_approvals(
+            args.curation_file.resolve() if args.curation_file else None
+        )
+    except (ConversionError, OSError, csv.Error) as exc:
+        print(f"CONVERSION FAILED curation file: {exc}")
+        return 1
+    subjects = [args.subject] if args.subject else read_subject_list(args.sublist)
+    sessions = tuple(dict.fromkeys(args.sessions))
+    items = [(subject, session) for subject in subjects for session in sessions]
+    convert = partial(
+        _convert_item,
+        tasks=tasks,
+        behavior_root=args.behavior_root.resolve(),
+        bids_root=args.bids_root.resolve(),
+        session_approvals=approvals_by_session(approvals),
         overwrite=args.overwrite,
         dry_run=args.dry_run,
         preserve_from=(
@@ -1517,9 +1995,25 @@ def main(argv: Sequence[str] | None = None) -> int:
             if args.preserve_existing_from
             else None
         ),
-        curation_file=args.curation_file.resolve() if args.curation_file else None,
         runs=args.runs,
     )
+    failed = 0
+    if args.jobs == 1 or len(items) < 2:
+        for item in items:
+            _, item_failed = convert(item, capture=False)
+            failed = max(failed, item_failed)
+        return failed
+
+    # Loaded here so single-job runs and check_events.py skip multiprocessing.
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(max_workers=min(args.jobs, len(items))) as pool:
+        # map yields each report as soon as it and every earlier item finish,
+        # so output streams in subject order while later items still run.
+        for output, item_failed in pool.map(convert, items):
+            print(output, end="", flush=True)
+            failed = max(failed, item_failed)
+    return failed
 
 
 if __name__ == "__main__":
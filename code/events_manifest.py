@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+"""Maintain the cohort manifest of canonical BIDS events files."""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import fcntl
+import hashlib
+import json
+import os
+import re
+import tempfile
+from collections.abc import Iterable, Iterator, Sequence
+from contextlib import contextmanager
+from pathlib import Path
+
+from pipeline_utils import atomic_write_json, write_tsv_records
+
+
+EVENTS_DIGEST_RECORD = ".events-digests.json"
+EVENTS_DIGEST_LOCK = ".events-digests.lock"
+EVENTS_DIGEST_VERSION = 1
+MANIFEST_DIR = ".events-manifest"
+MANIFEST_TSV = "events.tsv"
+MANIFEST_INDEX = "index.json"
+MANIFEST_VERSION = 1
+MANIFEST_COLUMNS = (
+    "subject",
+    "session",
+    "task",
+    "run",
+    "events_file",
+    "size",
+    "mtime_ns",
+    "events_sha256",
+    "source_sha256",
+    "trial_fingerprint",
+    "rows",
+    "trials",
+    "columns",
+)
+EVENT_NAME_RE = re.compile(
+    r"^sub-(?P<subject>[^_]+)_ses-(?P<session>[^_]+)_task-(?P<task>[^_]+)_"
+    r"run-(?P<run>\d+)_events\.tsv$"
+)
+
+
+def read_events_digests(func_dir: Path) -> dict[str, dict[str, object]]:
+    """Return recorded events digests for one ``func/`` directory by file name."""
+    try:
+        record = json.loads((func_dir / EVENTS_DIGEST_RECORD).read_text())
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(record, dict) or record.get("Version") != EVENTS_DIGEST_VERSION:
+        return {}
+    runs = record.get("Runs")
+    return runs if isinstance(runs, dict) else {}
+
+
+def record_events_digest(events_path: Path, entry: dict[str, object]) -> None:
+    """Record one written events file in its ``func/`` directory's digest file.
+
+    The read-modify-write holds the directory's digest lock, so concurrent
+    converters writing runs of one session keep each other's entries.
+    """
+    with _locked(events_path.parent / EVENTS_DIGEST_LOCK):
+        runs = read_events_digests(events_path.parent)
+        runs[events_path.name] = entry
+        atomic_write_json(
+            events_path.parent / EVENTS_DIGEST_RECORD,
+            {"Version": EVENTS_DIGEST_VERSION, "Runs": runs},
+        )
+
+
+def manifest_dir(bids_root: Path) -> Path:
+    return bids_root / MANIFEST_DIR
+
+
+def _session_key(func_dir: Path) -> str:
+    return f"{func_dir.parents[1].name}/{func_dir.parent.name}"
+
+
+def _session_rows(bids_root: Path, func_dir: Path) -> list[dict[str, str]]:
+    rows: list[dict[str, str]] = []
+    for name, entry in sorted(read_events_digests(func_dir).items()):
+        match = EVENT_NAME_RE.match(name)
+        if not match:
+            continue
+        columns = entry.get("columns")
+        rows.append(
+            {
+                "subject": match.group("subject"),
+                "session": match.group("session"),
+                "task": match.group("task"),
+                "run": match.group("run"),
+                "events_file": str((func_dir / name).relative_to(bids_root)),
+                "size": str(entry.get("size", "")),
+                "mtime_ns": str(entry.get("mtime_ns", "")),
+                "events_sha256": str(entry.get("sha256", "")),
+                "source_sha256": str(entry.get("source_sha256", "")),
+                "trial_fingerprint": str(entry.get("trial_fingerprint", "")),
+                "rows": str(entry.get("rows", "")),
+                "trials": str(entry.get("trials", "")),
+                "columns": ",".join(columns) if isinstance(columns, list) else "",
+            }
+        )
+    return rows
+
+
+def _record_mtime(func_dir: Path) -> int | None:
+    try:
+        return (func_dir / EVENTS_DIGEST_RECORD).stat().st_mtime_ns
+    except OSError:
+        return None
+
+
+def read_manifest(bids_root: Path) -> tuple[dict, list[dict[str, str]]]:
+    """Return the manifest index and rows, or empty values when absent."""
+    directory = manifest_dir(bids_root)
+    try:
+        index = json.loads((directory / MANIFEST_INDEX).read_text())
+        with (directory / MANIFEST_TSV).open(newline="") as handle:
+            rows = list(csv.DictReader(handle, delimiter="\t"))
+    except (OSError, ValueError):
+        return {}, []
+    if not isinstance(index, dict) or index.get("Version") != MANIFEST_VERSION:
+        return {}, []
+    return index, rows
+
+
+@contextmanager
+def _locked(lock_path: Path) -> Iterator[None]:
+    lock_path.parent.mkdir(parents=True, exist_ok=True)
+    with lock_path.open("w") as handle:
+        fcntl.flock(handle, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(handle, fcntl.LOCK_UN)
+
+
+def _write_manifest(
+    directory: Path, rows: list[dict[str, str]], sessions: dict[str, dict]
+) -> None:
+    rows.sort(
+        key=lambda row: (row["subject"], row["session"], row["task"], int(row["run"]))
+    )
+    fd, temporary = tempfile.mkstemp(prefix=f".{MANIFEST_TSV}.", dir=directory)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8", newline="") as handle:
+            write_tsv_records(
+                handle,
+                MANIFEST_COLUMNS,
+                (tuple(row[column] for column in MANIFEST_COLUMNS) for row in rows),
+            )
+        digest = hashlib.sha256(Path(temporary).read_bytes()).hexdigest()
+        os.replace(temporary, directory / MANIFEST_TSV)
+    finally:
+        if os.path.exists(temporary):
+            os.unlink(temporary)
+    atomic_write_json(
+        directory / MANIFEST_INDEX,
+        {
+            "Version": MANIFEST_VERSION,
+            "Runs": len(rows),
+            "Sessions": dict(sorted(sessions.items())),
+            "EventsSha256": digest,
+        },
+    )
+
+
+def update_events_manifest(
+    bids_root: Path, func_dirs: Iterable[Path] | None = None
+) -> int:
+    """Refresh manifest rows for ``func_dirs``, or rebuild from every session.
+
+    Rows come from the per-session digest records written alongside each
+    events file, so no events TSV is opened. Returns the manifest run count.
+    """
+    directory = manifest_dir(bids_root)
+    rebuild = func_dirs is None
+    if func_dirs is None:
+        records = bids_root.glob(f"sub-*/ses-*/func/{EVENTS_DIGEST_RECORD}")
+        func_dirs = sorted(path.parent for path in records)
+    func_dirs = list(func_dirs)
+    with _locked(directory / ".lock"):
+        index, rows = ({}, []) if rebuild else read_manifest(bids_root)
+        sessions: dict[str, dict] = dict(index.get("Sessions", {}))
+        refreshed = {_session_key(func_dir) for func_dir in func_dirs}
+        rows = [
+            row
+            for row in rows
+            if f"sub-{row['subject']}/ses-{row['session']}" not in refreshed
+        ]
+        for func_dir in func_dirs:
+            key = _session_key(func_dir)
+            session_rows = _session_rows(bids_root, func_dir)
+            rows.extend(session_rows)
+            mtime = _record_mtime(func_dir)
+            if mtime is None:
+                sessions.pop(key, None)
+            else:
+                sessions[key] = {"record_mtime_ns": mtime, "runs": len(session_rows)}
+        _write_manifest(directory, rows, sessions)
+    return len(rows)
+
+
+def check_events_manifest(bids_root: Path) -> list[str]:
+    """Return one problem line per stale, changed, missing, or unrecorded run."""
+    index, rows = read_manifest(bids_root)
+    if not index:
+        return [f"MANIFEST MISSING {manifest_dir(bids_root)}"]
+    problems: list[str] = []
+    recorded_sessions = index.get("Sessions", {})
+    on_disk = {
+        _session_key(path.parent): path.parent
+        for path in bids_root.glob(f"sub-*/ses-*/func/{EVENTS_DIGEST_RECORD}")
+    }
+    for key in sorted(set(recorded_sessions) | set(on_disk)):
+        recorded = recorded_sessions.get(key, {}).get("record_mtime_ns")
+        current = _record_mtime(on_disk[key]) if key in on_disk else None
+        if recorded != current:
+            problems.append(f"SESSION STALE {key}")
+    recorded_files = set()
+    for row in rows:
+        path = bids_root / row["events_file"]
+        recorded_files.add(row["events_file"])
+        try:
+            stat = path.stat()
+        except OSError:
+            problems.append(f"EVENTS MISSING {row['events_file']}")
+            continue
+        current = (str(stat.st_size), str(stat.st_mtime_ns))
+        if current != (row["size"], row["mtime_ns"]):
+            problems.append(f"EVENTS CHANGED {row['events_file']}")
+    for path in sorted(bids_root.glob("sub-*/ses-*/func/*_events.tsv")):
+        relative = str(path.relative_to(bids_root))
+        if relative not in recorded_files:
+            problems.append(f"EVENTS UNRECORDED {relative}")
+    return problems
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--bids-root",
+        type=Path,
+        default=Path(__file__).resolve().parents[1] / "bids",
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    update = subparsers.add_parser("update", help="refresh one subject/session")
+    update.add_argument("subject")
+    update.add_argument("session")
+    subparsers.add_parser("rebuild", help="rebuild from every session record")
+    subparsers.add_parser("check", help="report stale, changed, or unrecorded runs")
+    args = parser.parse_args(argv)
+    bids_root = args.bids_root.resolve()
+
+    if args.command == "update":
+        subject = args.subject.removeprefix("sub-")
+        session = args.session.removeprefix("ses-")
+        func_dir = bids_root / f"sub-{subject}" / f"ses-{session}" / "func"
+        count = update_events_manifest(bids_root, [func_dir])
+        print(
+            f"Events manifest: {count} run(s) after updating "
+            f"sub-{subject} ses-{session}."
+        )
+        return 0
+    if args.command == "rebuild":
+        count = update_events_manifest(bids_root)
+        print(f"Events manifest: {count} run(s) rebuilt.")
+        return 0
+
+    problems = check_events_manifest(bids_root)
+    for line in problems:
+        print(line)
+    print(
+        f"CHECK FAILED: {len(problems)} events manifest problem(s)."
+        if problems
+        else "CHECK PASSED: events manifest matches the BIDS events files."
+    )
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -17,16 +17,18 @@ from __future__ import annotations
 
 import argparse
 import re
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 from pathlib import Path
+from typing import TYPE_CHECKING
 
-import numpy as np
-import pandas as pd
-import nibabel as nib
-import matplotlib.pyplot as plt
+if TYPE_CHECKING:
+    import nibabel as nib
 
 
 SUB_RE = re.compile(r"(sub-[a-zA-Z0-9]+)")
 SES_RE = re.compile(r"(ses-[a-zA-Z0-9]+)")
+DEFAULT_SLAB_SLICES = 16
 
 
 def parse_entities(p: Path) -> tuple[str | None, str | None]:
@@ -36,33 +38,64 @@ def parse_entities(p: Path) -> tuple[str | None, str | None]:
     return (sub.group(1) if sub else None, ses.group(1) if ses else None)
 
 
+def imaging_modules():
+    """Import imaging dependencies only when volumes are computed."""
+    import nibabel as nib
+    import numpy as np
+
+    return nib, np
+
+
+def report_modules():
+    """Import table and plotting dependencies only when results are written."""
+    import matplotlib.pyplot as plt
+    import pandas as pd
+
+    return pd, plt
+
+
 def voxel_volume_mm3(img: nib.Nifti1Image) -> float:
+    _, np = imaging_modules()
     zooms = img.header.get_zooms()[:3]
     return float(np.prod(zooms))
 
 
-def compute_from_probsegs(gm_path: Path, wm_path: Path, csf_path: Path) -> float:
-    gm_img = nib.load(str(gm_path))
-    wm_img = nib.load(str(wm_path))
-    csf_img = nib.load(str(csf_path))
+def compute_from_probsegs(
+    gm_path: Path,
+    wm_path: Path,
+    csf_path: Path,
+    slab_slices: int = DEFAULT_SLAB_SLICES,
+) -> float:
+    """Sum the three probsegs one slab of slices at a time.
 
-    gm = np.asanyarray(gm_img.dataobj, dtype=np.float32)
-    wm = np.asanyarray(wm_img.dataobj, dtype=np.float32)
-    csf = np.asanyarray(csf_img.dataobj, dtype=np.float32)
-
-    if gm.shape != wm.shape or gm.shape != csf.shape:
+    Only one float32 slab accumulator is held in memory, instead of the three
+    full volumes plus their sum. Files stay open between slabs so gzip streams
+    are read forward once.
+    """
+    nib, np = imaging_modules()
+    images = [nib.load(str(path), keep_file_open=True) for path in (gm_path, wm_path, csf_path)]
+    gm_img = images[0]
+    if any(img.shape != gm_img.shape for img in images[1:]):
         raise ValueError("GM/WM/CSF probseg shapes do not match.")
 
     v_mm3 = voxel_volume_mm3(gm_img)
 
     # Expected intracranial “soft count”
-    soft_voxels = np.sum(gm + wm + csf)
+    soft_voxels = 0.0
+    depth = gm_img.shape[-1]
+    for start in range(0, depth, slab_slices):
+        slab = slice(start, min(start + slab_slices, depth))
+        total = np.array(gm_img.dataobj[..., slab], dtype=np.float32)
+        for img in images[1:]:
+            total += np.asarray(img.dataobj[..., slab], dtype=np.float32)
+        soft_voxels += float(np.sum(total, dtype=np.float64))
 
     # Convert mm^3 -> mL (1 mL = 1000 mm^3)
     return (soft_voxels * v_mm3) / 1000.0
 
 
 def compute_from_brainmask(mask_path: Path, threshold: float = 0.0) -> float:
+    nib, np = imaging_modules()
     mask_img = nib.load(str(mask_path))
     mask = np.asanyarray(mask_img.dataobj)
 
@@ -111,6 +144,30 @@ def size_bin(volume: float, q25: float, q50: float, q75: float) -> str:
         return "extra_large"
 
 
+def probseg_row(probsegs: dict, slab_slices: int = DEFAULT_SLAB_SLICES) -> dict:
+    sub, ses = parse_entities(probsegs["gm"])
+    try:
+        vol_ml = compute_from_probsegs(
+            probsegs["gm"], probsegs["wm"], probsegs["csf"], slab_slices
+        )
+        return {
+            "subject": sub,
+            "session": ses,
+            "method": "GM+WM+CSF_probseg (ICV-ish)",
+            "volume_ml": vol_ml,
+            "source_path": str(probsegs["gm"]),
+        }
+    except Exception as e:
+        return {
+            "subject": sub,
+            "session": ses,
+            "method": "GM+WM+CSF_probseg (FAILED)",
+            "volume_ml": float("nan"),
+            "source_path": str(probsegs["gm"]),
+            "error": str(e),
+        }
+
+
 def main():
     ap = argparse.ArgumentParser(
         description="Extract approximate intracranial volume (ICV) from fMRIPrep outputs."
@@ -143,7 +200,21 @@ def main():
         action="store_true",
         help="Force using brain masks even if tissue probsegs exist (this gives brain volume, not ICV).",
     )
+    ap.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help="Number of probseg sets to reduce concurrently.",
+    )
+    ap.add_argument(
+        "--slab_slices",
+        type=int,
+        default=DEFAULT_SLAB_SLICES,
+        help="Slices per streamed probseg slab; bounds peak memory per job.",
+    )
     args = ap.parse_args()
+    if args.jobs < 1 or args.slab_slices < 1:
+        ap.error("--jobs and --slab_slices must be at least 1")
 
     fmriprep_dir = Path(args.fmriprep_dir).resolve()
     if not fmriprep_dir.exists():
@@ -158,30 +229,12 @@ def main():
         probseg_sets = []
 
     if probseg_sets:
-        for s in probseg_sets:
-            sub, ses = parse_entities(s["gm"])
-            try:
-                vol_ml = compute_from_probsegs(s["gm"], s["wm"], s["csf"])
-                rows.append(
-                    {
-                        "subject": sub,
-                        "session": ses,
-                        "method": "GM+WM+CSF_probseg (ICV-ish)",
-                        "volume_ml": vol_ml,
-                        "source_path": str(s["gm"]),
-                    }
-                )
-            except Exception as e:
-                rows.append(
-                    {
-                        "subject": sub,
-                        "session": ses,
-                        "method": "GM+WM+CSF_probseg (FAILED)",
-                        "volume_ml": np.nan,
-                        "source_path": str(s["gm"]),
-                        "error": str(e),
-                    }
-                )
+        reduce_set = partial(probseg_row, slab_slices=args.slab_slices)
+        if args.jobs == 1 or len(probseg_sets) < 2:
+            rows.extend(map(reduce_set, probseg_sets))
+        else:
+            with ProcessPoolExecutor(max_workers=min(args.jobs, len(probseg_sets))) as pool:
+                rows.extend(pool.map(reduce_set, probseg_sets))
 
     # --- Fallback to brain masks ---
     if not rows:
@@ -211,12 +264,14 @@ def main():
                         "subject": sub,
                         "session": ses,
                         "method": "desc-brain_mask (FAILED)",
-                        "volume_ml": np.nan,
+                        "volume_ml": float("nan"),
                         "source_path": str(m),
                         "error": str(e),
                     }
                 )
 
+    _, np = imaging_modules()
+    pd, plt = report_modules()
     df = pd.DataFrame(rows)
     df = df.dropna(subset=["volume_ml"]).copy()
 
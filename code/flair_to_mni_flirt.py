@@ -1,16 +1,36 @@
 #!/usr/bin/env python3
+"""Register each BIDS FLAIR to MNI152 through its session T1w with FSL FLIRT.
 
+With ``--fmriprep-dir`` the T1w→MNI152NLin6Asym transform fMRIPrep already
+computed is reused: only the FLAIR→T1w rigid is estimated, and the FLAIR is
+resampled once through both transforms onto the run-QC template grid.
+"""
+
+from __future__ import annotations
+
+import argparse
 import os
-from pathlib import Path
+import shutil
 import subprocess
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from functools import partial
+from pathlib import Path
+from typing import TextIO
+
+from build_run_qc import TARGET_SPACE, discover_template_mask
+from pipeline_utils import tsv_records, write_tsv_records
 
 # =========================
 # CONFIG
 # =========================
-BIDS_DIR = Path("/ZPOOL/data/projects/rf1-sra-linux2/bids")
-DERIV_ROOT = Path("/ZPOOL/data/projects/rf1-sra-linux2/derivatives/flirt")
-
-DERIV_ROOT.mkdir(parents=True, exist_ok=True)
+PROJECT_ROOT = Path("/ZPOOL/data/projects/rf1-sra-linux2")
+BIDS_DIR = PROJECT_ROOT / "bids"
+DERIV_ROOT = PROJECT_ROOT / "derivatives" / "flirt"
+LOG_DIR = PROJECT_ROOT / "logs" / "flair-to-mni"
+FMRIPREP_IMAGE = Path("/ZPOOL/data/tools/fmriprep-25.2.5.simg")
+SUMMARY_COLUMNS = ("label", "step", "status", "seconds", "detail")
 
 
 # =========================
@@ -39,20 +59,89 @@ def find_mni():
 
 
 # =========================
-# RUN COMMAND
-# =========================
-def run(cmd):
-    print("\nRunning:", " ".join(cmd))
-    subprocess.run(cmd, check=True)
-
-
-# =========================
-# PROCESS SUBJECT
+# PLAN STEPS
 # =========================
-def process_subject(sub_dir, mni_head):
+@dataclass(frozen=True)
+class Step:
+    name: str
+    command: tuple[str, ...]
+    inputs: tuple[Path, ...]
+    outputs: tuple[Path, ...]
+
+    def is_current(self) -> bool:
+        """Return whether every output exists and is newer than every input."""
+        try:
+            newest_input = max(path.stat().st_mtime_ns for path in self.inputs)
+            oldest_output = min(path.stat().st_mtime_ns for path in self.outputs)
+        except (OSError, ValueError):
+            return False
+        return oldest_output >= newest_input
+
+
+@dataclass(frozen=True)
+class SessionJob:
+    label: str
+    t1: Path
+    flair: Path
+    out_dir: Path
+    fmriprep_t1: Path | None = None
+    fmriprep_xfm: Path | None = None
+
+
+@dataclass(frozen=True)
+class FmriprepReuse:
+    """Container tools and target grid for composing with fMRIPrep transforms."""
+
+    apptainer: str
+    image: Path
+    reference: Path
+    binds: tuple[Path, ...]
+
+    def command(self, *args: str) -> tuple[str, ...]:
+        binds = [f"--bind={path}:{path}" for path in self.binds]
+        return (self.apptainer, "exec", "--cleanenv", *binds, str(self.image), *args)
+
+
+@dataclass(frozen=True)
+class StepResult:
+    label: str
+    step: str
+    status: str
+    seconds: float = 0.0
+    detail: str = ""
+
+
+def find_fmriprep_anat(
+    fmriprep_dir: Path, sub_id: str, ses: str | None
+) -> tuple[Path, Path] | None:
+    """Return fMRIPrep's preprocessed T1w and its T1w→template transform.
+
+    Session-level anatomical outputs win; otherwise the subject-level T1w
+    template fMRIPrep builds across sessions is used.
+    """
+    anat_dirs = [fmriprep_dir / sub_id / "anat"]
+    if ses is not None:
+        anat_dirs.insert(0, fmriprep_dir / sub_id / ses / "anat")
+    for anat_dir in anat_dirs:
+        t1 = sorted(
+            path
+            for path in anat_dir.glob(f"{sub_id}*_desc-preproc_T1w.nii.gz")
+            if "_space-" not in path.name
+        )
+        xfm = sorted(
+            anat_dir.glob(f"{sub_id}*_from-T1w_to-{TARGET_SPACE}_mode-image_xfm.h5")
+        )
+        if len(t1) == 1 and len(xfm) == 1:
+            return t1[0], xfm[0]
+    return None
+
+
+def find_session_jobs(
+    sub_dir: Path, deriv_root: Path, fmriprep_dir: Path | None = None
+) -> tuple[list[SessionJob], list[str]]:
+    """Return one job per anat folder with a T1w and FLAIR, plus skip messages."""
     sub_id = sub_dir.name
-
-    anat_dirs = []
+    anat_dirs: list[tuple[str | None, Path]] = []
 
     # Case 1: no session
     anat_dir = sub_dir / "anat"
@@ -66,114 +155,411 @@ def process_subject(sub_dir, mni_head):
             anat_dirs.append((ses_dir.name, ses_anat))
 
     if not anat_dirs:
-        print(f"Skipping {sub_id}: no anat folders found")
-        return
+        return [], [f"Skipping {sub_id}: no anat folders found"]
 
-    # Loop over sessions or single anat
+    jobs: list[SessionJob] = []
+    skipped: list[str] = []
     for ses, anat_dir in anat_dirs:
-
         t1_files = sorted(anat_dir.glob("*T1w.nii.gz"))
         flair_files = sorted(anat_dir.glob("*FLAIR.nii.gz"))
-
         if not t1_files or not flair_files:
-            print(f"Skipping {sub_id} {ses}: missing T1w or FLAIR")
+            skipped.append(f"Skipping {sub_id} {ses}: missing T1w or FLAIR")
             continue
 
-        t1 = t1_files[0]
-        flair = flair_files[0]
-
-        label = sub_id if ses is None else f"{sub_id}_{ses}"
-
-        print(f"\n=== Processing {label} ===")
-
-        # -------------------------
         # Output directory (BIDS-like)
-        # -------------------------
-        out_dir = DERIV_ROOT / sub_id
+        out_dir = deriv_root / sub_id
         if ses is not None:
             out_dir = out_dir / ses
-        out_dir = out_dir / "anat"
-        out_dir.mkdir(parents=True, exist_ok=True)
-
-        # -------------------------
-        # Output files
-        # -------------------------
-        t1_to_mni_mat = out_dir / f"{label}_from-T1w_to-MNI152_affine.mat"
-        t1_to_mni_img = out_dir / f"{label}_space-MNI152_T1w.nii.gz"
-
-        flair_to_t1_mat = out_dir / f"{label}_from-FLAIR_to-T1w_rigid.mat"
-        flair_to_t1_img = out_dir / f"{label}_space-T1w_FLAIR.nii.gz"
-
-        flair_to_mni_mat = out_dir / f"{label}_from-FLAIR_to-MNI152_affine.mat"
-        flair_to_mni_img = out_dir / f"{label}_space-MNI152_FLAIR.nii.gz"
-
-        # -------------------------
+        label = sub_id if ses is None else f"{sub_id}_{ses}"
+        fmriprep_anat = None
+        if fmriprep_dir is not None:
+            fmriprep_anat = find_fmriprep_anat(fmriprep_dir, sub_id, ses)
+            if fmriprep_anat is None:
+                skipped.append(
+                    f"Skipping {label}: no unique fMRIPrep T1w and "
+                    f"T1w→{TARGET_SPACE} transform"
+                )
+                continue
+        jobs.append(
+            SessionJob(
+                label,
+                t1_files[0],
+                flair_files[0],
+                out_dir / "anat",
+                *(fmriprep_anat or (None, None)),
+            )
+        )
+    return jobs, skipped
+
+
+def session_stages(job: SessionJob, mni_head: Path) -> list[list[Step]]:
+    """Return the four FSL steps as stages that run one after another.
+
+    The first two registrations are independent of each other and share a
+    stage; the concatenation and resampling need both.
+    """
+    label = job.label
+    out_dir = job.out_dir
+    t1_to_mni_mat = out_dir / f"{label}_from-T1w_to-MNI152_affine.mat"
+    t1_to_mni_img = out_dir / f"{label}_space-MNI152_T1w.nii.gz"
+    flair_to_t1_mat = out_dir / f"{label}_from-FLAIR_to-T1w_rigid.mat"
+    flair_to_t1_img = out_dir / f"{label}_space-T1w_FLAIR.nii.gz"
+    flair_to_mni_mat = out_dir / f"{label}_from-FLAIR_to-MNI152_affine.mat"
+    flair_to_mni_img = out_dir / f"{label}_space-MNI152_FLAIR.nii.gz"
+    return [
         # 1. T1 → MNI
-        # -------------------------
-        run([
-            "flirt",
-            "-in", str(t1),
-            "-ref", str(mni_head),
-            "-omat", str(t1_to_mni_mat),
-            "-out", str(t1_to_mni_img),
-            "-dof", "12"
-        ])
-
-        # -------------------------
+        [Step(
+            "t1_to_mni",
+            (
+                "flirt",
+                "-in", str(job.t1),
+                "-ref", str(mni_head),
+                "-omat", str(t1_to_mni_mat),
+                "-out", str(t1_to_mni_img),
+                "-dof", "12",
+            ),
+            (job.t1, mni_head),
+            (t1_to_mni_mat, t1_to_mni_img),
+        ),
         # 2. FLAIR → T1
-        # -------------------------
-        run([
-            "flirt",
-            "-in", str(flair),
-            "-ref", str(t1),
-            "-omat", str(flair_to_t1_mat),
-            "-out", str(flair_to_t1_img),
-            "-dof", "6"
-        ])
-
-        # -------------------------
+        Step(
+            "flair_to_t1",
+            (
+                "flirt",
+                "-in", str(job.flair),
+                "-ref", str(job.t1),
+                "-omat", str(flair_to_t1_mat),
+                "-out", str(flair_to_t1_img),
+                "-dof", "6",
+            ),
+            (job.flair, job.t1),
+            (flair_to_t1_mat, flair_to_t1_img),
+        )],
         # 3. Concatenate transforms
-        # -------------------------
-        run([
-            "convert_xfm",
-            "-omat", str(flair_to_mni_mat),
-            "-concat", str(t1_to_mni_mat),
-            str(flair_to_t1_mat)
-        ])
-
-        # -------------------------
+        [Step(
+            "concat",
+            (
+                "convert_xfm",
+                "-omat", str(flair_to_mni_mat),
+                "-concat", str(t1_to_mni_mat),
+                str(flair_to_t1_mat),
+            ),
+            (t1_to_mni_mat, flair_to_t1_mat),
+            (flair_to_mni_mat,),
+        )],
         # 4. Apply transform
-        # -------------------------
-        run([
-            "flirt",
-            "-in", str(flair),
-            "-ref", str(mni_head),
-            "-applyxfm",
-            "-init", str(flair_to_mni_mat),
-            "-out", str(flair_to_mni_img)
-        ])
+        [Step(
+            "apply",
+            (
+                "flirt",
+                "-in", str(job.flair),
+                "-ref", str(mni_head),
+                "-applyxfm",
+                "-init", str(flair_to_mni_mat),
+                "-out", str(flair_to_mni_img),
+            ),
+            (job.flair, mni_head, flair_to_mni_mat),
+            (flair_to_mni_img,),
+        )],
+    ]
+
 
-        print(f"Finished {label}")
+def fmriprep_stages(job: SessionJob, reuse: FmriprepReuse) -> list[list[Step]]:
+    """Return the FLAIR→fMRIPrep-T1w rigid and one composed resampling."""
+    assert job.fmriprep_t1 is not None and job.fmriprep_xfm is not None
+    label = job.label
+    out_dir = job.out_dir
+    # fMRIPrep's T1w differs from the BIDS T1w, so these never collide with
+    # the FLIRT-only outputs.
+    flair_to_t1_mat = out_dir / f"{label}_from-FLAIR_to-T1w_desc-fmriprep_rigid.mat"
+    flair_to_t1_itk = out_dir / f"{label}_from-FLAIR_to-T1w_desc-fmriprep_rigid.txt"
+    flair_to_mni_img = out_dir / f"{label}_space-{TARGET_SPACE}_res-02_FLAIR.nii.gz"
+    return [
+        # 1. FLAIR → fMRIPrep T1w
+        [Step(
+            "flair_to_t1",
+            (
+                "flirt",
+                "-in", str(job.flair),
+                "-ref", str(job.fmriprep_t1),
+                "-omat", str(flair_to_t1_mat),
+                "-dof", "6",
+            ),
+            (job.flair, job.fmriprep_t1),
+            (flair_to_t1_mat,),
+        )],
+        # 2. FSL matrix → ITK transform
+        [Step(
+            "fsl_to_itk",
+            reuse.command(
+                "c3d_affine_tool",
+                "-ref", str(job.fmriprep_t1),
+                "-src", str(job.flair),
+                str(flair_to_t1_mat),
+                "-fsl2ras",
+                "-oitk", str(flair_to_t1_itk),
+            ),
+            (job.flair, job.fmriprep_t1, flair_to_t1_mat),
+            (flair_to_t1_itk,),
+        )],
+        # 3. Apply FLAIR → T1w → template in one resampling
+        [Step(
+            "apply",
+            reuse.command(
+                "antsApplyTransforms",
+                "--dimensionality", "3",
+                "--float", "1",
+                "--input", str(job.flair),
+                "--reference-image", str(reuse.reference),
+                "--output", str(flair_to_mni_img),
+                "--interpolation", "LanczosWindowedSinc",
+                "--transform", str(job.fmriprep_xfm),
+                "--transform", str(flair_to_t1_itk),
+            ),
+            (job.flair, reuse.reference, job.fmriprep_xfm, flair_to_t1_itk),
+            (flair_to_mni_img,),
+        )],
+    ]
 
 
 # =========================
-# MAIN
+# RUN STEPS
 # =========================
-def main():
-    print("BIDS directory:", BIDS_DIR)
-    print("Derivatives directory:", DERIV_ROOT)
+def _run_steps(
+    label: str, steps: list[Step], log: TextIO, dry_run: bool, step_log_dir: Path
+) -> list[StepResult]:
+    """Run ``steps`` concurrently, skipping those whose outputs are current.
+
+    Each running step writes its own ``<label>_<step>.log`` under
+    ``step_log_dir``; once all have finished, those logs are appended to
+    ``log`` in step order so concurrent FLIRT output never interleaves.
+    """
+    results: dict[str, StepResult] = {}
+    running: list[tuple[Step, subprocess.Popen, float, Path]] = []
+    for step in steps:
+        if step.is_current():
+            results[step.name] = StepResult(label, step.name, "current")
+            continue
+        if dry_run:
+            results[step.name] = StepResult(
+                label, step.name, "planned", detail=" ".join(step.command)
+            )
+            continue
+        step_log = step_log_dir / f"{label}_{step.name}.log"
+        with step_log.open("w") as handle:
+            handle.write(f"Running {step.name}: {' '.join(step.command)}\n")
+            handle.flush()
+            try:
+                process = subprocess.Popen(
+                    step.command, stdout=handle, stderr=subprocess.STDOUT
+                )
+            except OSError as exc:
+                handle.write(f"Could not start {step.name}: {exc}\n")
+                results[step.name] = StepResult(
+                    label, step.name, "failed", detail=str(exc)
+                )
+                log.write(step_log.read_text())
+                continue
+        running.append((step, process, time.monotonic(), step_log))
+    for step, process, started, step_log in running:
+        returncode = process.wait()
+        seconds = round(time.monotonic() - started, 3)
+        if returncode:
+            results[step.name] = StepResult(
+                label, step.name, "failed", seconds, f"exit status {returncode}"
+            )
+        else:
+            results[step.name] = StepResult(label, step.name, "ran", seconds)
+    for _, _, _, step_log in running:
+        log.write(step_log.read_text(errors="replace"))
+    log.flush()
+    return [results[step.name] for step in steps]
+
+
+def process_session(
+    job: SessionJob,
+    mni_head: Path | None,
+    log_dir: Path,
+    dry_run: bool = False,
+    reuse: FmriprepReuse | None = None,
+) -> list[StepResult]:
+    """Run one session's registration, logging tool output to ``<label>.log``.
+
+    Step output goes to ``steps/<label>_<step>.log`` first and is appended to
+    the session log after the step's stage finishes.
+    """
+    if reuse is not None:
+        stages = fmriprep_stages(job, reuse)
+    else:
+        assert mni_head is not None
+        stages = session_stages(job, mni_head)
+    step_log_dir = log_dir / "steps"
+    if not dry_run:
+        job.out_dir.mkdir(parents=True, exist_ok=True)
+        step_log_dir.mkdir(parents=True, exist_ok=True)
+    log_path = log_dir / f"{job.label}.log"
+    results: list[StepResult] = []
+    blocked: list[str] = []
+    with (open(os.devnull, "w") if dry_run else log_path.open("a")) as log:
+        log.write(f"=== Processing {job.label} ===\n")
+        for stage in stages:
+            if blocked:
+                detail = ", ".join(blocked)
+                results.extend(
+                    StepResult(job.label, step.name, "blocked", detail=detail)
+                    for step in stage
+                )
+                continue
+            if dry_run and any(result.status == "planned" for result in results):
+                # Upstream outputs would be rewritten, so this stage reruns too.
+                results.extend(
+                    StepResult(
+                        job.label, step.name, "planned", detail=" ".join(step.command)
+                    )
+                    for step in stage
+                )
+                continue
+            stage_results = _run_steps(job.label, stage, log, dry_run, step_log_dir)
+            blocked.extend(
+                result.step for result in stage_results if result.status == "failed"
+            )
+            results.extend(stage_results)
+        log.write(f"Finished {job.label}\n")
+    return results
+
+
+def write_summary(path: Path, results: list[StepResult]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    rows = [
+        {
+            "label": result.label,
+            "step": result.step,
+            "status": result.status,
+            "seconds": f"{result.seconds:.3f}",
+            "detail": result.detail,
+        }
+        for result in results
+    ]
+    with path.open("w", encoding="utf-8", newline="") as handle:
+        write_tsv_records(handle, SUMMARY_COLUMNS, tsv_records(rows, SUMMARY_COLUMNS))
 
-    mni_head, _ = find_mni()
-    print("Using MNI template:", mni_head)
 
-    subjects = sorted([p for p in BIDS_DIR.glob("sub-*") if p.is_dir()])
+# =========================
+# MAIN
+# =========================
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--bids-dir", type=Path, default=BIDS_DIR)
+    parser.add_argument("--deriv-root", type=Path, default=DERIV_ROOT)
+    parser.add_argument("--log-dir", type=Path, default=LOG_DIR)
+    parser.add_argument(
+        "--summary-tsv",
+        type=Path,
+        help="Step timing and failure table (default: LOG_DIR/steps.tsv).",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help="Sessions to register concurrently; each runs up to two FLIRT calls.",
+    )
+    parser.add_argument(
+        "--fmriprep-dir",
+        type=Path,
+        help=(
+            f"Reuse fMRIPrep T1w→{TARGET_SPACE} transforms from this derivatives "
+            "directory instead of estimating a FLIRT T1w→MNI affine."
+        ),
+    )
+    parser.add_argument(
+        "--template-brain-mask",
+        type=Path,
+        help="TemplateFlow res-02 brain mask giving the build_run_qc output grid.",
+    )
+    parser.add_argument("--image", type=Path, default=FMRIPREP_IMAGE)
+    parser.add_argument("--apptainer")
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+    if args.jobs < 1:
+        parser.error("--jobs must be at least 1")
+
+    print("BIDS directory:", args.bids_dir)
+    print("Derivatives directory:", args.deriv_root)
+
+    mni_head = None
+    reuse = None
+    if args.fmriprep_dir is None:
+        mni_head, _ = find_mni()
+        print("Using MNI template:", mni_head)
+    else:
+        apptainer = (
+            args.apptainer or os.environ.get("APPTAINER") or shutil.which("apptainer")
+        )
+        if not apptainer:
+            raise ValueError(
+                "Apptainer executable not found; set APPTAINER or use --apptainer"
+            )
+        image = args.image.expanduser().resolve()
+        if not image.is_file():
+            raise ValueError(f"fMRIPrep image not found: {image}")
+        reference = discover_template_mask(args.template_brain_mask)
+        binds = (
+            args.bids_dir.resolve(),
+            args.deriv_root.resolve(),
+            args.fmriprep_dir.resolve(),
+            reference.parent,
+        )
+        reuse = FmriprepReuse(apptainer, image, reference, binds)
+        print("Reusing fMRIPrep transforms from:", args.fmriprep_dir)
+        print("Using template grid:", reference)
+
+    subjects = sorted([p for p in args.bids_dir.glob("sub-*") if p.is_dir()])
 
     if not subjects:
         raise RuntimeError("No subjects found.")
 
+    jobs: list[SessionJob] = []
     for sub in subjects:
-        process_subject(sub, mni_head)
+        sub_jobs, skipped = find_session_jobs(sub, args.deriv_root, args.fmriprep_dir)
+        jobs.extend(sub_jobs)
+        for message in skipped:
+            print(message)
+
+    process = partial(
+        process_session,
+        mni_head=mni_head,
+        log_dir=args.log_dir,
+        dry_run=args.dry_run,
+        reuse=reuse,
+    )
+    if args.jobs == 1 or len(jobs) < 2:
+        session_results = map(process, jobs)
+    else:
+        with ProcessPoolExecutor(max_workers=min(args.jobs, len(jobs))) as pool:
+            session_results = list(pool.map(process, jobs))
+
+    all_results: list[StepResult] = []
+    for job, results in zip(jobs, session_results):
+        all_results.extend(results)
+        statuses = ", ".join(f"{result.step}={result.status}" for result in results)
+        print(f"{job.label}: {statuses}")
+        for result in results:
+            if result.status == "planned":
+                print(f"  Would run {result.step}: {result.detail}")
+
+    if not args.dry_run:
+        summary = args.summary_tsv or args.log_dir / "steps.tsv"
+        write_summary(summary, all_results)
+        print("Step summary:", summary)
+    failed = sorted(
+        {result.label for result in all_results if result.status == "failed"}
+    )
+    print(
+        f"FLAIR to MNI: {len(jobs)} session(s), {len(failed)} failed"
+        + (f" ({', '.join(failed)})." if failed else ".")
+    )
+    return 1 if failed else 0
 
 
 if __name__ == "__main__":
-    main()
+    raise SystemExit(main())
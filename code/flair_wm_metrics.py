@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+"""Summarize white-matter coverage and intensity of MNI-space FLAIRs.
+
+Replaces the per-image ``fslmaths``/``fslstats`` calls of ``check-wm-mask.sh``:
+the WM mask is read once, each FLAIR is streamed in slabs of slices and
+reduced in NumPy, and images whose metrics fall outside the cohort's 1.5×IQR
+fences (``build_run_qc.linear_quantile``) are flagged in one TSV.
+"""
+
+from __future__ import annotations
+
+import argparse
+import math
+import re
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, NamedTuple
+
+from build_run_qc import linear_quantile
+from pipeline_utils import read_subject_list, tsv_records, write_tsv_records
+
+if TYPE_CHECKING:
+    import numpy as np
+
+
+PROJECT_ROOT = Path("/ZPOOL/data/projects/rf1-sra-linux2")
+DERIV_ROOT = PROJECT_ROOT / "derivatives" / "flirt"
+# Output space of each flair_to_mni_flirt.py path -> the option giving a WM
+# mask on that grid. FLIRT-only runs resample onto FSL's MNI152 2 mm head;
+# --fmriprep-dir runs resample onto the TemplateFlow res-02 grid.
+SPACE_MASK_OPTIONS = {
+    "MNI152": "--wm-mask",
+    "MNI152NLin6Asym_res-02": "--nlin6asym-wm-mask",
+}
+FLAIR_GLOBS = {space: f"sub-*/ses-*/anat/*_space-{space}_FLAIR.nii.gz" for space in SPACE_MASK_OPTIONS}
+SPACE_RE = re.compile(r"_space-([A-Za-z0-9]+(?:_res-[0-9]+)?)_FLAIR")
+AFFINE_TOLERANCE_MM = 1e-3
+DEFAULT_SLAB_SLICES = 16
+COVERED_THRESHOLD = 1e-6
+IQR_MULTIPLIER = 1.5
+# Metric -> outlier direction, as in the run-QC policy.
+OUTLIER_METRICS = {"pct_missing": "upper", "wm_cv": "upper"}
+METRIC_COLUMNS = [
+    "subject",
+    "session",
+    "space",
+    "flair",
+    "wm_voxels",
+    "covered_voxels",
+    "missing_voxels",
+    "pct_missing",
+    "wm_mean",
+    "wm_median",
+    "wm_sd",
+    "wm_cv",
+]
+OUTPUT_COLUMNS = [
+    *METRIC_COLUMNS,
+    *(f"{metric}_outlier" for metric in OUTLIER_METRICS),
+    "flair_outlier",
+    "outlier_reasons",
+    "error",
+]
+SUB_RE = re.compile(r"sub-([a-zA-Z0-9]+)")
+SES_RE = re.compile(r"ses-([a-zA-Z0-9]+)")
+
+
+def imaging_modules():
+    """Import imaging dependencies only when images are read."""
+    import nibabel as nib
+    import numpy as np
+
+    return nib, np
+
+
+class WmMask(NamedTuple):
+    mask: np.ndarray
+    affine: np.ndarray
+    path: Path
+
+
+def load_wm_mask(path: Path) -> WmMask:
+    """Return the WM mask as a boolean array (nonzero voxels, as ``fslstats -V``) and its affine."""
+    nib, np = imaging_modules()
+    img = nib.load(str(path))
+    return WmMask(np.asanyarray(img.dataobj) != 0, img.affine, path)
+
+
+_WM_MASKS: dict[str, WmMask] = {}
+
+
+def flair_space(path: Path) -> str | None:
+    """Return the ``space-``/``res-`` label of a registered FLAIR file name."""
+    match = SPACE_RE.search(path.name)
+    return match.group(1) if match else None
+
+
+def _set_wm_masks(masks: dict[str, WmMask]) -> None:
+    global _WM_MASKS
+    _WM_MASKS = masks
+
+
+def flair_metrics(
+    path: Path,
+    mask: np.ndarray,
+    slab_slices: int = DEFAULT_SLAB_SLICES,
+    affine: np.ndarray | None = None,
+) -> dict[str, Any]:
+    """Reduce one FLAIR against ``mask`` one slab of slices at a time.
+
+    A WM voxel is covered when the FLAIR is at least ``COVERED_THRESHOLD``
+    there, matching ``fslmaths -thr 1e-6 -bin``; intensity summaries use
+    covered WM voxels only. With ``affine``, a FLAIR whose voxel-to-world
+    mapping differs from the mask's is rejected even if the shapes agree.
+    """
+    nib, np = imaging_modules()
+    img = nib.load(str(path))
+    if img.shape[:3] != mask.shape:
+        raise ValueError(f"FLAIR grid {img.shape[:3]} does not match WM mask {mask.shape}")
+    if affine is not None and not np.allclose(img.affine, affine, atol=AFFINE_TOLERANCE_MM):
+        raise ValueError("FLAIR affine does not match the WM mask grid")
+    values: list[np.ndarray] = []
+    for start in range(0, mask.shape[2], slab_slices):
+        slab = slice(start, min(start + slab_slices, mask.shape[2]))
+        data = np.asarray(img.dataobj[:, :, slab], dtype=np.float32)
+        if data.ndim > 3:
+            data = data[..., 0]
+        inside = data[mask[:, :, slab]]
+        values.append(inside[inside >= COVERED_THRESHOLD])
+    covered = np.concatenate(values) if values else np.empty(0, dtype=np.float32)
+
+    wm_voxels = int(np.count_nonzero(mask))
+    missing = wm_voxels - covered.size
+    row: dict[str, Any] = {
+        "wm_voxels": wm_voxels,
+        "covered_voxels": int(covered.size),
+        "missing_voxels": missing,
+        "pct_missing": 100.0 * missing / wm_voxels if wm_voxels else 0.0,
+        "wm_mean": None,
+        "wm_median": None,
+        "wm_sd": None,
+        "wm_cv": None,
+    }
+    if covered.size:
+        mean = float(covered.mean(dtype=np.float64))
+        sd = float(covered.std(dtype=np.float64))
+        row.update(
+            wm_mean=mean,
+            wm_median=float(np.median(covered)),
+            wm_sd=sd,
+            wm_cv=sd / mean if mean else None,
+        )
+    return row
+
+
+def _measure_one(path: Path, slab_slices: int) -> dict[str, Any]:
+    subject = SUB_RE.search(str(path))
+    session = SES_RE.search(str(path))
+    space = flair_space(path)
+    row: dict[str, Any] = {
+        "subject": subject.group(1) if subject else None,
+        "session": session.group(1) if session else None,
+        "space": space,
+        "flair": str(path),
+        "error": None,
+    }
+    wm = _WM_MASKS.get(space or "")
+    if wm is None:
+        option = SPACE_MASK_OPTIONS.get(space or "")
+        row["error"] = (
+            f"no WM mask for space {space}; pass {option}"
+            if option
+            else f"unrecognized FLAIR space {space!r}"
+        )
+        return row
+    try:
+        row.update(flair_metrics(path, wm.mask, slab_slices, wm.affine))
+    except Exception as exc:  # noqa: BLE001 - keep batch processing and report all failures.
+        row["error"] = f"{exc} ({wm.path})"
+    return row
+
+
+def flag_outliers(rows: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    """Flag rows outside the cohort IQR fences and return one fence row per metric."""
+    fences: list[dict[str, Any]] = []
+    for metric, direction in OUTLIER_METRICS.items():
+        values = [
+            float(row[metric])
+            for row in rows
+            if row.get(metric) is not None and math.isfinite(float(row[metric]))
+        ]
+        fence = None
+        if values:
+            q1 = linear_quantile(values, 0.25)
+            q3 = linear_quantile(values, 0.75)
+            iqr = q3 - q1
+            fence = q3 + IQR_MULTIPLIER * iqr if direction == "upper" else q1 - IQR_MULTIPLIER * iqr
+        flagged = 0
+        for row in rows:
+            value = row.get(metric)
+            flag: bool | None = None
+            if value is not None and fence is not None:
+                flag = float(value) > fence if direction == "upper" else float(value) < fence
+                flagged += flag
+            row[f"{metric}_outlier"] = flag
+        fences.append(
+            {"metric": metric, "direction": direction, "n": len(values), "fence": fence, "n_outliers": flagged}
+        )
+    for row in rows:
+        reasons = [metric for metric in OUTLIER_METRICS if row.get(f"{metric}_outlier")]
+        row["flair_outlier"] = bool(reasons)
+        row["outlier_reasons"] = ";".join(reasons)
+    return fences
+
+
+def _format_cell(value: Any) -> Any:
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, float):
+        return f"{value:.6g}" if math.isfinite(value) else "n/a"
+    return value
+
+
+def discover_flairs(deriv_root: Path, subjects: list[str] | None = None) -> list[Path]:
+    """Return FLIRT-only and fMRIPrep-composed registered FLAIRs, sorted by path."""
+    wanted = set(subjects) if subjects is not None else None
+    paths = []
+    for pattern in FLAIR_GLOBS.values():
+        for path in deriv_root.glob(pattern):
+            if wanted is not None and path.parents[2].name.removeprefix("sub-") not in wanted:
+                continue
+            paths.append(path)
+    return sorted(paths)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--wm-mask", type=Path, help="WM mask on the FSL MNI152 2 mm grid of FLIRT-only outputs."
+    )
+    parser.add_argument(
+        "--nlin6asym-wm-mask",
+        type=Path,
+        help="WM mask on the TemplateFlow MNI152NLin6Asym res-02 grid of --fmriprep-dir outputs.",
+    )
+    parser.add_argument("--deriv-root", type=Path, default=DERIV_ROOT)
+    parser.add_argument(
+        "--flair-list",
+        type=Path,
+        help="Text file of MNI-space FLAIR paths (as read by check-wm-mask.sh) instead of searching --deriv-root.",
+    )
+    parser.add_argument("--sublist", type=Path, help="Optional subject list limiting discovered FLAIRs.")
+    parser.add_argument("--out-tsv", type=Path, default=DERIV_ROOT / "flair_wm_metrics.tsv")
+    parser.add_argument(
+        "--outlier-sublist",
+        type=Path,
+        help="Also write flagged subject IDs, one per line, in the flair-outliers.txt format.",
+    )
+    parser.add_argument("--jobs", type=int, default=1, help="FLAIR images to reduce concurrently.")
+    parser.add_argument(
+        "--slab_slices",
+        type=int,
+        default=DEFAULT_SLAB_SLICES,
+        help="Slices per streamed FLAIR slab; bounds peak memory per job.",
+    )
+    args = parser.parse_args()
+    if args.jobs < 1 or args.slab_slices < 1:
+        parser.error("--jobs and --slab_slices must be at least 1")
+    mask_paths = {"MNI152": args.wm_mask, "MNI152NLin6Asym_res-02": args.nlin6asym_wm_mask}
+    if not any(mask_paths.values()):
+        parser.error("give --wm-mask, --nlin6asym-wm-mask, or both")
+
+    if args.flair_list:
+        flairs = [Path(line.strip()) for line in args.flair_list.read_text().splitlines() if line.strip()]
+    else:
+        subjects = read_subject_list(args.sublist) if args.sublist else None
+        flairs = discover_flairs(args.deriv_root, subjects)
+    if not flairs:
+        print("No MNI-space FLAIR images found.")
+        return 1
+
+    masks = {space: load_wm_mask(path) for space, path in mask_paths.items() if path}
+    measure = partial(_measure_one, slab_slices=args.slab_slices)
+    if args.jobs == 1 or len(flairs) < 2:
+        _set_wm_masks(masks)
+        rows = list(map(measure, flairs))
+    else:
+        with ProcessPoolExecutor(
+            max_workers=min(args.jobs, len(flairs)), initializer=_set_wm_masks, initargs=(masks,)
+        ) as pool:
+            rows = list(pool.map(measure, flairs))
+
+    # Each grid has its own mask, so cohort fences are computed per space.
+    fences = []
+    for space in dict.fromkeys(row["space"] for row in rows):
+        for fence in flag_outliers([row for row in rows if row["space"] == space]):
+            fences.append({"space": space, **fence})
+    args.out_tsv.parent.mkdir(parents=True, exist_ok=True)
+    with args.out_tsv.open("w", encoding="utf-8", newline="") as handle:
+        write_tsv_records(handle, OUTPUT_COLUMNS, tsv_records(rows, OUTPUT_COLUMNS, default=_format_cell))
+    outliers = [row for row in rows if row["flair_outlier"]]
+    if args.outlier_sublist:
+        args.outlier_sublist.parent.mkdir(parents=True, exist_ok=True)
+        subjects = sorted({row["subject"] for row in outliers if row["subject"]})
+        args.outlier_sublist.write_text("".join(f"{subject}\n" for subject in subjects))
+
+    failed = [row for row in rows if row["error"]]
+    for row in failed:
+        print(f"Failed {row['flair']}: {row['error']}")
+    for fence in fences:
+        shown = "NA" if fence["fence"] is None else f"{fence['fence']:.6g}"
+        print(
+            f"{fence['space']} {fence['metric']}: n={fence['n']} {fence['direction']}_fence={shown} "
+            f"outliers={fence['n_outliers']}"
+        )
+    print(
+        f"FLAIR WM metrics: {len(rows)} image(s), {len(outliers)} outlier(s), "
+        f"{len(failed)} failed -> {args.out_tsv}"
+    )
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,390 @@
+#!/usr/bin/env python3
+"""Plan and run fMRIPrep subjects with per-subject ``--nprocs`` and ``--mem``.
+
+Each subject's cost is estimated from its BIDS inventory: magnitude BOLD runs,
+echo images, volumes read from the NIfTI headers, and whether FreeSurfer is
+already done. Heavier subjects get a larger share of the CPU budget and a
+memory reservation sized to their predicted peak, and ``schedule_jobs`` packs
+them, longest first, under ``FMRIPREP_TOTAL_NPROCS``/``FMRIPREP_TOTAL_MEM_MB``.
+The runtime and peak memory of every completed subject are appended to an
+observation table, and once enough subjects are recorded the cost model is
+refit from it by least squares.
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import gzip
+import math
+import os
+import struct
+from collections.abc import Collection, Mapping, Sequence
+from dataclasses import asdict, dataclass
+from datetime import date
+from pathlib import Path
+from typing import Any
+
+from pipeline_utils import (
+    fmriprep_freesurfer_outputs,
+    is_fmriprep_complete,
+    read_subject_list,
+    tsv_records,
+    write_tsv_records,
+)
+from schedule_jobs import Scheduler, WorkItem
+from telemetry import default_batch, telemetry_file
+
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+SCRIPT_DIR = Path(__file__).resolve().parent
+OBSERVATIONS = PROJECT_ROOT / "logs" / "fmriprep_resources.tsv"
+FEATURES = ("echo_volumes", "freesurfer_missing")
+# Target -> (intercept, per echo-volume, FreeSurfer still to run) used until
+# enough subjects have been observed to refit them.
+DEFAULT_MODEL = {
+    "runtime_s": (3600.0, 0.5, 6 * 3600.0),
+    "peak_rss_mb": (6000.0, 1.0, 2000.0),
+}
+MIN_OBSERVATIONS = 5
+MEM_HEADROOM = 1.25
+MIN_MEM_MB = 8000
+MIN_NPROCS = 4
+OBSERVATION_COLUMNS = [
+    "recorded",
+    "subject",
+    "bold_runs",
+    "echo_images",
+    "echo_volumes",
+    "freesurfer_missing",
+    "nprocs",
+    "mem_mb",
+    "runtime_s",
+    "peak_rss_mb",
+]
+
+
+@dataclass(frozen=True)
+class SubjectInventory:
+    subject: str
+    bold_runs: int
+    echo_images: int
+    echo_volumes: int
+    freesurfer_missing: bool
+
+
+@dataclass(frozen=True)
+class SubjectPlan:
+    inventory: SubjectInventory
+    runtime_s: float
+    peak_rss_mb: float
+    nprocs: int
+    omp_nthreads: int
+    mem_mb: int
+
+
+def nifti_volumes(path: Path) -> int:
+    """Return the number of volumes in a NIfTI-1 or NIfTI-2 header (1 for 3D images)."""
+    opener = gzip.open if path.name.endswith(".gz") else open
+    with opener(path, "rb") as handle:
+        header = handle.read(540)
+    for order in "<>":
+        (size,) = struct.unpack_from(f"{order}i", header, 0)
+        if size == 348:
+            dims = struct.unpack_from(f"{order}8h", header, 40)
+            break
+        if size == 540:
+            dims = struct.unpack_from(f"{order}8q", header, 16)
+            break
+    else:
+        raise ValueError(f"not a NIfTI header: {path}")
+    return int(dims[4]) if dims[0] >= 4 and dims[4] > 0 else 1
+
+
+def subject_inventory(bids_root: Path, deriv_root: Path, subject: str) -> SubjectInventory:
+    subject_dir = bids_root / f"sub-{subject}"
+    echoes = sorted(subject_dir.glob("ses-*/func/*_part-mag_bold.nii.gz"))
+    return SubjectInventory(
+        subject=subject,
+        bold_runs=sum("_echo-1_" in path.name for path in echoes),
+        echo_images=len(echoes),
+        echo_volumes=sum(nifti_volumes(path) for path in echoes),
+        freesurfer_missing=not fmriprep_freesurfer_outputs(deriv_root, subject),
+    )
+
+
+def _solve(matrix: list[list[float]], vector: list[float]) -> list[float] | None:
+    """Solve a small linear system by Gaussian elimination; ``None`` when singular."""
+    size = len(vector)
+    rows = [[*row, value] for row, value in zip(matrix, vector)]
+    for col in range(size):
+        pivot = max(range(col, size), key=lambda row: abs(rows[row][col]))
+        if abs(rows[pivot][col]) < 1e-9:
+            return None
+        rows[col], rows[pivot] = rows[pivot], rows[col]
+        for row in range(size):
+            if row != col:
+                factor = rows[row][col] / rows[col][col]
+                rows[row] = [a - factor * b for a, b in zip(rows[row], rows[col])]
+    return [rows[index][size] / rows[index][index] for index in range(size)]
+
+
+def fit_model(observations: Sequence[Mapping[str, Any]]) -> dict[str, tuple[float, ...]]:
+    """Refit each target on ``FEATURES`` by least squares, keeping defaults when too few.
+
+    A target keeps its default coefficients until ``MIN_OBSERVATIONS`` subjects
+    recorded it, or when the fit is singular or gives a negative coefficient.
+    """
+    model = dict(DEFAULT_MODEL)
+    for target in DEFAULT_MODEL:
+        samples = [
+            ([1.0, *(float(row[feature]) for feature in FEATURES)], float(row[target]))
+            for row in observations
+            if row.get(target) not in (None, "", "n/a")
+        ]
+        if len(samples) < MIN_OBSERVATIONS:
+            continue
+        size = len(FEATURES) + 1
+        normal = [[sum(x[i] * x[j] for x, _ in samples) for j in range(size)] for i in range(size)]
+        moments = [sum(x[i] * y for x, y in samples) for i in range(size)]
+        coefficients = _solve(normal, moments)
+        if coefficients is not None and all(value >= 0 for value in coefficients):
+            model[target] = tuple(coefficients)
+    return model
+
+
+def predict(model: Mapping[str, Sequence[float]], inventory: SubjectInventory) -> dict[str, float]:
+    features = [1.0, *(float(getattr(inventory, feature)) for feature in FEATURES)]
+    return {
+        target: sum(weight * value for weight, value in zip(coefficients, features))
+        for target, coefficients in model.items()
+    }
+
+
+def plan_subjects(
+    inventories: Sequence[SubjectInventory],
+    model: Mapping[str, Sequence[float]],
+    total_nprocs: int,
+    total_mem_mb: int,
+    jobs: int,
+    omp_nthreads: int,
+    fixed_nprocs: int | None = None,
+    fixed_mem_mb: int | None = None,
+) -> list[SubjectPlan]:
+    """Return subject plans, longest predicted runtime first.
+
+    The even split ``total_nprocs / jobs`` is scaled by each subject's
+    predicted runtime relative to the batch mean, so the average job still
+    gets the old share while heavy subjects get more and light ones fewer.
+    Memory is the predicted peak with ``MEM_HEADROOM``, never below
+    ``MIN_MEM_MB`` or above the whole budget. A fixed value replaces the
+    estimate for every subject.
+    """
+    predictions = [predict(model, inventory) for inventory in inventories]
+    runtimes = [prediction["runtime_s"] for prediction in predictions]
+    mean_runtime = (sum(runtimes) / len(runtimes) if runtimes else 0.0) or 1.0
+    share = total_nprocs / jobs
+    plans = []
+    for inventory, prediction in zip(inventories, predictions):
+        nprocs = fixed_nprocs or min(
+            total_nprocs, max(MIN_NPROCS, round(share * prediction["runtime_s"] / mean_runtime))
+        )
+        mem_mb = fixed_mem_mb or min(
+            total_mem_mb, max(MIN_MEM_MB, math.ceil(prediction["peak_rss_mb"] * MEM_HEADROOM))
+        )
+        plans.append(
+            SubjectPlan(
+                inventory,
+                prediction["runtime_s"],
+                prediction["peak_rss_mb"],
+                nprocs,
+                min(omp_nthreads, nprocs),
+                mem_mb,
+            )
+        )
+    return sorted(plans, key=lambda plan: plan.runtime_s, reverse=True)
+
+
+def read_observations(path: Path) -> list[dict[str, str]]:
+    try:
+        with path.open(newline="") as handle:
+            return list(csv.DictReader(handle, delimiter="\t"))
+    except FileNotFoundError:
+        return []
+
+
+def append_observations(path: Path, rows: Sequence[Mapping[str, Any]]) -> None:
+    """Rewrite the observation table with ``rows`` appended, replacing it atomically."""
+    if not rows:
+        return
+    records = [*read_observations(path), *rows]
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.tmp")
+    with tmp.open("w", encoding="utf-8", newline="") as handle:
+        write_tsv_records(handle, OBSERVATION_COLUMNS, tsv_records(records, OBSERVATION_COLUMNS))
+    tmp.replace(path)
+
+
+def observation_rows(
+    plans: Sequence[SubjectPlan],
+    state: Mapping[str, Mapping[str, Any]],
+    completed: set[str],
+    ran: Collection[str],
+) -> list[dict[str, Any]]:
+    """Return observation rows for subjects that ran and are now complete.
+
+    Only keys in ``ran`` (items finished by this invocation) are recorded;
+    subjects left "done" by an interrupted batch were recorded when it
+    exited. Subjects skipped by the worker (locked, already complete) never
+    reach completion during this batch, so their short runtimes are not
+    recorded either.
+    """
+    today = date.today().isoformat()
+    rows = []
+    for plan in plans:
+        key = f"sub-{plan.inventory.subject}"
+        record = state.get(key, {})
+        if key not in ran or record.get("status") != "done":
+            continue
+        if plan.inventory.subject not in completed:
+            continue
+        rows.append(
+            {
+                "recorded": today,
+                **asdict(plan.inventory),
+                "freesurfer_missing": int(plan.inventory.freesurfer_missing),
+                "nprocs": plan.nprocs,
+                "mem_mb": plan.mem_mb,
+                "runtime_s": record.get("seconds"),
+                "peak_rss_mb": record.get("peak_rss_mb"),
+            }
+        )
+    return rows
+
+
+def print_plan(plans: Sequence[SubjectPlan], fitted: bool) -> None:
+    print(f"Cost model: {'refit from observations' if fitted else 'defaults'}")
+    print(
+        "subject\tbold_runs\techo_images\techo_volumes\tfreesurfer\t"
+        "predicted_h\tpredicted_mb\tnprocs\tmem_mb"
+    )
+    for plan in plans:
+        inventory = plan.inventory
+        print(
+            f"sub-{inventory.subject}\t{inventory.bold_runs}\t{inventory.echo_images}\t"
+            f"{inventory.echo_volumes}\t{'todo' if inventory.freesurfer_missing else 'done'}\t"
+            f"{plan.runtime_s / 3600:.1f}\t{plan.peak_rss_mb:.0f}\t{plan.nprocs}\t{plan.mem_mb}"
+        )
+
+
+def _optional_int(name: str) -> int | None:
+    value = os.environ.get(name, "")
+    return int(value) if value.isdigit() and int(value) > 0 else None
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("command", choices=("plan", "run"), help="print the plan, or plan and run fMRIPrep")
+    parser.add_argument("--sublist", type=Path, required=True)
+    parser.add_argument("--project-root", type=Path, default=PROJECT_ROOT)
+    parser.add_argument("--jobs", type=int, default=2, help="Maximum simultaneous subjects.")
+    parser.add_argument("--total-nprocs", type=int, default=_optional_int("FMRIPREP_TOTAL_NPROCS") or 96)
+    parser.add_argument("--total-mem-mb", type=int, default=_optional_int("FMRIPREP_TOTAL_MEM_MB") or 196000)
+    parser.add_argument("--omp-nthreads", type=int, default=_optional_int("FMRIPREP_OMP_NTHREADS") or 8)
+    parser.add_argument(
+        "--nprocs", type=int, default=_optional_int("FMRIPREP_NPROCS"), help="Fixed --nprocs for every subject."
+    )
+    parser.add_argument(
+        "--mem-mb", type=int, default=_optional_int("FMRIPREP_MEM_MB"), help="Fixed --mem for every subject."
+    )
+    parser.add_argument(
+        "--observations", type=Path, help="Observation TSV (default: logs/fmriprep_resources.tsv)."
+    )
+    parser.add_argument("--resume", action="store_true", help="Skip subjects an interrupted batch finished.")
+    parser.add_argument("--dry-run", action="store_true", help="Pass --dry-run to every fmriprep.sh job.")
+    parser.add_argument(
+        "--overwrite", action="store_true", help="Plan complete subjects too; pass --overwrite."
+    )
+    args = parser.parse_args(argv)
+    if min(args.jobs, args.total_nprocs, args.total_mem_mb, args.omp_nthreads) < 1:
+        parser.error("--jobs, totals, and --omp-nthreads must be at least 1")
+
+    bids_root = args.project_root / "bids"
+    deriv_root = args.project_root / "derivatives"
+    observations_path = args.observations or args.project_root / OBSERVATIONS.relative_to(PROJECT_ROOT)
+    subjects = read_subject_list(args.sublist)
+    pending = [
+        subject
+        for subject in subjects
+        if args.overwrite or not is_fmriprep_complete(bids_root, deriv_root, subject)
+    ]
+    for subject in sorted(set(subjects) - set(pending)):
+        print(f"sub-{subject} already has practical fMRIPrep completion outputs; skipping")
+    observations = read_observations(observations_path)
+    model = fit_model(observations)
+    plans = plan_subjects(
+        [subject_inventory(bids_root, deriv_root, subject) for subject in pending],
+        model,
+        args.total_nprocs,
+        args.total_mem_mb,
+        args.jobs,
+        args.omp_nthreads,
+        args.nprocs,
+        args.mem_mb,
+    )
+    print_plan(plans, model != DEFAULT_MODEL)
+    if args.command == "plan" or not plans:
+        return 0
+
+    worker_args = [*(["--dry-run"] if args.dry_run else []), *(["--overwrite"] if args.overwrite else [])]
+    items = [
+        WorkItem(
+            f"sub-{plan.inventory.subject}",
+            ("bash", str(SCRIPT_DIR / "fmriprep.sh"), *worker_args, plan.inventory.subject),
+            plan.nprocs,
+            plan.mem_mb,
+            env=(
+                ("FMRIPREP_NPROCS", str(plan.nprocs)),
+                ("FMRIPREP_OMP_NTHREADS", str(plan.omp_nthreads)),
+                ("FMRIPREP_MEM_MB", str(plan.mem_mb)),
+            ),
+        )
+        for plan in plans
+    ]
+    logs = args.project_root / "logs" / "scheduler"
+    state_path = logs / ("fmriprep-state-dry-run.json" if args.dry_run else "fmriprep-state.json")
+    if not args.resume:
+        state_path.unlink(missing_ok=True)
+    scheduler = Scheduler(
+        items,
+        args.total_nprocs,
+        args.total_mem_mb,
+        state_path,
+        logs / "fmriprep",
+        max_jobs=args.jobs,
+        retries=0,
+        echo_logs=args.dry_run,
+        stage="fmriprep",
+        telemetry=None if args.dry_run else telemetry_file(),
+        batch=default_batch("fmriprep"),
+    )
+    status = scheduler.run()
+    if not args.dry_run:
+        completed = {
+            plan.inventory.subject
+            for plan in plans
+            if is_fmriprep_complete(bids_root, deriv_root, plan.inventory.subject)
+        }
+        rows = observation_rows(plans, scheduler.state, completed, set(scheduler.done))
+        append_observations(observations_path, rows)
+        if rows:
+            print(f"Recorded {len(rows)} fMRIPrep resource observation(s) in {observations_path}")
+    for key in scheduler.done:
+        print(f"fMRIPrep completed: {key}")
+    for key in scheduler.failed:
+        print(f"fMRIPrep FAILED: {key}")
+    return status
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -4,12 +4,23 @@
 from __future__ import annotations
 
 import argparse
+import json
 import re
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from functools import partial
 from pathlib import Path
+from typing import TYPE_CHECKING
 
-import pandas as pd
+from pipeline_utils import (
+    atomic_write_json,
+    file_fingerprint,
+    fingerprint_is_current,
+    read_subject_list,
+)
 
-from pipeline_utils import read_subject_list
+if TYPE_CHECKING:
+    import pandas as pd
 
 
 DESIRED_FMRIPREP_COLUMNS = [
@@ -27,6 +38,33 @@ DESIRED_FMRIPREP_COLUMNS = [
     "rot_z",
     "framewise_displacement",
 ]
+FMRIPREP_COLUMN_PREFIXES = ("cosine", "non_steady_state")
+METRIC_COLUMNS = ("Component", "classification")
+SIDECAR_VERSION = 1
+
+
+@dataclass(frozen=True)
+class ConfoundJob:
+    sub: str
+    ses: str
+    task: str
+    run: str
+    metric_file: Path
+    mixing_file: Path
+    fmriprep_file: Path
+    out_file: Path
+
+    @property
+    def label(self) -> str:
+        return f"{self.sub} ses-{self.ses} task-{self.task} run-{self.run}"
+
+    @property
+    def inputs(self) -> tuple[Path, Path, Path]:
+        return (self.fmriprep_file, self.mixing_file, self.metric_file)
+
+    @property
+    def sidecar(self) -> Path:
+        return self.out_file.with_suffix(".json")
 
 
 def parse_metric_file(path: Path) -> dict[str, str]:
@@ -39,6 +77,13 @@ def parse_metric_file(path: Path) -> dict[str, str]:
     return match.groupdict()
 
 
+def pandas_module():
+    """Import pandas only when confounds are built, not for listing or skipping."""
+    import pandas as pd
+
+    return pd
+
+
 def rejected_component_columns(metrics: pd.DataFrame) -> list[int]:
     rejected = metrics.loc[metrics["classification"] == "rejected", "Component"]
     indices: list[int] = []
@@ -48,14 +93,38 @@ def rejected_component_columns(metrics: pd.DataFrame) -> list[int]:
     return indices
 
 
-def build_confounds(fmriprep_confounds: Path, mixing_file: Path, metrics_file: Path) -> pd.DataFrame:
-    fmriprep = pd.read_csv(fmriprep_confounds, sep="\t")
+def is_fmriprep_confound_column(name: str) -> bool:
+    return name in DESIRED_FMRIPREP_COLUMNS or name.startswith(FMRIPREP_COLUMN_PREFIXES)
+
+
+def read_fmriprep_confounds(path: Path, cache_dir: Path | None = None) -> pd.DataFrame:
+    """Read only the fMRIPrep columns used for FSL confounds."""
+    if cache_dir is not None:
+        from confounds_cache import load_confounds
+
+        return load_confounds(path, cache_dir).to_frame(is_fmriprep_confound_column)
+    pd = pandas_module()
+    fmriprep = pd.read_csv(path, sep="\t", usecols=is_fmriprep_confound_column)
+    if fmriprep.columns.empty:
+        # Keep the row count for the mixing-matrix comparison.
+        fmriprep = pd.read_csv(path, sep="\t", usecols=[0]).iloc[:, :0]
+    return fmriprep
+
+
+def build_confounds(
+    fmriprep_confounds: Path,
+    mixing_file: Path,
+    metrics_file: Path,
+    cache_dir: Path | None = None,
+) -> pd.DataFrame:
+    pd = pandas_module()
+    fmriprep = read_fmriprep_confounds(fmriprep_confounds, cache_dir)
     mixing = pd.read_csv(mixing_file, sep="\t")
-    metrics = pd.read_csv(metrics_file, sep="\t")
+    metrics = pd.read_csv(metrics_file, sep="\t", usecols=METRIC_COLUMNS)
 
     cols = [c for c in DESIRED_FMRIPREP_COLUMNS if c in fmriprep.columns]
-    cols.extend(c for c in fmriprep.columns if c.startswith("cosine"))
-    cols.extend(c for c in fmriprep.columns if c.startswith("non_steady_state"))
+    for prefix in FMRIPREP_COLUMN_PREFIXES:
+        cols.extend(c for c in fmriprep.columns if c.startswith(prefix))
 
     base = fmriprep[cols].fillna(0)
     rejected_indices = rejected_component_columns(metrics)
@@ -82,6 +151,85 @@ def subject_filter_from_sublist(sublist: Path | None) -> set[str] | None:
     return {f"sub-{sub}" for sub in read_subject_list(sublist)}
 
 
+def discover_jobs(
+    tedana_dir: Path,
+    fmriprep_dir: Path,
+    output_dir: Path,
+    allowed_subjects: set[str] | None = None,
+) -> list[ConfoundJob]:
+    jobs: list[ConfoundJob] = []
+    for metric_file in sorted(tedana_dir.rglob("*_desc-tedana_metrics.tsv")):
+        parsed = parse_metric_file(metric_file)
+        sub = parsed["sub"]
+        if allowed_subjects is not None and sub not in allowed_subjects:
+            continue
+        ses = parsed["ses"]
+        task = parsed["task"]
+        run = parsed["run"]
+        prefix = metric_file.name.replace("_desc-tedana_metrics.tsv", "")
+        jobs.append(
+            ConfoundJob(
+                sub=sub,
+                ses=ses,
+                task=task,
+                run=run,
+                metric_file=metric_file,
+                mixing_file=metric_file.with_name(f"{prefix}_desc-ICA_mixing.tsv"),
+                fmriprep_file=(
+                    fmriprep_dir
+                    / sub
+                    / f"ses-{ses}"
+                    / "func"
+                    / f"{sub}_ses-{ses}_task-{task}_run-{run}_part-mag_desc-confounds_timeseries.tsv"
+                ),
+                out_file=(
+                    output_dir
+                    / sub
+                    / f"{sub}_ses-{ses}_task-{task}_run-{run}_desc-TedanaPlusConfounds.tsv"
+                ),
+            )
+        )
+    return jobs
+
+
+def confounds_current(job: ConfoundJob) -> bool:
+    """Return whether the output sidecar records the job's current inputs."""
+    if not job.out_file.is_file():
+        return False
+    try:
+        recorded = json.loads(job.sidecar.read_text())
+    except (OSError, ValueError):
+        return False
+    if not isinstance(recorded, dict):
+        return False
+    inputs = recorded.get("Inputs")
+    if recorded.get("Version") != SIDECAR_VERSION or not isinstance(inputs, list):
+        return False
+    if not all(isinstance(record, dict) for record in inputs):
+        return False
+    if [record.get("path") for record in inputs] != [str(path) for path in job.inputs]:
+        return False
+    return all(fingerprint_is_current(record) for record in inputs)
+
+
+def write_confounds(
+    job: ConfoundJob,
+    force: bool = False,
+    cache_dir: Path | None = None,
+) -> tuple[str, str | None]:
+    """Build and write one run, returning ``(status, error)`` instead of raising."""
+    try:
+        if not force and confounds_current(job):
+            return "skipped", None
+        inputs = [file_fingerprint(path) for path in job.inputs]
+        confounds = build_confounds(job.fmriprep_file, job.mixing_file, job.metric_file, cache_dir)
+        atomic_write_tsv(confounds, job.out_file)
+        atomic_write_json(job.sidecar, {"Version": SIDECAR_VERSION, "Inputs": inputs})
+    except Exception as exc:  # noqa: BLE001 - keep batch processing and report all failures.
+        return "failed", str(exc)
+    return "built", None
+
+
 def main() -> int:
     repo_root = Path(__file__).resolve().parents[1]
     parser = argparse.ArgumentParser(description=__doc__)
@@ -89,59 +237,72 @@ def main() -> int:
     parser.add_argument("--tedana-dir", type=Path, default=repo_root / "derivatives" / "tedana")
     parser.add_argument("--output-dir", type=Path, default=repo_root / "derivatives" / "fsl" / "confounds_tedana")
     parser.add_argument("--sublist", type=Path, help="Optional subject list limiting which TEDANA outputs are processed.")
+    parser.add_argument("--jobs", type=int, default=1, help="Runs to build concurrently in worker processes.")
+    parser.add_argument(
+        "--confounds-cache",
+        type=Path,
+        help="Read fMRIPrep confounds through the confounds_cache.py column cache in this directory.",
+    )
+    parser.add_argument("--force", action="store_true", help="Rebuild outputs even when their recorded inputs are unchanged.")
     parser.add_argument("--dry-run", action="store_true")
     args = parser.parse_args()
+    if args.jobs < 1:
+        parser.error("--jobs must be at least 1")
 
-    metric_files = sorted(args.tedana_dir.rglob("*_desc-tedana_metrics.tsv"))
-    allowed_subjects = subject_filter_from_sublist(args.sublist)
-    failures = 0
-    processed = 0
-    for metric_file in metric_files:
-        parsed = parse_metric_file(metric_file)
-        sub = parsed["sub"]
-        if allowed_subjects is not None and sub not in allowed_subjects:
-            continue
-        ses = parsed["ses"]
-        task = parsed["task"]
-        run = parsed["run"]
-        prefix = metric_file.name.replace("_desc-tedana_metrics.tsv", "")
-        base = metric_file.parent / prefix
-        mixing_file = base.with_name(f"{prefix}_desc-ICA_mixing.tsv")
-        fmriprep_file = (
-            args.fmriprep_dir
-            / sub
-            / f"ses-{ses}"
-            / "func"
-            / f"{sub}_ses-{ses}_task-{task}_run-{run}_part-mag_desc-confounds_timeseries.tsv"
-        )
-        out_file = (
-            args.output_dir
-            / sub
-            / f"{sub}_ses-{ses}_task-{task}_run-{run}_desc-TedanaPlusConfounds.tsv"
+    jobs = discover_jobs(
+        args.tedana_dir,
+        args.fmriprep_dir,
+        args.output_dir,
+        subject_filter_from_sublist(args.sublist),
+    )
+    missing_inputs = {
+        job: [p for p in [job.mixing_file, job.fmriprep_file] if not p.exists()] for job in jobs
+    }
+    ready = [job for job in jobs if not missing_inputs[job]]
+    build = partial(write_confounds, force=args.force, cache_dir=args.confounds_cache)
+    pool = None
+    results = None
+    if args.dry_run:
+        results = (
+            ("skipped" if not args.force and confounds_current(job) else "built", None)
+            for job in ready
         )
+    elif args.jobs > 1 and len(ready) > 1:
+        pool = ProcessPoolExecutor(max_workers=min(args.jobs, len(ready)))
+        results = pool.map(build, ready)
 
-        missing = [p for p in [mixing_file, fmriprep_file] if not p.exists()]
-        if missing:
-            processed += 1
-            failures += 1
-            print(f"Missing confound input for {sub} ses-{ses} task-{task} run-{run}:")
-            for path in missing:
-                print(f"  {path}")
-            continue
+    counts = {"built": 0, "skipped": 0, "failed": 0}
+    try:
+        for job in jobs:
+            if missing_inputs[job]:
+                counts["failed"] += 1
+                print(f"Missing confound input for {job.label}:")
+                for path in missing_inputs[job]:
+                    print(f"  {path}")
+                continue
+            if results is None:
+                # Serial builds announce each run before its work starts.
+                current = not args.force and confounds_current(job)
+                if not current:
+                    print(f"Making confounds: {job.label} -> {job.out_file}", flush=True)
+                status, error = ("skipped", None) if current else build(job, force=True)
+            else:
+                status, error = next(results)
+                if status != "skipped":
+                    print(f"Making confounds: {job.label} -> {job.out_file}")
+            counts[status] += 1
+            if status == "skipped":
+                print(f"Current confounds: {job.label} -> {job.out_file}")
+            elif error is not None:
+                print(f"Failed {job.label}: {error}", flush=True)
+    finally:
+        if pool is not None:
+            pool.shutdown()
 
-        processed += 1
-        print(f"Making confounds: {sub} ses-{ses} task-{task} run-{run} -> {out_file}")
-        if args.dry_run:
-            continue
-        try:
-            confounds = build_confounds(fmriprep_file, mixing_file, metric_file)
-            atomic_write_tsv(confounds, out_file)
-        except Exception as exc:  # noqa: BLE001 - keep batch processing and report all failures.
-            failures += 1
-            print(f"Failed {sub} ses-{ses} task-{task} run-{run}: {exc}")
-
-    print(f"Processed {processed} TEDANA metric file(s).")
-    return 1 if failures else 0
+    print(f"Processed {len(jobs)} TEDANA metric file(s).")
+    built = "would build" if args.dry_run else "built"
+    print(f"Confound outputs: {counts['built']} {built}, {counts['skipped']} skipped as current, {counts['failed']} failed.")
+    return 1 if counts["failed"] else 0
 
 
 if __name__ == "__main__":
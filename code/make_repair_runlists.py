@@ -10,6 +10,7 @@ from datetime import datetime
 from pathlib import Path
 
 from pipeline_utils import (
+    DEFAULT_SOURCE_MANIFEST_DIR,
     WarpkitReuseSpec,
     collect_intended_for_updates,
     fmriprep_missing_outputs,
@@ -17,6 +18,8 @@ from pipeline_utils import (
     missing_paths,
     read_subject_list,
     runs_for_task,
+    scans_have_dicoms,
+    source_scan_dir,
     subject_t1w_inputs,
     tasks_for_session,
     warpkit_required_inputs,
@@ -68,17 +71,12 @@ def write_subject_list(path: Path, subjects: set[str]) -> None:
     path.write_text("".join(f"{subject}\n" for subject in sorted(subjects)))
 
 
-def source_scan_dir(source_root: Path, folder_sub: str) -> Path:
-    if folder_sub == "11891":
-        return source_root / "11891" / "Smith-SRA-11891" / "Smith-SRA-11891" / "scans"
-    if folder_sub == "12018":
-        return source_root / "Smith-SRA-12018" / "Smith-SRA-" / "scans"
-    return source_root / f"Smith-SRA-{folder_sub}" / f"Smith-SRA-{folder_sub}" / "scans"
-
-
-def source_has_dicoms(source_root: Path, folder_sub: str) -> bool:
-    scans = source_scan_dir(source_root, folder_sub)
-    return scans.is_dir() and any(scans.glob("*/*/DICOM/files/*.dcm"))
+def source_has_dicoms(
+    source_root: Path,
+    folder_sub: str,
+    manifest_dir: Path | None = None,
+) -> bool:
+    return scans_have_dicoms(source_scan_dir(source_root, folder_sub), manifest_dir)
 
 
 def source_is_excluded(exclusions_root: Path, subject: str) -> bool:
@@ -91,11 +89,15 @@ def excluded_sources(exclusions_root: Path, subjects: list[str]) -> set[str]:
     return {subject for subject in subjects if source_is_excluded(exclusions_root, subject)}
 
 
-def missing_required_sources(source_root: Path, subjects: list[str]) -> set[str]:
+def missing_required_sources(
+    source_root: Path,
+    subjects: list[str],
+    manifest_dir: Path | None = None,
+) -> set[str]:
     return {
         subject
         for subject in subjects
-        if not source_has_dicoms(source_root, subject)
+        if not source_has_dicoms(source_root, subject, manifest_dir)
     }
 
 
@@ -116,12 +118,13 @@ def add_bids_issues(
     project_root: Path,
     source_root: Path,
     subjects: list[str],
+    manifest_dir: Path | None = None,
 ) -> set[str]:
     needs_repair: set[str] = set()
     for subject in subjects:
         for session in ("01", "02"):
             folder_sub = subject if session == "01" else f"{subject}-2"
-            if not source_has_dicoms(source_root, folder_sub):
+            if not source_has_dicoms(source_root, folder_sub, manifest_dir):
                 if session == "01":
                     needs_repair.add(subject)
                     add_issue(
@@ -386,6 +389,12 @@ def main() -> int:
         default=DEFAULT_EXCLUSIONS_ROOT,
         help="Root containing intentionally excluded Smith-SRA source folders.",
     )
+    parser.add_argument(
+        "--source-manifest-dir",
+        type=Path,
+        default=DEFAULT_SOURCE_MANIFEST_DIR,
+        help="Cached per-source DICOM manifests written by prepdata.sh.",
+    )
     parser.add_argument(
         "--warpkit-reuse-file",
         type=Path,
@@ -415,8 +424,12 @@ def main() -> int:
     reuse_specs = load_warpkit_reuse(args.warpkit_reuse_file)
     issues: list[Issue] = []
 
-    source_missing = missing_required_sources(args.source_root, subjects)
-    bids = add_bids_issues(issues, project_root, args.source_root, subjects)
+    source_missing = missing_required_sources(
+        args.source_root, subjects, args.source_manifest_dir
+    )
+    bids = add_bids_issues(
+        issues, project_root, args.source_root, subjects, args.source_manifest_dir
+    )
     mriqc = add_mriqc_issues(issues, project_root, subjects)
     warpkit = add_warpkit_issues(issues, project_root, subjects, reuse_specs)
     intendedfor = add_intendedfor_issues(issues, project_root, subjects)
@@ -61,3 +61,5 @@ rf1_require_dir "$outdir"
 rf1_require_file "$MRIQC_IMAGE"
 mkdir -p "$outdir" "$scratch"
 "${cmd[@]}"
+python3 "${scriptdir}/mriqc_iqms.py" --mriqc-dir "$outdir" \
+  --table-dir "${PROJECT_ROOT}/derivatives/mriqc-iqms" update
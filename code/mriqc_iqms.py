@@ -0,0 +1,340 @@
+#!/usr/bin/env python3
+"""Maintain one typed cohort table of MRIQC image quality metrics (IQMs).
+
+The MRIQC derivatives are walked once and every anat/func IQM JSON is parsed
+into ``index.json``; later updates re-parse only files whose size or mtime
+changed. One TSV per suffix (``iqms_T1w.tsv``, ``iqms_T2w.tsv``,
+``iqms_bold.tsv``) is written beside a JSON sidecar recording each column's
+type, so readers get typed columns without parsing any MRIQC JSON.
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import json
+import math
+import os
+import tempfile
+from collections.abc import Iterator, Mapping
+from pathlib import Path
+from typing import Any
+
+from pipeline_utils import atomic_write_json, tsv_records, write_tsv_records
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+MRIQC_DIR = PROJECT_ROOT / "derivatives" / "mriqc"
+TABLE_SUBDIR = Path("derivatives") / "mriqc-iqms"
+DEFAULT_TABLE_DIR = PROJECT_ROOT / TABLE_SUBDIR
+INDEX_NAME = "index.json"
+INDEX_VERSION = 1
+DATATYPES = ("anat", "func")
+# BIDS entity -> table column, in output order.
+ENTITY_COLUMNS = {
+    "sub": "subject",
+    "ses": "session",
+    "task": "task",
+    "acq": "acquisition",
+    "rec": "reconstruction",
+    "run": "run",
+    "echo": "echo",
+    "part": "part",
+}
+MISSING = "n/a"
+
+
+def loads_json(content: bytes) -> Any:
+    """Parse JSON with ``orjson`` when installed, else the standard library.
+
+    MRIQC can write ``NaN``, which only the standard parser accepts, so a
+    document ``orjson`` rejects is parsed again with ``json``.
+    """
+    if orjson is not None:
+        try:
+            return orjson.loads(content)
+        except orjson.JSONDecodeError:
+            pass
+    return json.loads(content)
+
+
+def split_name(name: str) -> tuple[dict[str, str], str]:
+    """Return the BIDS entities and suffix of an MRIQC JSON file name."""
+    tokens = name.removesuffix(".json").split("_")
+    entities = dict(token.split("-", 1) for token in tokens[:-1] if "-" in token)
+    return entities, tokens[-1]
+
+
+def iqm_scalars(data: Any) -> dict[str, Any]:
+    """Keep the top-level scalar IQMs; nested provenance and metadata are dropped."""
+    if not isinstance(data, dict):
+        raise ValueError("MRIQC JSON is not an object")
+    return {
+        key: value
+        for key, value in data.items()
+        if value is None or isinstance(value, (bool, int, float, str))
+    }
+
+
+def parse_iqm_json(path: Path) -> dict[str, Any]:
+    return iqm_scalars(loads_json(path.read_bytes()))
+
+
+def iter_iqm_jsons(mriqc_dir: Path) -> Iterator[tuple[str, os.stat_result]]:
+    """Yield ``(relative path, stat)`` for every subject/session IQM JSON."""
+    for subject in sorted(mriqc_dir.glob("sub-*")):
+        if not subject.is_dir():
+            continue
+        for session in sorted(subject.glob("ses-*")):
+            for datatype in DATATYPES:
+                try:
+                    with os.scandir(session / datatype) as entries:
+                        found = sorted(
+                            (entry.name, entry.stat())
+                            for entry in entries
+                            if entry.name.endswith(".json") and entry.is_file()
+                        )
+                except OSError:
+                    continue
+                for name, stat in found:
+                    yield f"{subject.name}/{session.name}/{datatype}/{name}", stat
+
+
+def read_index(table_dir: Path) -> dict[str, dict[str, Any]]:
+    """Return recorded IQM entries by path relative to the MRIQC directory."""
+    try:
+        record = json.loads((table_dir / INDEX_NAME).read_text())
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(record, dict) or record.get("Version") != INDEX_VERSION:
+        return {}
+    files = record.get("Files")
+    return files if isinstance(files, dict) else {}
+
+
+def _entry_is_current(entry: Mapping[str, Any] | None, stat: os.stat_result) -> bool:
+    return (
+        entry is not None
+        and entry.get("size") == stat.st_size
+        and entry.get("mtime_ns") == stat.st_mtime_ns
+    )
+
+
+def read_iqms(
+    path: Path, mriqc_dir: Path, index: Mapping[str, Mapping[str, Any]]
+) -> dict[str, Any]:
+    """Return one JSON's IQMs from ``index`` when current, else from the file.
+
+    Raises ``ValueError`` for a JSON that could not be parsed, whether the
+    failure was recorded in the index or happens now.
+    """
+    try:
+        relative = str(path.relative_to(mriqc_dir))
+        stat = path.stat()
+    except (OSError, ValueError):
+        return parse_iqm_json(path)
+    entry = index.get(relative)
+    if entry is None or not _entry_is_current(entry, stat):
+        return parse_iqm_json(path)
+    if entry.get("error"):
+        raise ValueError(entry["error"])
+    return dict(entry["iqms"])
+
+
+def update_index(mriqc_dir: Path, table_dir: Path) -> tuple[dict[str, dict[str, Any]], dict[str, int]]:
+    """Refresh the index from one walk of ``mriqc_dir`` and return it with counts."""
+    previous = read_index(table_dir)
+    files: dict[str, dict[str, Any]] = {}
+    counts = {"parsed": 0, "current": 0, "removed": 0, "invalid": 0}
+    for relative, stat in iter_iqm_jsons(mriqc_dir):
+        entry = previous.get(relative)
+        if _entry_is_current(entry, stat):
+            counts["current"] += 1
+        else:
+            entities, suffix = split_name(Path(relative).name)
+            entry = {
+                "size": stat.st_size,
+                "mtime_ns": stat.st_mtime_ns,
+                "suffix": suffix,
+                "entities": entities,
+            }
+            try:
+                entry["iqms"] = parse_iqm_json(mriqc_dir / relative)
+            except (OSError, ValueError) as exc:
+                entry["error"] = f"{type(exc).__name__}: {exc}"
+            counts["parsed"] += 1
+        if entry.get("error"):
+            counts["invalid"] += 1
+        files[relative] = entry
+    counts["removed"] = len(set(previous) - set(files))
+    table_dir.mkdir(parents=True, exist_ok=True)
+    suffixes = {entry["suffix"] for entry in files.values() if "iqms" in entry}
+    tables_missing = any(
+        not (table_dir / f"iqms_{suffix}.tsv").is_file()
+        or not (table_dir / f"iqms_{suffix}.json").is_file()
+        for suffix in suffixes
+    )
+    if counts["parsed"] or counts["removed"] or tables_missing or not (table_dir / INDEX_NAME).is_file():
+        # Tables first: an index is only written once the tables match it, so
+        # an interrupted write is redone by the next update.
+        write_tables(table_dir, files)
+        atomic_write_json(table_dir / INDEX_NAME, {"Version": INDEX_VERSION, "Files": files})
+    return files, counts
+
+
+def _column_type(values: list[Any]) -> str:
+    present = [value for value in values if value is not None]
+    if present and all(isinstance(value, bool) for value in present):
+        return "boolean"
+    if present and all(isinstance(value, int) and not isinstance(value, bool) for value in present):
+        return "integer"
+    if present and all(
+        isinstance(value, (int, float)) and not isinstance(value, bool) for value in present
+    ):
+        return "number"
+    return "string"
+
+
+def _format_cell(value: Any) -> Any:
+    if value is None:
+        return MISSING
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, float):
+        return repr(value) if math.isfinite(value) else str(value).lower()
+    return value
+
+
+def write_tables(table_dir: Path, files: Mapping[str, Mapping[str, Any]]) -> list[Path]:
+    """Write one TSV and column-type sidecar per suffix; return the TSV paths."""
+    by_suffix: dict[str, list[dict[str, Any]]] = {}
+    for relative, entry in sorted(files.items()):
+        if "iqms" not in entry:
+            continue
+        row = {
+            column: entry["entities"].get(entity)
+            for entity, column in ENTITY_COLUMNS.items()
+        }
+        row.update(entry["iqms"])
+        row["source"] = relative
+        by_suffix.setdefault(entry["suffix"], []).append(row)
+    written = []
+    for suffix, rows in sorted(by_suffix.items()):
+        entity_columns = [
+            column
+            for column in ENTITY_COLUMNS.values()
+            if any(row.get(column) is not None for row in rows)
+        ]
+        reserved = {*ENTITY_COLUMNS.values(), "source"}
+        iqm_columns = sorted({key for row in rows for key in row} - reserved)
+        columns = [*entity_columns, "source", *iqm_columns]
+        types = {
+            column: "string" if column in reserved else _column_type([row.get(column) for row in rows])
+            for column in columns
+        }
+        path = table_dir / f"iqms_{suffix}.tsv"
+        # Replaced whole so a concurrent export or run-QC read never sees a partial table.
+        fd, temporary = tempfile.mkstemp(prefix=f".{path.name}.", dir=table_dir)
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8", newline="") as handle:
+                write_tsv_records(handle, columns, tsv_records(rows, columns, default=_format_cell))
+            os.replace(temporary, path)
+        finally:
+            if os.path.exists(temporary):
+                os.unlink(temporary)
+        atomic_write_json(path.with_suffix(".json"), {"ColumnTypes": types})
+        written.append(path)
+    for stale in table_dir.glob("iqms_*.tsv"):
+        if stale not in written:
+            stale.unlink()
+            stale.with_suffix(".json").unlink(missing_ok=True)
+    return written
+
+
+_CASTS = {
+    "integer": int,
+    "number": float,
+    "boolean": lambda value: value == "true",
+    "string": str,
+}
+
+
+def read_table(table_dir: Path, suffix: str) -> dict[str, list[Any]]:
+    """Return one suffix's table as typed columns, with ``None`` for missing cells."""
+    path = table_dir / f"iqms_{suffix}.tsv"
+    types = json.loads(path.with_suffix(".json").read_text())["ColumnTypes"]
+    with path.open(newline="") as handle:
+        reader = csv.reader(handle, delimiter="\t")
+        header = next(reader)
+        columns: dict[str, list[Any]] = {column: [] for column in header}
+        casts = [_CASTS[types[column]] for column in header]
+        for record in reader:
+            for column, cast, value in zip(header, casts, record):
+                columns[column].append(None if value == MISSING else cast(value))
+    return columns
+
+
+def export_rows(
+    table_dir: Path, suffix: str, iqms: list[str], session: str | None = None
+) -> list[dict[str, Any]]:
+    """Select ``iqms`` per image of ``suffix``, keyed by ``sub-`` prefixed subject."""
+    table = read_table(table_dir, suffix)
+    sessions = table.get("session", [None] * len(table["subject"]))
+    rows = []
+    for index, subject in enumerate(table["subject"]):
+        if session is not None and sessions[index] != session:
+            continue
+        row: dict[str, Any] = {"subject": f"sub-{subject}"}
+        for iqm in iqms:
+            row[iqm] = table[iqm][index] if iqm in table else None
+        rows.append(row)
+    return rows
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--mriqc-dir", type=Path, default=MRIQC_DIR)
+    parser.add_argument("--table-dir", type=Path, default=DEFAULT_TABLE_DIR)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("update", help="parse new or changed IQM JSONs and rewrite the tables")
+    export = subparsers.add_parser("export", help="write selected IQMs for one suffix as a TSV")
+    export.add_argument("--suffix", required=True, help="MRIQC suffix, e.g. T1w, T2w, or bold.")
+    export.add_argument("--session", help="Optional session label without the ses- prefix.")
+    export.add_argument("--iqms", required=True, help="Comma-separated IQM columns to export.")
+    export.add_argument("--out", type=Path, required=True)
+    args = parser.parse_args()
+
+    if args.command == "update":
+        _, counts = update_index(args.mriqc_dir, args.table_dir)
+        print(
+            f"MRIQC IQMs: {counts['parsed']} parsed, {counts['current']} current, "
+            f"{counts['removed']} removed, {counts['invalid']} invalid -> {args.table_dir}"
+        )
+        return 1 if counts["invalid"] else 0
+
+    iqms = [name.strip() for name in args.iqms.split(",") if name.strip()]
+    try:
+        rows = export_rows(args.table_dir, args.suffix, iqms, args.session)
+    except FileNotFoundError:
+        rows = []
+    if not rows:
+        print(f"No {args.suffix} IQMs found in {args.table_dir}")
+        return 1
+    columns = ["subject", *iqms]
+    with args.out.open("w", encoding="utf-8", newline="") as handle:
+        write_tsv_records(
+            handle,
+            columns,
+            tsv_records(rows, columns, default=lambda value: "NA" if value is None else _format_cell(value)),
+        )
+    print(f"Done: {args.out} ({len(rows)} images)")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -42,6 +42,11 @@ rf1_load_config() {
   FMRIPREP_OMP_NTHREADS="${FMRIPREP_OMP_NTHREADS:-8}"
   FMRIPREP_NPROCS="${FMRIPREP_NPROCS:-}"
   FMRIPREP_MEM_MB="${FMRIPREP_MEM_MB:-}"
+  RF1_TOTAL_NPROCS="${RF1_TOTAL_NPROCS:-$FMRIPREP_TOTAL_NPROCS}"
+  RF1_TOTAL_MEM_MB="${RF1_TOTAL_MEM_MB:-$FMRIPREP_TOTAL_MEM_MB}"
+  TEDANA_OMP_THREADS="${TEDANA_OMP_THREADS:-2}"
+  TEDANA_MEM_MB="${TEDANA_MEM_MB:-8000}"
+  WARPKIT_MEM_MB="${WARPKIT_MEM_MB:-6000}"
   BATCH_SUBLIST="${SCRIPT_DIR}/sublist-new.txt"
 }
 
@@ -113,6 +118,14 @@ rf1_read_subjects() {
   done < <(python3 "${SCRIPT_DIR}/print_subjects.py" "$sublist")
 }
 
+# Print one tool command line for `rf1.py batch`, quoted so the dispatcher
+# splits it back into the original arguments.
+rf1_batch_line() {
+  local quoted
+  printf -v quoted '%q ' "$@"
+  printf '%s\n' "${quoted% }"
+}
+
 rf1_wait_for_jobs() {
   local max_jobs="$1"
   while (( "$(jobs -rp | wc -l | tr -d ' ')" >= max_jobs )); do
@@ -4,17 +4,20 @@
 from __future__ import annotations
 
 import csv
+import hashlib
 import json
 import os
 import re
 import tempfile
 from dataclasses import dataclass
-from datetime import date
+from datetime import date, datetime
 from pathlib import Path
-from typing import Iterable
+from typing import Any, Callable, Iterable, Iterator, Mapping, Sequence, TextIO
 
 
 PROJECT_ROOT = Path(__file__).resolve().parents[1]
+DEFAULT_SOURCE_MANIFEST_DIR = PROJECT_ROOT / "logs" / "source-manifests"
+SOURCE_MANIFEST_VERSION = 1
 DEFAULT_SCANNER_CUTOFF = date.fromisoformat("2025-03-04")
 TASKS_BY_SESSION = {
     "01": ("ugr", "trust", "sharedreward", "doors", "socialdoors"),
@@ -61,6 +64,137 @@ def choose_heuristic(session: str, newest_scan: date, subject: str = "") -> str:
     return "heuristics_XA30.py"
 
 
+def source_scan_dir(source_root: Path, folder_sub: str) -> Path:
+    """Return the XNAT ``scans`` directory for one source folder."""
+    if folder_sub == "11891":
+        return source_root / "11891" / "Smith-SRA-11891" / "Smith-SRA-11891" / "scans"
+    if folder_sub == "12018":
+        return source_root / "Smith-SRA-12018" / "Smith-SRA-" / "scans"
+    return source_root / f"Smith-SRA-{folder_sub}" / f"Smith-SRA-{folder_sub}" / "scans"
+
+
+def _subdirs(path: str | Path) -> list[os.DirEntry]:
+    try:
+        with os.scandir(path) as entries:
+            return [entry for entry in entries if entry.is_dir()]
+    except OSError:
+        return []
+
+
+def _dicom_file_dirs(scans: Path) -> Iterable[tuple[str, str]]:
+    """Yield ``(series, files_dir)`` for the ``*/*/DICOM/files`` XNAT layout."""
+    for series in _subdirs(scans):
+        for resource in _subdirs(series.path):
+            files_dir = os.path.join(resource.path, "DICOM", "files")
+            if os.path.isdir(files_dir):
+                yield series.name, files_dir
+
+
+def first_source_dicom(scans: Path) -> Path | None:
+    """Return the first DICOM under ``scans`` without walking the remaining tree."""
+    for _, files_dir in _dicom_file_dirs(scans):
+        try:
+            with os.scandir(files_dir) as entries:
+                for entry in entries:
+                    if entry.name.endswith(".dcm") and entry.is_file():
+                        return Path(entry.path)
+        except OSError:
+            continue
+    return None
+
+
+@dataclass(frozen=True)
+class SourceManifest:
+    scans: Path
+    series_count: int
+    file_count: int
+    newest_mtime: float
+
+    @property
+    def newest_scan(self) -> date:
+        return datetime.fromtimestamp(self.newest_mtime).date()
+
+
+def source_manifest_path(cache_dir: Path, scans: Path) -> Path:
+    key = hashlib.sha256(str(scans.resolve()).encode()).hexdigest()[:16]
+    return cache_dir / f"{key}.json"
+
+
+def _count_series_dicoms(files_dirs: Iterable[str]) -> dict:
+    file_count = 0
+    newest = 0.0
+    for files_dir in files_dirs:
+        with os.scandir(files_dir) as entries:
+            for entry in entries:
+                if not (entry.name.endswith(".dcm") and entry.is_file()):
+                    continue
+                file_count += 1
+                newest = max(newest, entry.stat().st_mtime)
+    return {"file_count": file_count, "newest_mtime": newest}
+
+
+def _read_source_manifest_cache(path: Path, scans: Path) -> dict[str, dict]:
+    try:
+        data = json.loads(path.read_text())
+    except (OSError, ValueError):
+        return {}
+    if data.get("version") != SOURCE_MANIFEST_VERSION or data.get("scans") != str(scans):
+        return {}
+    series = data.get("series")
+    return series if isinstance(series, dict) else {}
+
+
+def source_manifest(scans: Path, cache_dir: Path | None = None, write_cache: bool = True) -> SourceManifest:
+    """Summarize source DICOMs per series, reusing cached counts where possible.
+
+    A series is recounted only when the set or directory mtimes of its
+    ``DICOM/files`` folders changed. Source data is treated as immutable, so an
+    in-place rewrite of one DICOM that leaves its directory untouched is not
+    detected. With ``write_cache=False`` the cache is read but never updated.
+    """
+    current: dict[str, dict[str, int]] = {}
+    for series, files_dir in _dicom_file_dirs(scans):
+        current.setdefault(series, {})[files_dir] = os.stat(files_dir).st_mtime_ns
+    cache_path = source_manifest_path(cache_dir, scans) if cache_dir is not None else None
+    cached = _read_source_manifest_cache(cache_path, scans) if cache_path is not None else {}
+    records: dict[str, dict] = {}
+    for series, dirs in sorted(current.items()):
+        record = cached.get(series)
+        if not isinstance(record, dict) or record.get("dirs") != dirs:
+            record = {"dirs": dirs, **_count_series_dicoms(dirs)}
+        records[series] = record
+
+    if write_cache and cache_path is not None and records != cached:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        atomic_write_json(
+            cache_path,
+            {"version": SOURCE_MANIFEST_VERSION, "scans": str(scans), "series": records},
+        )
+
+    populated = [record for record in records.values() if record["file_count"]]
+    return SourceManifest(
+        scans=scans,
+        series_count=len(populated),
+        file_count=sum(record["file_count"] for record in populated),
+        newest_mtime=max((record["newest_mtime"] for record in populated), default=0.0),
+    )
+
+
+def scans_have_dicoms(scans: Path, cache_dir: Path | None = None) -> bool:
+    """Return whether ``scans`` holds DICOMs, stopping at the first one found.
+
+    A cached manifest that already recorded DICOMs answers without touching the
+    source tree; absence is always confirmed against the live filesystem.
+    """
+    if not scans.is_dir():
+        return False
+    if cache_dir is not None:
+        cached = _read_source_manifest_cache(source_manifest_path(cache_dir, scans), scans)
+        if any(record.get("file_count") for record in cached.values()):
+            return True
+    return first_source_dicom(scans) is not None
+
+
 def ensure_safe_child_path(root: Path, target: Path) -> Path:
     """Validate that target is a non-root path inside root."""
     root = root.resolve()
@@ -192,6 +326,81 @@ def atomic_write_json(path: Path, data: dict) -> None:
             tmp_path.unlink()
 
 
+TSVFormatter = Callable[[Any], Any]
+
+
+def tsv_records(
+    rows: Iterable[Mapping[str, Any]],
+    columns: Sequence[str],
+    formatters: Mapping[str, TSVFormatter] | None = None,
+    default: TSVFormatter | None = None,
+) -> Iterator[tuple[Any, ...]]:
+    """Yield one tuple per row, formatting each column with its own formatter.
+
+    Formatters are resolved once per column rather than once per cell; a
+    column without a formatter uses ``default`` or is written as-is.
+    """
+    formatters = formatters or {}
+    pairs = [(column, formatters.get(column, default)) for column in columns]
+    if all(formatter is None for _, formatter in pairs):
+        for row in rows:
+            yield tuple(row.get(column) for column in columns)
+        return
+    pairs = [(column, formatter or (lambda value: value)) for column, formatter in pairs]
+    for row in rows:
+        yield tuple(formatter(row.get(column)) for column, formatter in pairs)
+
+
+def write_tsv_records(
+    handle: TextIO, columns: Sequence[str], records: Iterable[Sequence[Any]]
+) -> None:
+    """Stream a header and ordered records as tab-separated, LF-terminated lines.
+
+    Output matches ``csv.DictWriter`` with the same dialect, including quoting
+    and ``None`` written as an empty field.
+    """
+    writer = csv.writer(handle, delimiter="\t", lineterminator="\n")
+    writer.writerow(columns)
+    writer.writerows(records)
+
+
+def sha256_file(path: Path, chunk_size: int = 8 * 1024 * 1024) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as handle:
+        for chunk in iter(lambda: handle.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def file_fingerprint(path: Path) -> dict:
+    """Return the path, size, mtime_ns, and SHA-256 recorded for a derived input."""
+    stat = path.stat()
+    return {
+        "path": str(path),
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "sha256": sha256_file(path),
+    }
+
+
+def fingerprint_is_current(record: dict) -> bool:
+    """Return whether a recorded input is unchanged.
+
+    Size and mtime_ns decide the common case without reading the file; a file
+    that was only touched is accepted when its SHA-256 still matches.
+    """
+    try:
+        path = Path(record["path"])
+        stat = path.stat()
+    except (KeyError, TypeError, OSError):
+        return False
+    if stat.st_size != record.get("size"):
+        return False
+    if stat.st_mtime_ns == record.get("mtime_ns"):
+        return True
+    return sha256_file(path) == record.get("sha256")
+
+
 def warpkit_required_inputs(indir: Path, subject: str, session: str, task: str, run: str) -> list[Path]:
     stem = f"sub-{subject}_ses-{session}_task-{task}_run-{run}"
     paths: list[Path] = []
@@ -202,6 +411,26 @@ def warpkit_required_inputs(indir: Path, subject: str, session: str, task: str,
     return paths
 
 
+def warpkit_expected_outputs(
+    project_root: Path, subject: str, session: str, task: str, run: str, reuse: bool = False
+) -> list[Path]:
+    """Return the files ``warpkit.sh`` requires before it skips a run as complete."""
+    stem = f"sub-{subject}_ses-{session}_task-{task}_run-{run}"
+    outdir = project_root / "derivatives" / "warpkit" / f"sub-{subject}" / f"ses-{session}"
+    fmap_stem = f"sub-{subject}_ses-{session}_acq-{task}_run-{run}"
+    fmapdir = project_root / "bids" / f"sub-{subject}" / f"ses-{session}" / "fmap"
+    outputs = [
+        outdir / f"{stem}.warpkit_done",
+        fmapdir / f"{fmap_stem}_fieldmap.nii.gz",
+        fmapdir / f"{fmap_stem}_magnitude.nii.gz",
+        fmapdir / f"{fmap_stem}_fieldmap.json",
+        fmapdir / f"{fmap_stem}_magnitude.json",
+    ]
+    if reuse:
+        outputs.append(outdir / f"{stem}_fieldmap-reuse.json")
+    return outputs
+
+
 def missing_paths(paths: Iterable[Path]) -> list[Path]:
     return [path for path in paths if not path.exists()]
 
@@ -108,7 +108,15 @@ if [[ ! -d "$subdir" ]]; then
   exit 1
 fi
 
-if ! find "$scandir" -type f -name '*.dcm' -print -quit 2>/dev/null | grep -q .; then
+manifest_args=(--cache-dir "${PROJECT_ROOT}/logs/source-manifests")
+# A dry run reads the cached counts but leaves the logs tree untouched.
+((dry_run)) && manifest_args+=(--no-write)
+source_manifest="$(python3 "${scriptdir}/check_pipeline_state.py" source-manifest \
+  "${manifest_args[@]}" "$scandir")"
+read -r dicom_count series_count epoch <<<"$source_manifest"
+echo "Source manifest for sub-${sub} ses-${ses}: ${dicom_count} DICOM(s) in ${series_count} series"
+
+if ((dicom_count == 0)); then
   if [[ "$ses" == "02" ]]; then
     echo "No DICOMs for optional sub-${sub} ses-${ses}; skipping."
     exit 0
@@ -118,8 +126,6 @@ if ! find "$scandir" -type f -name '*.dcm' -print -quit 2>/dev/null | grep -q .;
 fi
 
 if [[ "$ses" == "01" ]]; then
-  epoch="$(find "$scandir" -type f -name '*.dcm' -printf '%T@ %p\n' 2>/dev/null | sort -n | tail -1 | awk '{print int($1)}' || true)"
-  [[ -z "${epoch:-}" ]] && epoch="$(stat -c %Y "$subdir" 2>/dev/null || echo 0)"
   if [[ "$sub" == "11433" || "$epoch" -le "$cutoff_epoch" ]]; then
     heuristic_name="heuristics_rf1.py"
   else
@@ -220,17 +226,19 @@ if [[ -f "$t1" ]]; then
 fi
 
 scans_tsv="${staged_session}/sub-${sub}_ses-${ses}_scans.tsv"
-[[ -f "$scans_tsv" ]] && python3 "${scriptdir}/shiftdates.py" "$scans_tsv"
-
 review_report="${PROJECT_ROOT}/logs/reviews/prepdata-sub-${sub}-ses-${ses}-$(date +%Y%m%d-%H%M%S).tsv"
 mkdir -p "$(dirname "$review_report")"
-python3 "${scriptdir}/check_events.py" \
-  --subject "$sub" \
-  --session "$ses" \
-  --behavior-root "$BEHAVIOR_ROOT" \
-  --curation-file "$BEHAVIOR_CURATION_FILE" \
-  --bids-root "${stage_root}/bids" \
-  --review-tsv "$review_report"
+# Date shifting and the events check share one Python process.
+{
+  [[ -f "$scans_tsv" ]] && rf1_batch_line shiftdates "$scans_tsv"
+  rf1_batch_line check-events \
+    --subject "$sub" \
+    --session "$ses" \
+    --behavior-root "$BEHAVIOR_ROOT" \
+    --curation-file "$BEHAVIOR_CURATION_FILE" \
+    --bids-root "${stage_root}/bids" \
+    --review-tsv "$review_report"
+} | python3 "${scriptdir}/rf1.py" batch --stop-on-error
 
 if [[ ! -f "$target_dataset_description" ]]; then
   if [[ -f "$staged_dataset_description" ]]; then
@@ -256,6 +264,7 @@ if [[ -e "$target_session" ]]; then
 fi
 mkdir -p "$(dirname "$target_session")"
 mv "$staged_session" "$target_session"
+python3 "${scriptdir}/events_manifest.py" --bids-root "$bidsroot" update "$sub" "$ses"
 
 if [[ -d "$staged_heudiconv" ]]; then
   if [[ -e "$target_heudiconv" ]]; then
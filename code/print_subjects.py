@@ -4,15 +4,16 @@
 from __future__ import annotations
 
 import argparse
+from collections.abc import Sequence
 from pathlib import Path
 
 from pipeline_utils import read_subject_list
 
 
-def main() -> int:
+def main(argv: Sequence[str] | None = None) -> int:
     parser = argparse.ArgumentParser(description=__doc__)
     parser.add_argument("subject_list", type=Path)
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
     for subject in read_subject_list(args.subject_list):
         print(subject)
     return 0
@@ -6,6 +6,7 @@ from __future__ import annotations
 import argparse
 import hashlib
 import json
+from collections.abc import Sequence
 from datetime import datetime, timezone
 from pathlib import Path
 
@@ -24,7 +25,7 @@ def relative(path: Path, root: Path) -> str:
     return path.resolve().relative_to(root.resolve()).as_posix()
 
 
-def main() -> int:
+def main(argv: Sequence[str] | None = None) -> int:
     parser = argparse.ArgumentParser(description=__doc__)
     parser.add_argument("--project-root", required=True, type=Path)
     parser.add_argument("--source-json", required=True, type=Path)
@@ -38,7 +39,7 @@ def main() -> int:
     parser.add_argument("--run", required=True)
     parser.add_argument("--source-run", required=True)
     parser.add_argument("--reason", required=True)
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
 
     for path in (args.source_json, args.source_fieldmap, args.target_fieldmap):
         if not path.is_file():
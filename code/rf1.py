@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""Run the repository's small Python tools as subcommands of one interpreter.
+
+``rf1.py <tool> [args...]`` runs one tool exactly as ``<tool>.py [args...]``
+would. ``rf1.py batch`` reads one tool command line per stdin line, quoted as
+by the shell's ``printf %q``, and runs them in order in this process, so
+shell loops pay for one interpreter start instead of one per call.
+"""
+
+from __future__ import annotations
+
+import argparse
+import importlib
+import shlex
+import sys
+import traceback
+from collections.abc import Iterable, Sequence
+from pathlib import Path
+
+
+# Subcommand -> module whose ``main(argv)`` it runs.
+COMMANDS = {
+    "check-events": "check_events",
+    "check-pipeline-state": "check_pipeline_state",
+    "convert-behavior": "convert_behavior",
+    "events-manifest": "events_manifest",
+    "print-subjects": "print_subjects",
+    "record-warpkit-reuse": "record_warpkit_reuse",
+    "shiftdates": "shiftdates",
+}
+
+
+def _exit_status(code: object) -> int:
+    """Map a ``SystemExit`` code to a process exit status, as the interpreter does."""
+    if code is None:
+        return 0
+    if isinstance(code, int):
+        return code
+    print(code, file=sys.stderr)
+    return 1
+
+
+def run_command(argv: Sequence[str]) -> int:
+    """Run one ``<tool> [args...]`` command line and return its exit status.
+
+    ``sys.argv`` is set as if the tool's own script had been launched, so
+    usage and error messages name the tool rather than this dispatcher.
+    """
+    name, *args = argv
+    module_name = COMMANDS[name]
+    module = importlib.import_module(module_name)
+    saved_argv = sys.argv
+    sys.argv = [f"{module_name}.py", *args]
+    try:
+        status = _exit_status(module.main(args))
+    except SystemExit as exc:
+        status = _exit_status(exc.code)
+    finally:
+        sys.argv = saved_argv
+        sys.stdout.flush()
+        sys.stderr.flush()
+    return status
+
+
+def run_batch(
+    lines: Iterable[str], status_file: Path | None = None, stop_on_error: bool = False
+) -> int:
+    """Run each non-blank, non-comment line; return the highest exit status.
+
+    A tool that raises is reported with its traceback and counts as status 1
+    without stopping later lines unless ``stop_on_error`` is set. With
+    ``status_file``, one ``status<TAB>command`` line is written per command.
+    """
+    results: list[tuple[int, str]] = []
+    for number, line in enumerate(lines, start=1):
+        command = line.strip()
+        if not command or command.startswith("#"):
+            continue
+        try:
+            argv = shlex.split(command)
+        except ValueError as exc:
+            print(f"rf1 batch line {number}: {exc}", file=sys.stderr)
+            status = 2
+        else:
+            if argv[0] not in COMMANDS:
+                print(f"rf1 batch line {number}: unknown tool {argv[0]!r}", file=sys.stderr)
+                status = 2
+            else:
+                try:
+                    status = run_command(argv)
+                except Exception:  # noqa: BLE001 - report and keep running later lines.
+                    traceback.print_exc()
+                    status = 1
+        results.append((status, command))
+        if status and stop_on_error:
+            break
+    if status_file is not None:
+        status_file.write_text("".join(f"{status}\t{command}\n" for status, command in results))
+    return max((status for status, _ in results), default=0)
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    argv = list(sys.argv[1:] if argv is None else argv)
+    if argv and argv[0] in COMMANDS:
+        return run_command(argv)
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    subparsers = parser.add_subparsers(dest="command", required=True, metavar="{batch,<tool>}")
+    batch = subparsers.add_parser("batch", help="run tool command lines read from stdin")
+    batch.add_argument(
+        "--status-file",
+        type=Path,
+        help="Write one 'status<TAB>command' line per command, in input order.",
+    )
+    batch.add_argument("--stop-on-error", action="store_true", help="Stop at the first nonzero status.")
+    for name, module_name in COMMANDS.items():
+        subparsers.add_parser(name, help=f"run {module_name}.py", add_help=False)
+    args = parser.parse_args(argv)
+    return run_batch(sys.stdin, args.status_file, args.stop_on_error)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -85,22 +85,17 @@ args=(--tasks "$tasks" --behavior-root "$BEHAVIOR_ROOT" --bids-root "${PROJECT_R
 ((overwrite)) && args+=(--overwrite)
 
 IFS=',' read -r -a session_values <<< "$sessions"
-pids=()
-launched=0
+for ses in "${session_values[@]}"; do
+  args+=(--session "$ses")
+done
 if ((include_source_excluded)); then
   RF1_INCLUDE_SOURCE_EXCLUDED=1
 fi
-while IFS= read -r sub; do
-  for ses in "${session_values[@]}"; do
-    rf1_wait_for_jobs "$max_jobs"
-    echo "Launching behavior conversion sub-${sub} ses-${ses}"
-    python3 "${SCRIPT_DIR}/convert_behavior.py" \
-      --subject "$sub" --session "$ses" "${args[@]}" &
-    pids+=("$!")
-    launched=$((launched + 1))
-  done
-done < <(rf1_read_subjects "$sublist")
+subjects_file="$(mktemp)"
+trap 'rm -f "$subjects_file"' EXIT
+rf1_read_subjects "$sublist" > "$subjects_file"
 
-if ((launched)); then
-  rf1_wait_all "${pids[@]}"
-fi
+# One converter process validates the curation file once and fans the
+# subject/sessions out to its own workers.
+python3 "${SCRIPT_DIR}/convert_behavior.py" \
+  --sublist "$subjects_file" --jobs "$max_jobs" "${args[@]}"
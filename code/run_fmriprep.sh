@@ -3,7 +3,7 @@ set -euo pipefail
 
 usage() {
   cat >&2 <<'USAGE'
-Usage: bash run_fmriprep.sh [--sublist FILE] [--jobs N] [--dry-run] [--overwrite]
+Usage: bash run_fmriprep.sh [--sublist FILE] [--jobs N] [--dry-run] [--resume] [--overwrite]
 USAGE
 }
 
@@ -15,6 +15,7 @@ rf1_load_config
 sublist="$BATCH_SUBLIST"
 max_jobs=2
 dry_run=0
+resume=0
 overwrite=0
 
 while (($#)); do
@@ -35,6 +36,10 @@ while (($#)); do
       overwrite=1
       shift
       ;;
+    --resume)
+      resume=1
+      shift
+      ;;
     -h|--help)
       usage
       exit 0
@@ -54,43 +59,19 @@ fi
 rf1_require_file "$sublist"
 rf1_require_file "${SCRIPT_DIR}/fmriprep.sh"
 
-if [[ -z "$FMRIPREP_NPROCS" ]]; then
-  FMRIPREP_NPROCS=$((FMRIPREP_TOTAL_NPROCS / max_jobs))
-  ((FMRIPREP_NPROCS < 1)) && FMRIPREP_NPROCS=1
-fi
-if [[ -z "$FMRIPREP_MEM_MB" ]]; then
-  FMRIPREP_MEM_MB=$((FMRIPREP_TOTAL_MEM_MB / max_jobs))
-  ((FMRIPREP_MEM_MB < 8000)) && FMRIPREP_MEM_MB=8000
-fi
-if ((FMRIPREP_OMP_NTHREADS > FMRIPREP_NPROCS)); then
-  FMRIPREP_OMP_NTHREADS="$FMRIPREP_NPROCS"
-fi
-export FMRIPREP_NPROCS FMRIPREP_OMP_NTHREADS FMRIPREP_MEM_MB
 echo "Using subject list: $sublist"
-echo "fMRIPrep resource plan: up to ${max_jobs} subject job(s); each gets --nprocs ${FMRIPREP_NPROCS}, --omp-nthreads ${FMRIPREP_OMP_NTHREADS}, --mem ${FMRIPREP_MEM_MB} MB"
+echo "fMRIPrep resource plan: up to ${max_jobs} subject job(s) within ${FMRIPREP_TOTAL_NPROCS} CPU thread(s) and ${FMRIPREP_TOTAL_MEM_MB} MB; --nprocs and --mem are sized per subject"
 
 args=()
 ((dry_run)) && args+=(--dry-run)
+((resume)) && args+=(--resume)
 ((overwrite)) && args+=(--overwrite)
+[[ -n "$FMRIPREP_NPROCS" ]] && args+=(--nprocs "$FMRIPREP_NPROCS")
+[[ -n "$FMRIPREP_MEM_MB" ]] && args+=(--mem-mb "$FMRIPREP_MEM_MB")
 
-pids=()
-subjects=()
-while IFS= read -r sub; do
-  rf1_wait_for_jobs "$max_jobs"
-  echo "Launching fMRIPrep sub-${sub}"
-  bash "${SCRIPT_DIR}/fmriprep.sh" "${args[@]}" "$sub" &
-  pids+=("$!")
-  subjects+=("$sub")
-done < <(rf1_read_subjects "$sublist")
-
-failed=0
-for i in "${!pids[@]}"; do
-  if wait "${pids[$i]}"; then
-    echo "fMRIPrep completed: sub-${subjects[$i]}"
-  else
-    status=$?
-    echo "fMRIPrep FAILED: sub-${subjects[$i]} (exit ${status})" >&2
-    failed=1
-  fi
-done
-exit "$failed"
+python3 "${SCRIPT_DIR}/fmriprep_resources.py" run "${args[@]}" \
+  --sublist <(rf1_read_subjects "$sublist") \
+  --jobs "$max_jobs" \
+  --total-nprocs "$FMRIPREP_TOTAL_NPROCS" \
+  --total-mem-mb "$FMRIPREP_TOTAL_MEM_MB" \
+  --omp-nthreads "$FMRIPREP_OMP_NTHREADS"
@@ -6,7 +6,9 @@ usage() {
 Usage: bash run_logged.sh [--label LABEL] [--include-full-log] -- COMMAND [ARGS...] [--check CHECK_COMMAND [ARGS...]]
 
 Runs COMMAND, writes one timestamped raw log under ignored logs/runs/, and
-writes one compact Git-trackable record under logs/records/.
+writes one compact Git-trackable record under logs/records/. Wall, CPU, peak
+memory, and block I/O of COMMAND and the checker are appended to
+logs/telemetry/rusage.jsonl (see telemetry.py report).
 
 The -- marker means run_logged.sh options stop there and the real command
 starts after it. The optional --check marker starts a checker command that runs
@@ -79,6 +81,8 @@ raw_log="${raw_dir}/${timestamp}_${label}.log"
 record="${record_dir}/${timestamp}_${label}.md"
 status_file="${raw_log}.status"
 mkdir -p "$raw_dir" "$record_dir"
+# Scheduled per-run jobs inside COMMAND record their usage under the same batch.
+export RF1_TELEMETRY_BATCH="${timestamp}_${label}"
 
 git_commit="$(git -C "$PROJECT_ROOT" rev-parse --short HEAD 2>/dev/null || echo unknown)"
 branch="$(git -C "$PROJECT_ROOT" branch --show-current 2>/dev/null || echo unknown)"
@@ -112,7 +116,7 @@ set +e
   echo "COMMAND: ${command_string}"
   echo
 
-  "${cmd[@]}"
+  python3 "${scriptdir}/telemetry.py" exec --stage "$label" -- "${cmd[@]}"
   command_status=$?
   echo
   echo "COMMAND EXIT: ${command_status}"
@@ -121,7 +125,7 @@ set +e
     echo
     echo "CHECK COMMAND: ${check_string}"
     echo
-    "${check_cmd[@]}"
+    python3 "${scriptdir}/telemetry.py" exec --stage "$label" --level check -- "${check_cmd[@]}"
     check_status=$?
     echo
     echo "CHECK EXIT: ${check_status}"
@@ -171,6 +175,13 @@ if [[ -z "$summary" ]]; then
     summary="CHECK FAILED: exit ${CHECK_STATUS}; no CHECK PASSED/FAILED line found."
   fi
 fi
+# Each telemetry.py exec tags its summary with its level and prints it after
+# the wrapped command exits, so the last tagged line is ours even when the
+# command printed nested RESOURCES lines; the command's is searched only
+# before the check starts.
+resources="$(CHECK_LINE="CHECK COMMAND: ${check_string}" awk \
+  '$0 == ENVIRON["CHECK_LINE"] { exit } /^RESOURCES\[command\]: / { line = $0 } END { print line }' "$raw_log")"
+check_resources="$(grep -E '^RESOURCES\[check\]: ' "$raw_log" | tail -n 1 || true)"
 include_tail=0
 if [[ "$COMMAND_STATUS" != "0" ]]; then
   include_tail=1
@@ -191,6 +202,8 @@ fi
   echo "- Command exit: ${COMMAND_STATUS}"
   echo "- Check exit: ${CHECK_STATUS}"
   echo "- Summary: ${summary}"
+  [[ -n "$resources" ]] && echo "- Command resources: ${resources#RESOURCES\[command\]: }"
+  [[ -n "$check_resources" ]] && echo "- Check resources: ${check_resources#RESOURCES\[check\]: }"
   echo
   echo "## Command"
   echo
@@ -3,7 +3,7 @@ set -euo pipefail
 
 usage() {
   cat >&2 <<'USAGE'
-Usage: bash run_mriqc.sh [--sublist FILE] [--jobs N] [--dry-run]
+Usage: bash run_mriqc.sh [--sublist FILE] [--jobs N] [--dry-run] [--resume]
 USAGE
 }
 
@@ -15,6 +15,7 @@ rf1_load_config
 sublist="$BATCH_SUBLIST"
 max_jobs=8
 dry_run=0
+resume=0
 
 while (($#)); do
   case "$1" in
@@ -30,6 +31,10 @@ while (($#)); do
       dry_run=1
       shift
       ;;
+    --resume)
+      resume=1
+      shift
+      ;;
     -h|--help)
       usage
       exit 0
@@ -44,19 +49,16 @@ done
 rf1_require_file "$sublist"
 rf1_require_file "${SCRIPT_DIR}/mriqc.sh"
 echo "Using subject list: $sublist"
-echo "MRIQC job plan: up to ${max_jobs} subject/session job(s)"
+echo "MRIQC job plan: up to ${max_jobs} subject/session job(s) of ${MRIQC_NPROCS} slot(s) and ${MRIQC_MEM_GB} GB within ${RF1_TOTAL_NPROCS} slot(s) and ${RF1_TOTAL_MEM_MB} MB"
 
 args=()
 ((dry_run)) && args+=(--dry-run)
+((resume)) && args+=(--resume)
 
-pids=()
-while IFS= read -r sub; do
-  for ses in 01 02; do
-    rf1_wait_for_jobs "$max_jobs"
-    echo "Launching MRIQC sub-${sub} ses-${ses}"
-    bash "${SCRIPT_DIR}/mriqc.sh" "${args[@]}" "$sub" "$ses" &
-    pids+=("$!")
-  done
-done < <(rf1_read_subjects "$sublist")
-
-rf1_wait_all "${pids[@]}"
+python3 "${SCRIPT_DIR}/schedule_jobs.py" mriqc "${args[@]}" \
+  --sublist <(rf1_read_subjects "$sublist") \
+  --jobs "$max_jobs" \
+  --slots "$RF1_TOTAL_NPROCS" \
+  --mem-mb "$RF1_TOTAL_MEM_MB" \
+  --item-slots "$MRIQC_NPROCS" \
+  --item-mem-mb "$((MRIQC_MEM_GB * 1024))"
@@ -3,7 +3,7 @@ set -euo pipefail
 
 usage() {
   cat >&2 <<'USAGE'
-Usage: bash run_tedana.sh [--sublist FILE] [--jobs N] [--dry-run] [--overwrite]
+Usage: bash run_tedana.sh [--sublist FILE] [--jobs N] [--dry-run] [--resume] [--overwrite]
 USAGE
 }
 
@@ -15,6 +15,7 @@ rf1_load_config
 sublist="$BATCH_SUBLIST"
 max_jobs=8
 dry_run=0
+resume=0
 overwrite=0
 
 while (($#)); do
@@ -35,6 +36,10 @@ while (($#)); do
       overwrite=1
       shift
       ;;
+    --resume)
+      resume=1
+      shift
+      ;;
     -h|--help)
       usage
       exit 0
@@ -49,19 +54,18 @@ done
 rf1_require_file "$sublist"
 rf1_require_file "${SCRIPT_DIR}/tedana.sh"
 echo "Using subject list: $sublist"
-echo "TEDANA job plan: up to ${max_jobs} subject job(s)"
+echo "TEDANA job plan: up to ${max_jobs} run job(s) of ${TEDANA_OMP_THREADS} thread(s) and ${TEDANA_MEM_MB} MB within ${RF1_TOTAL_NPROCS} slot(s) and ${RF1_TOTAL_MEM_MB} MB"
 echo "TEDANA executable: ${TEDANA_CMD}"
 
 args=()
 ((dry_run)) && args+=(--dry-run)
+((resume)) && args+=(--resume)
 ((overwrite)) && args+=(--overwrite)
 
-pids=()
-while IFS= read -r sub; do
-  rf1_wait_for_jobs "$max_jobs"
-  echo "Launching TEDANA sub-${sub}"
-  bash "${SCRIPT_DIR}/tedana.sh" "${args[@]}" "$sub" &
-  pids+=("$!")
-done < <(rf1_read_subjects "$sublist")
-
-rf1_wait_all "${pids[@]}"
+python3 "${SCRIPT_DIR}/schedule_jobs.py" tedana "${args[@]}" \
+  --sublist <(rf1_read_subjects "$sublist") \
+  --jobs "$max_jobs" \
+  --slots "$RF1_TOTAL_NPROCS" \
+  --mem-mb "$RF1_TOTAL_MEM_MB" \
+  --item-slots "$TEDANA_OMP_THREADS" \
+  --item-mem-mb "$TEDANA_MEM_MB"
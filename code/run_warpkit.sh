@@ -3,7 +3,7 @@ set -euo pipefail
 
 usage() {
   cat >&2 <<'USAGE'
-Usage: bash run_warpkit.sh [--sublist FILE] [--jobs N] [--dry-run] [--overwrite]
+Usage: bash run_warpkit.sh [--sublist FILE] [--jobs N] [--dry-run] [--resume] [--overwrite]
 USAGE
 }
 
@@ -15,6 +15,7 @@ rf1_load_config
 sublist="$BATCH_SUBLIST"
 max_jobs=8
 dry_run=0
+resume=0
 overwrite=0
 omp_threads="${OMP_THREADS:-4}"
 julia_threads="${JULIA_NUM_THREADS:-1}"
@@ -41,6 +42,10 @@ while (($#)); do
       overwrite=1
       shift
       ;;
+    --resume)
+      resume=1
+      shift
+      ;;
     -h|--help)
       usage
       exit 0
@@ -55,53 +60,28 @@ done
 rf1_require_file "$sublist"
 rf1_require_file "${SCRIPT_DIR}/warpkit.sh"
 echo "Using subject list: $sublist"
-echo "Warpkit job plan: up to ${max_jobs} subject/session/task/run job(s); backend ${warpkit_backend}; command ${warpkit_cmd_name}; WarpKit n_cpus ${warpkit_n_cpus}; OMP threads per job ${omp_threads}; Julia threads ${julia_threads}; Julia GC threads ${julia_gc_threads}"
+echo "Warpkit job plan: up to ${max_jobs} subject/session/task/run job(s) of ${WARPKIT_MEM_MB} MB within ${RF1_TOTAL_NPROCS} slot(s) and ${RF1_TOTAL_MEM_MB} MB; backend ${warpkit_backend}; command ${warpkit_cmd_name}; WarpKit n_cpus ${warpkit_n_cpus}; OMP threads per job ${omp_threads}; Julia threads ${julia_threads}; Julia GC threads ${julia_gc_threads}"
 
 args=()
 ((dry_run)) && args+=(--dry-run)
+((resume)) && args+=(--resume)
 ((overwrite)) && args+=(--overwrite)
 
-pids=()
-for reuse_pass in normal reuse; do
-  echo "Starting WarpKit ${reuse_pass} pass."
-  while IFS= read -r sub; do
-    for ses in 01 02; do
-      if [[ "$ses" == "01" ]]; then
-        tasks=(ugr trust sharedreward doors socialdoors)
-      else
-        tasks=(ugr doors socialdoors)
-      fi
-      for task in "${tasks[@]}"; do
-        runs=(1 2)
-        [[ "$task" == "doors" || "$task" == "socialdoors" ]] && runs=(1)
-        for run in "${runs[@]}"; do
-          is_reuse=0
-          if rf1_warpkit_reuse_spec "$sub" "$ses" "$task" "$run" >/dev/null; then
-            is_reuse=1
-          fi
-          if [[ "$reuse_pass" == "normal" && "$is_reuse" -eq 1 ]] || \
-             [[ "$reuse_pass" == "reuse" && "$is_reuse" -eq 0 ]]; then
-            continue
-          fi
+export APPTAINERENV_OPENBLAS_NUM_THREADS=1
+export APPTAINERENV_NUMEXPR_NUM_THREADS=1
+export APPTAINERENV_MKL_NUM_THREADS=1
+export APPTAINERENV_JULIA_NUM_THREADS="$julia_threads"
+export APPTAINERENV_JULIA_NUM_GC_THREADS="$julia_gc_threads"
+export WARPKIT_BACKEND="$warpkit_backend"
+export WARPKIT_CMD="$warpkit_cmd_name"
+export WARPKIT_N_CPUS="$warpkit_n_cpus"
 
-          rf1_wait_for_jobs "$max_jobs"
-          echo "Launching warpkit sub-${sub} ses-${ses} task-${task} run-${run}"
-          APPTAINERENV_OMP_NUM_THREADS="$omp_threads" \
-          APPTAINERENV_OPENBLAS_NUM_THREADS=1 \
-          APPTAINERENV_NUMEXPR_NUM_THREADS=1 \
-          APPTAINERENV_MKL_NUM_THREADS=1 \
-          APPTAINERENV_JULIA_NUM_THREADS="$julia_threads" \
-          APPTAINERENV_JULIA_NUM_GC_THREADS="$julia_gc_threads" \
-          WARPKIT_BACKEND="$warpkit_backend" \
-          WARPKIT_CMD="$warpkit_cmd_name" \
-          WARPKIT_N_CPUS="$warpkit_n_cpus" \
-            bash "${SCRIPT_DIR}/warpkit.sh" "${args[@]}" "$sub" "$ses" "$task" "$run" &
-          pids+=("$!")
-        done
-      done
-    done
-  done < <(rf1_read_subjects "$sublist")
-
-  rf1_wait_all "${pids[@]}"
-  pids=()
-done
+# Reviewed reuse runs are scheduled after every ordinary estimate finishes.
+python3 "${SCRIPT_DIR}/schedule_jobs.py" warpkit "${args[@]}" \
+  --sublist <(rf1_read_subjects "$sublist") \
+  --reuse-file "$WARPKIT_REUSE_FILE" \
+  --jobs "$max_jobs" \
+  --slots "$RF1_TOTAL_NPROCS" \
+  --mem-mb "$RF1_TOTAL_MEM_MB" \
+  --item-slots "$omp_threads" \
+  --item-mem-mb "$WARPKIT_MEM_MB"
@@ -0,0 +1,583 @@
+#!/usr/bin/env python3
+"""Run per-run TEDANA, WarpKit, or MRIQC work under CPU-slot and memory budgets.
+
+The subject list is expanded into one work item per subject/session/task/run
+(per subject/session for MRIQC); items whose outputs already pass the
+completion checks are skipped. Items start whenever their slots and memory fit
+the remaining budget, failed items are retried, and every finished item is
+recorded in a state file so an interrupted batch resumes where it stopped.
+An item whose prerequisite failed is recorded as blocked and never started.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+from collections.abc import Iterable, Sequence
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, TextIO
+
+from pipeline_utils import (
+    atomic_write_json,
+    is_tedana_complete,
+    load_warpkit_reuse,
+    read_subject_list,
+    runs_for_task,
+    tasks_for_session,
+    warpkit_expected_outputs,
+)
+from telemetry import append_record, default_batch, key_entities, rusage_record, telemetry_file
+
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+SCRIPT_DIR = Path(__file__).resolve().parent
+SESSIONS = ("01", "02")
+STATE_VERSION = 1
+STAGES = ("tedana", "warpkit", "mriqc")
+# Stage -> default (slots, memory in MB) reserved per work item.
+DEFAULT_ITEM_COST = {
+    "tedana": (2, 8000),
+    "warpkit": (4, 6000),
+    "mriqc": (8, 20 * 1024),
+}
+# Thread-count variables pinned to an item's slots.
+THREAD_ENV = {
+    "tedana": ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"),
+    "warpkit": ("APPTAINERENV_OMP_NUM_THREADS",),
+    "mriqc": (),
+}
+TAIL_LINES = 40
+RSS_SAMPLE_SECONDS = 10.0
+# How long interrupted items get to exit after SIGTERM before SIGKILL.
+TERMINATE_GRACE_SECONDS = 10.0
+
+
+@dataclass(frozen=True)
+class WorkItem:
+    key: str
+    command: tuple[str, ...]
+    slots: int
+    mem_mb: int
+    phase: int = 0
+    env: tuple[tuple[str, str], ...] = ()
+    # Keys of items that must succeed before this one may start.
+    after: tuple[str, ...] = ()
+
+
+@dataclass
+class _Running:
+    item: WorkItem
+    process: subprocess.Popen
+    attempt: int
+    started: float
+    log: TextIO = field(repr=False)
+    started_at: str = ""
+    peak_rss_mb: float | None = None
+
+
+def _worker(stage: str, args: Sequence[str], *operands: str) -> tuple[str, ...]:
+    return ("bash", str(SCRIPT_DIR / f"{stage}.sh"), *args, *operands)
+
+
+def _session_dirs(project_root: Path, subject: str) -> Iterable[str]:
+    for session in SESSIONS:
+        if (project_root / "bids" / f"sub-{subject}" / f"ses-{session}").is_dir():
+            yield session
+
+
+def expand_items(
+    stage: str,
+    subjects: Iterable[str],
+    project_root: Path,
+    slots: int,
+    mem_mb: int,
+    worker_args: Sequence[str] = (),
+    overwrite: bool = False,
+    reuse_file: Path | None = None,
+) -> tuple[list[WorkItem], list[str]]:
+    """Return the work items still to run and the keys already complete.
+
+    WarpKit items listed in the reviewed reuse manifest get phase 1 so every
+    ordinary estimate, including their source fieldmaps, finishes first, and
+    they wait on their source run so a failed source blocks the reuse.
+    """
+    env = tuple((name, str(slots)) for name in THREAD_ENV[stage])
+    deriv_root = project_root / "derivatives"
+    reuse = load_warpkit_reuse(reuse_file) if stage == "warpkit" and reuse_file else {}
+    items: list[WorkItem] = []
+    complete: list[str] = []
+    for subject in subjects:
+        for session in _session_dirs(project_root, subject):
+            if stage == "mriqc":
+                key = f"sub-{subject}_ses-{session}"
+                items.append(
+                    WorkItem(key, _worker(stage, worker_args, subject, session), slots, mem_mb, env=env)
+                )
+                continue
+            for task in tasks_for_session(session):
+                for run in runs_for_task(task):
+                    key = f"sub-{subject}_ses-{session}_task-{task}_run-{run}"
+                    after: tuple[str, ...] = ()
+                    if stage == "tedana":
+                        done = is_tedana_complete(deriv_root, subject, session, task, run)
+                        phase = 0
+                    else:
+                        is_reuse = (subject, session, task, run) in reuse
+                        outputs = warpkit_expected_outputs(
+                            project_root, subject, session, task, run, is_reuse
+                        )
+                        done = all(path.is_file() for path in outputs)
+                        phase = int(is_reuse)
+                        if is_reuse:
+                            source_run = reuse[(subject, session, task, run)].source_run
+                            after = (f"sub-{subject}_ses-{session}_task-{task}_run-{source_run}",)
+                    if done and not overwrite:
+                        complete.append(key)
+                        continue
+                    command = _worker(stage, worker_args, subject, session, task, run)
+                    items.append(WorkItem(key, command, slots, mem_mb, phase, env, after))
+    return items, complete
+
+
+def read_state(path: Path) -> dict[str, dict[str, Any]]:
+    """Return recorded item outcomes by key, or nothing for a missing or stale file."""
+    try:
+        record = json.loads(path.read_text())
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(record, dict) or record.get("Version") != STATE_VERSION:
+        return {}
+    items = record.get("Items")
+    return items if isinstance(items, dict) else {}
+
+
+def _format_seconds(seconds: float) -> str:
+    minutes, secs = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}h{minutes:02d}m" if hours else f"{minutes}m{secs:02d}s"
+
+
+def _tail(path: Path, lines: int = TAIL_LINES) -> str:
+    try:
+        return "".join(path.read_text(errors="replace").splitlines(keepends=True)[-lines:])
+    except OSError:
+        return ""
+
+
+def process_tree_rss_mb(roots: Iterable[int], proc: Path = Path("/proc")) -> dict[int, float]:
+    """Return the summed resident memory in MB of each root process and its descendants.
+
+    Reads ``/proc`` once for all roots; returns nothing where it is unavailable.
+    """
+    children: dict[int, list[int]] = {}
+    pages: dict[int, int] = {}
+    try:
+        entries = os.scandir(proc)
+    except OSError:
+        return {}
+    with entries:
+        for entry in entries:
+            if not entry.name.isdigit():
+                continue
+            try:
+                with open(os.path.join(entry.path, "stat")) as handle:
+                    stat = handle.read()
+                with open(os.path.join(entry.path, "statm")) as handle:
+                    statm = handle.read().split()
+            except OSError:
+                continue
+            # The command name in field 2 may contain spaces; fields after it are fixed.
+            ppid = int(stat.rsplit(")", 1)[1].split()[1])
+            children.setdefault(ppid, []).append(int(entry.name))
+            pages[int(entry.name)] = int(statm[1])
+    page_mb = os.sysconf("SC_PAGE_SIZE") / 2**20
+    totals: dict[int, float] = {}
+    for root in roots:
+        if root not in pages:
+            continue
+        stack, total = [root], 0
+        while stack:
+            pid = stack.pop()
+            total += pages.get(pid, 0)
+            stack.extend(children.get(pid, ()))
+        totals[root] = total * page_mb
+    return totals
+
+
+class _Terminated(Exception):
+    """Raised in the scheduler loop when the batch system sends SIGTERM."""
+
+
+def _raise_terminated(signum: int, frame: Any) -> None:
+    raise _Terminated(signum)
+
+
+def _signal_group(pgid: int, signum: int) -> None:
+    try:
+        os.killpg(pgid, signum)
+    except ProcessLookupError:
+        pass
+
+
+class Scheduler:
+    """Start work items as slots and memory allow, retrying failures."""
+
+    def __init__(
+        self,
+        items: Sequence[WorkItem],
+        total_slots: int,
+        total_mem_mb: int,
+        state_path: Path,
+        log_dir: Path,
+        max_jobs: int | None = None,
+        retries: int = 0,
+        poll_seconds: float = 1.0,
+        progress_seconds: float = 30.0,
+        echo_logs: bool = False,
+        stage: str = "",
+        telemetry: Path | None = None,
+        batch: str = "",
+        out: TextIO = sys.stdout,
+    ) -> None:
+        self.total_slots = total_slots
+        self.total_mem_mb = total_mem_mb
+        self.state_path = state_path
+        self.log_dir = log_dir
+        self.max_jobs = max_jobs
+        self.retries = retries
+        self.poll_seconds = poll_seconds
+        self.progress_seconds = progress_seconds
+        self.echo_logs = echo_logs
+        self.stage = stage
+        self.telemetry = telemetry
+        self.batch = batch
+        self.out = out
+        self.state = read_state(state_path)
+        self.queue: list[WorkItem] = []
+        self.resumed: list[str] = []
+        for item in items:
+            if self.state.get(item.key, {}).get("status") == "done":
+                self.resumed.append(item.key)
+            else:
+                self.queue.append(item)
+        self.attempts = {item.key: 0 for item in self.queue}
+        self.running: list[_Running] = []
+        self.done: list[str] = []
+        self.failed: list[str] = []
+        self.blocked: list[str] = []
+        self._last_progress = 0.0
+        self._last_rss = 0.0
+
+    @property
+    def used_slots(self) -> int:
+        return sum(job.item.slots for job in self.running)
+
+    @property
+    def used_mem_mb(self) -> int:
+        return sum(job.item.mem_mb for job in self.running)
+
+    def _fits(self, item: WorkItem) -> bool:
+        """Return whether ``item`` fits now; an oversized item runs alone."""
+        if not self.running:
+            return True
+        if self.max_jobs is not None and len(self.running) >= self.max_jobs:
+            return False
+        return (
+            self.used_slots + item.slots <= self.total_slots
+            and self.used_mem_mb + item.mem_mb <= self.total_mem_mb
+        )
+
+    def _start(self, item: WorkItem) -> None:
+        self.attempts[item.key] += 1
+        attempt = self.attempts[item.key]
+        self.log_dir.mkdir(parents=True, exist_ok=True)
+        log = (self.log_dir / f"{item.key}.log").open("a" if attempt > 1 else "w")
+        log.write(f"# attempt {attempt}: {' '.join(item.command)}\n")
+        log.flush()
+        process = subprocess.Popen(
+            item.command,
+            stdout=log,
+            stderr=subprocess.STDOUT,
+            env={**os.environ, **dict(item.env)},
+            # Its own process group, so an interrupt reaches the item's children too.
+            start_new_session=True,
+        )
+        started_at = datetime.now().astimezone().isoformat(timespec="seconds")
+        self.running.append(_Running(item, process, attempt, time.monotonic(), log, started_at))
+        print(f"START {item.key} (attempt {attempt}; {item.slots} slot(s), {item.mem_mb} MB)", file=self.out)
+
+    def _record(self, key: str, status: str, **fields: Any) -> None:
+        self.state[key] = {"status": status, "attempts": self.attempts[key], **fields}
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        atomic_write_json(self.state_path, {"Version": STATE_VERSION, "Items": self.state})
+
+    def _sample_rss(self) -> None:
+        """Track each running item's peak process-tree memory every ``RSS_SAMPLE_SECONDS``."""
+        now = time.monotonic()
+        if not self.running or now - self._last_rss < RSS_SAMPLE_SECONDS:
+            return
+        self._last_rss = now
+        sizes = process_tree_rss_mb(job.process.pid for job in self.running)
+        for job in self.running:
+            size = sizes.get(job.process.pid)
+            if size is not None and (job.peak_rss_mb is None or size > job.peak_rss_mb):
+                job.peak_rss_mb = size
+
+    def _finish(self, job: _Running, returncode: int, usage: Any = None) -> None:
+        job.log.close()
+        self.running.remove(job)
+        key = job.item.key
+        wall_s = time.monotonic() - job.started
+        seconds = round(wall_s, 1)
+        if self.telemetry is not None and usage is not None:
+            append_record(
+                self.telemetry,
+                rusage_record(
+                    usage,
+                    wall_s,
+                    returncode,
+                    batch=self.batch,
+                    level="item",
+                    stage=self.stage,
+                    item=key,
+                    **key_entities(key),
+                    attempt=job.attempt,
+                    started=job.started_at,
+                    command=" ".join(job.item.command),
+                ),
+            )
+        log_path = self.log_dir / f"{key}.log"
+        peak_rss_mb = None if job.peak_rss_mb is None else round(job.peak_rss_mb)
+        if returncode == 0:
+            self.done.append(key)
+            self._record(
+                key, "done", returncode=0, seconds=seconds, peak_rss_mb=peak_rss_mb, log=str(log_path)
+            )
+            print(f"DONE  {key} in {_format_seconds(seconds)}", file=self.out)
+            if self.echo_logs:
+                print(log_path.read_text(errors="replace"), end="", file=self.out)
+            return
+        if job.attempt <= self.retries:
+            self.queue.append(job.item)
+            print(
+                f"RETRY {key} (exit {returncode}; attempt {job.attempt} of {self.retries + 1})",
+                file=self.out,
+            )
+            return
+        self.failed.append(key)
+        self._record(
+            key, "failed", returncode=returncode, seconds=seconds, peak_rss_mb=peak_rss_mb, log=str(log_path)
+        )
+        print(f"FAILED {key} (exit {returncode}); see {log_path}", file=self.out)
+        print(_tail(log_path), end="", file=self.out)
+
+    def _unmet(self, item: WorkItem) -> tuple[str | None, bool]:
+        """Return a failed prerequisite of ``item``, and whether one is still pending."""
+        pending_keys = {queued.key for queued in self.queue} | {job.item.key for job in self.running}
+        for key in item.after:
+            if key in self.failed or key in self.blocked:
+                return key, False
+        return None, any(key in pending_keys for key in item.after)
+
+    def _dispatch(self) -> None:
+        """Start queued items in order, backfilling around ones that do not fit."""
+        for item in list(self.queue):
+            failed_key, _ = self._unmet(item)
+            if failed_key is not None:
+                self.queue.remove(item)
+                self.blocked.append(item.key)
+                self._record(item.key, "blocked", after=failed_key)
+                print(f"BLOCKED {item.key} ({failed_key} failed)", file=self.out)
+        active_phase = min(
+            (item.phase for item in [*self.queue, *(job.item for job in self.running)]),
+            default=0,
+        )
+        for item in list(self.queue):
+            if item.phase == active_phase and not self._unmet(item)[1] and self._fits(item):
+                self.queue.remove(item)
+                self._start(item)
+
+    def progress(self, force: bool = False) -> None:
+        now = time.monotonic()
+        if not force and now - self._last_progress < self.progress_seconds:
+            return
+        self._last_progress = now
+        print(
+            f"[{time.strftime('%H:%M:%S')}] {len(self.done) + len(self.resumed)} done, "
+            f"{len(self.running)} running, {len(self.queue)} queued, {len(self.failed)} failed, "
+            f"{len(self.blocked)} blocked | "
+            f"slots {self.used_slots}/{self.total_slots} | memory {self.used_mem_mb}/{self.total_mem_mb} MB",
+            file=self.out,
+        )
+        for job in self.running:
+            peak = "" if job.peak_rss_mb is None else f"  peak {job.peak_rss_mb:.0f} MB"
+            print(
+                f"  {job.item.key:<48} attempt {job.attempt}  "
+                f"{_format_seconds(now - job.started):>7}  {job.item.slots} slot(s)  {job.item.mem_mb} MB{peak}",
+                file=self.out,
+            )
+        self.out.flush()
+
+    def _terminate_running(self) -> None:
+        """Stop every running item's process group, escalating to SIGKILL after the grace period."""
+        for job in self.running:
+            _signal_group(job.process.pid, signal.SIGTERM)
+        deadline = time.monotonic() + TERMINATE_GRACE_SECONDS
+        for job in self.running:
+            try:
+                job.process.wait(timeout=max(0.0, deadline - time.monotonic()))
+            except subprocess.TimeoutExpired:
+                pass
+        # Children that outlived their item or ignored SIGTERM must not keep
+        # writing outputs that --resume is about to regenerate.
+        for job in self.running:
+            _signal_group(job.process.pid, signal.SIGKILL)
+        for job in self.running:
+            job.process.wait()
+            job.log.close()
+
+    def run(self) -> int:
+        """Run every queued item; return 1 if any item failed after its retries or was blocked.
+
+        On Ctrl-C or SIGTERM each running item's process group, including the
+        tools it launched, is terminated and the state file keeps every
+        finished item, so ``--resume`` reruns only the rest.
+        """
+        if self.resumed:
+            print(f"Resuming: {len(self.resumed)} item(s) already done in {self.state_path}", file=self.out)
+        # Signal handlers can only be installed from the main thread.
+        in_main = threading.current_thread() is threading.main_thread()
+        previous_handler = signal.signal(signal.SIGTERM, _raise_terminated) if in_main else None
+        try:
+            while self.queue or self.running:
+                before = (len(self.queue), len(self.running))
+                self._dispatch()
+                self._sample_rss()
+                for job in list(self.running):
+                    # wait4 rather than poll() so the item's rusage is kept.
+                    pid, status, usage = os.wait4(job.process.pid, os.WNOHANG)
+                    if pid:
+                        job.process.returncode = os.waitstatus_to_exitcode(status)
+                        self._finish(job, job.process.returncode, usage)
+                self.progress(force=(len(self.queue), len(self.running)) != before)
+                if self.running:
+                    time.sleep(self.poll_seconds)
+        except (KeyboardInterrupt, _Terminated) as exc:
+            self._terminate_running()
+            reason = "Terminated" if isinstance(exc, _Terminated) else "Interrupted"
+            print(f"{reason}; {len(self.running)} running item(s) will be rerun on resume.", file=self.out)
+            return 128 + signal.SIGTERM if isinstance(exc, _Terminated) else 130
+        finally:
+            if in_main:
+                signal.signal(signal.SIGTERM, previous_handler)
+        return 1 if self.failed or self.blocked else 0
+
+
+def _positive_env(name: str, default: int) -> int:
+    value = os.environ.get(name, "")
+    return int(value) if value.isdigit() and int(value) > 0 else default
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("stage", choices=STAGES)
+    parser.add_argument("--sublist", type=Path, required=True)
+    parser.add_argument("--project-root", type=Path, default=PROJECT_ROOT)
+    parser.add_argument(
+        "--slots",
+        type=int,
+        default=_positive_env("RF1_TOTAL_NPROCS", os.cpu_count() or 1),
+        help="CPU slots shared by running items (default: RF1_TOTAL_NPROCS or the CPU count).",
+    )
+    parser.add_argument(
+        "--mem-mb",
+        type=int,
+        default=_positive_env("RF1_TOTAL_MEM_MB", 196000),
+        help="Memory in MB shared by running items (default: RF1_TOTAL_MEM_MB or 196000).",
+    )
+    parser.add_argument("--item-slots", type=int, help="Slots reserved per item; also its thread cap.")
+    parser.add_argument("--item-mem-mb", type=int, help="Memory in MB reserved per item.")
+    parser.add_argument("--jobs", type=int, help="Optional cap on concurrently running items.")
+    parser.add_argument("--retries", type=int, default=1, help="Extra attempts for a failed item.")
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Skip items the state file records as done; otherwise the batch starts a fresh state.",
+    )
+    parser.add_argument(
+        "--state", type=Path, help="Resumable state JSON (default: logs/scheduler/<stage>-state.json)."
+    )
+    parser.add_argument("--reuse-file", type=Path, default=SCRIPT_DIR / "warpkit_reuse.tsv")
+    parser.add_argument("--progress-seconds", type=float, default=30.0)
+    parser.add_argument(
+        "--dry-run", action="store_true", help="Pass --dry-run to every worker and print each worker's output."
+    )
+    parser.add_argument(
+        "--overwrite",
+        action="store_true",
+        help="Rerun complete items; TEDANA and WarpKit workers also get --overwrite.",
+    )
+    args = parser.parse_args(argv)
+
+    default_slots, default_mem_mb = DEFAULT_ITEM_COST[args.stage]
+    item_slots = args.item_slots or default_slots
+    item_mem_mb = args.item_mem_mb or default_mem_mb
+    if min(args.slots, args.mem_mb, item_slots, item_mem_mb, args.jobs or 1) < 1 or args.retries < 0:
+        parser.error("budgets, item costs, and --jobs must be at least 1; --retries at least 0")
+
+    worker_args = ["--dry-run"] if args.dry_run else []
+    if args.overwrite and args.stage != "mriqc":
+        worker_args.append("--overwrite")
+    items, complete = expand_items(
+        args.stage,
+        read_subject_list(args.sublist),
+        args.project_root,
+        item_slots,
+        item_mem_mb,
+        worker_args,
+        args.overwrite,
+        args.reuse_file if args.reuse_file.is_file() else None,
+    )
+    logs = args.project_root / "logs" / "scheduler"
+    state_path = args.state or logs / f"{args.stage}-state.json"
+    if args.dry_run:
+        state_path = state_path.with_name(f"{state_path.stem}-dry-run.json")
+    if not args.resume:
+        state_path.unlink(missing_ok=True)
+    print(
+        f"{args.stage} schedule: {len(items)} item(s), {len(complete)} already complete; "
+        f"{item_slots} slot(s) and {item_mem_mb} MB per item within {args.slots} slot(s) and {args.mem_mb} MB"
+        + (f", at most {args.jobs} at once" if args.jobs else "")
+    )
+    scheduler = Scheduler(
+        items,
+        args.slots,
+        args.mem_mb,
+        state_path,
+        logs / args.stage,
+        max_jobs=args.jobs,
+        retries=args.retries,
+        progress_seconds=args.progress_seconds,
+        echo_logs=args.dry_run,
+        stage=args.stage,
+        telemetry=None if args.dry_run else telemetry_file(),
+        batch=default_batch(args.stage),
+    )
+    status = scheduler.run()
+    print(
+        f"{args.stage} schedule finished: {len(scheduler.done)} done, {len(scheduler.resumed)} resumed, "
+        f"{len(scheduler.failed)} failed, {len(scheduler.blocked)} blocked; state {state_path}"
+    )
+    return status
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
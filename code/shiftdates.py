@@ -6,9 +6,12 @@ from __future__ import annotations
 import argparse
 import calendar
 import csv
+from collections.abc import Sequence
 from datetime import datetime
 from pathlib import Path
 
+from pipeline_utils import tsv_records, write_tsv_records
+
 
 TSVRows = list[dict[str, str]]
 
@@ -54,9 +57,7 @@ def atomic_write_tsv(rows: TSVRows, path: Path) -> None:
         fieldnames.append("operator")
     tmp = path.with_name(f".{path.name}.tmp")
     with tmp.open("w", newline="") as handle:
-        writer = csv.DictWriter(handle, delimiter="\t", fieldnames=fieldnames, lineterminator="\n")
-        writer.writeheader()
-        writer.writerows(rows)
+        write_tsv_records(handle, fieldnames, tsv_records(rows, fieldnames))
     tmp.replace(path)
 
 
@@ -70,13 +71,13 @@ def preview_rows(rows: TSVRows, limit: int = 5) -> str:
     return "\n".join(lines)
 
 
-def main() -> int:
+def main(argv: Sequence[str] | None = None) -> int:
     parser = argparse.ArgumentParser(description=__doc__)
     parser.add_argument("scans_tsv", type=Path)
     parser.add_argument("--months", type=int, default=1200)
     parser.add_argument("--operator", default="tubric")
     parser.add_argument("--dry-run", action="store_true")
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
 
     print(f"Scrubbing {args.scans_tsv}")
     shifted = shift_scans_tsv(args.scans_tsv, months=args.months, operator=args.operator)
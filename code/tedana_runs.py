@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""Run one subject's TEDANA invocations in a bounded pool.
+
+``tedana.sh`` hands its arguments to this driver. The driver reads every
+EchoTime for the subject's runs in one pass and skips runs that already
+pass ``tedana-complete``. Missing echo inputs are logged to
+``logs/missing-tedanaInput.log``. The remaining runs start ``--slots //
+--threads`` at a time, each with its OpenMP/BLAS thread counts pinned to
+``--threads``. Each run writes ``logs/runs/tedana/<run>.log``, which is
+appended to ``logs/tedana_output.log`` when the run finishes.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import shlex
+import subprocess
+import sys
+from collections.abc import Iterable, Sequence
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from pathlib import Path
+
+from pipeline_utils import (
+    is_tedana_complete,
+    missing_paths,
+    runs_for_task,
+    tasks_for_session,
+    tedana_expected_outputs,
+)
+
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+SESSIONS = ("01", "02")
+ECHOES = (1, 2, 3, 4)
+THREAD_ENV = ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS")
+TAIL_LINES = 40
+
+
+@dataclass(frozen=True)
+class TedanaRun:
+    subject: str
+    session: str
+    task: str
+    run: str
+    echo_files: tuple[Path, ...]
+    echo_times: tuple[str, ...]
+
+    @property
+    def prefix(self) -> str:
+        return f"sub-{self.subject}_ses-{self.session}_task-{self.task}_run-{self.run}"
+
+    @property
+    def label(self) -> str:
+        return f"sub-{self.subject} ses-{self.session} task-{self.task} run-{self.run}"
+
+
+def subject_run_keys(
+    bids_root: Path, subject: str, only: tuple[str, str, str] | None = None
+) -> list[tuple[str, str, str]]:
+    """Return the (session, task, run) keys for the subject's BIDS sessions."""
+    keys = []
+    for session in SESSIONS:
+        if not (bids_root / f"sub-{subject}" / f"ses-{session}").is_dir():
+            continue
+        for task in tasks_for_session(session):
+            for run in runs_for_task(task):
+                if only is None or only == (session, task, run):
+                    keys.append((session, task, run))
+    return keys
+
+
+def read_echo_time(path: Path) -> str:
+    echo_time = json.loads(path.read_text()).get("EchoTime")
+    if echo_time is None:
+        raise ValueError(f"EchoTime missing from {path}")
+    return str(echo_time)
+
+
+def collect_runs(
+    project_root: Path, subject: str, keys: Iterable[tuple[str, str, str]]
+) -> tuple[list[TedanaRun], list[str]]:
+    """Return runs with all echo inputs and one missing-input message per other run.
+
+    A run is missing when the first echo lacks its fMRIPrep image or BIDS
+    sidecar, matching the message the shell loop wrote.
+    """
+    runs: list[TedanaRun] = []
+    missing: list[str] = []
+    for session, task, run in keys:
+        indata = project_root / "derivatives" / "fmriprep" / f"sub-{subject}" / f"ses-{session}" / "func"
+        bidsfunc = project_root / "bids" / f"sub-{subject}" / f"ses-{session}" / "func"
+        stem = f"sub-{subject}_ses-{session}_task-{task}_run-{run}"
+        files: list[Path] = []
+        times: list[str] = []
+        for echo in ECHOES:
+            echo_file = indata / f"{stem}_echo-{echo}_part-mag_desc-preproc_bold.nii.gz"
+            json_file = bidsfunc / f"{stem}_echo-{echo}_part-mag_bold.json"
+            if not echo_file.is_file() or not json_file.is_file():
+                missing.append(
+                    f"Missing TEDANA input for sub-{subject} ses-{session} task-{task} run-{run} echo-{echo}"
+                )
+                break
+            files.append(echo_file)
+            times.append(read_echo_time(json_file))
+        else:
+            runs.append(TedanaRun(subject, session, task, run, tuple(files), tuple(times)))
+    return runs, missing
+
+
+def tedana_command(tedana_cmd: str, run: TedanaRun, outdir: Path, overwrite: bool = False) -> list[str]:
+    command = [
+        tedana_cmd,
+        "-d",
+        *map(str, run.echo_files),
+        "-e",
+        *run.echo_times,
+        "--out-dir",
+        str(outdir),
+        "--prefix",
+        run.prefix,
+        "--convention",
+        "bids",
+        "--fittype",
+        "curvefit",
+    ]
+    if overwrite:
+        command.append("--overwrite")
+    return command
+
+
+def thread_env(threads: int) -> dict[str, str]:
+    return {**os.environ, **{name: str(threads) for name in THREAD_ENV}}
+
+
+def _run_to_log(command: Sequence[str], runlog: Path, env: dict[str, str]) -> int:
+    with runlog.open("wb") as handle:
+        return subprocess.run(command, stdout=handle, stderr=subprocess.STDOUT, env=env).returncode
+
+
+def _tail(path: Path, lines: int = TAIL_LINES) -> str:
+    return "".join(path.read_text(errors="replace").splitlines(keepends=True)[-lines:])
+
+
+def run_pool(
+    runs: Sequence[TedanaRun],
+    commands: Sequence[Sequence[str]],
+    deriv_root: Path,
+    logdir: Path,
+    jobs: int,
+    threads: int,
+) -> int:
+    """Run the commands ``jobs`` at a time; return 1 if any run failed or is incomplete."""
+    runlogdir = logdir / "runs" / "tedana"
+    runlogdir.mkdir(parents=True, exist_ok=True)
+    env = thread_env(threads)
+    failures = 0
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as executor:
+        futures = {
+            executor.submit(_run_to_log, command, runlogdir / f"{run.prefix}.log", env): run
+            for run, command in zip(runs, commands)
+        }
+        for future in as_completed(futures):
+            run = futures[future]
+            runlog = runlogdir / f"{run.prefix}.log"
+            try:
+                status = future.result()
+            except OSError as exc:
+                print(f"TEDANA could not start for {run.label}: {exc}", file=sys.stderr)
+                failures = 1
+                continue
+            # Appended from this thread only, so concurrent runs never interleave.
+            with (logdir / "tedana_output.log").open("ab") as log:
+                log.write(runlog.read_bytes())
+            if status != 0:
+                print(f"TEDANA failed for {run.label} (exit {status}); see {runlog}", file=sys.stderr)
+                print(_tail(runlog), end="", file=sys.stderr)
+                failures = 1
+                continue
+            expected = tedana_expected_outputs(deriv_root, run.subject, run.session, run.task, run.run)
+            if not is_tedana_complete(deriv_root, run.subject, run.session, run.task, run.run):
+                for path in missing_paths(expected):
+                    print(f"MISSING {path}")
+                failures = 1
+            else:
+                print(f"DONE: TEDANA {run.label}")
+    return failures
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("subject")
+    parser.add_argument("only", nargs="*", metavar="SESSION TASK RUN", help="Run only this session/task/run.")
+    parser.add_argument("--project-root", type=Path, default=PROJECT_ROOT)
+    parser.add_argument("--tedana-cmd", default=os.environ.get("TEDANA_CMD", "tedana"))
+    parser.add_argument(
+        "--threads",
+        type=int,
+        default=int(os.environ.get("OMP_NUM_THREADS") or 1),
+        help="OpenMP/BLAS threads per run (default: OMP_NUM_THREADS or 1).",
+    )
+    parser.add_argument(
+        "--slots",
+        type=int,
+        help="CPU slots reserved for this subject; runs start slots // threads at a time (default: threads).",
+    )
+    parser.add_argument("--dry-run", action="store_true")
+    parser.add_argument("--overwrite", action="store_true")
+    args = parser.parse_args(argv)
+    if len(args.only) not in (0, 3):
+        parser.error("give either no run selector or SESSION TASK RUN")
+    if args.threads < 1 or (args.slots is not None and args.slots < 1):
+        parser.error("--threads and --slots must be positive")
+
+    project_root = args.project_root
+    deriv_root = project_root / "derivatives"
+    logdir = project_root / "logs"
+    logdir.mkdir(parents=True, exist_ok=True)
+    only = tuple(args.only) if args.only else None
+    keys = subject_run_keys(project_root / "bids", args.subject, only)
+
+    pending = []
+    for session, task, run in keys:
+        if not args.overwrite and is_tedana_complete(deriv_root, args.subject, session, task, run):
+            print(f"EXISTS (skipping): TEDANA sub-{args.subject} ses-{session} task-{task} run-{run}")
+        else:
+            pending.append((session, task, run))
+    try:
+        runs, missing = collect_runs(project_root, args.subject, pending)
+    except (OSError, ValueError) as exc:
+        print(exc, file=sys.stderr)
+        return 1
+    if missing:
+        with (logdir / "missing-tedanaInput.log").open("a") as handle:
+            handle.writelines(f"{line}\n" for line in missing)
+
+    commands = []
+    for run in runs:
+        outdir = deriv_root / "tedana" / f"sub-{run.subject}" / f"ses-{run.session}"
+        outdir.mkdir(parents=True, exist_ok=True)
+        command = tedana_command(args.tedana_cmd, run, outdir, args.overwrite)
+        print(f"TEDANA command: {shlex.join(command)}")
+        commands.append(command)
+    if args.dry_run or not runs:
+        return 0
+
+    jobs = min(len(runs), max(1, (args.slots or args.threads) // args.threads))
+    print(f"TEDANA sub-{args.subject}: {len(runs)} run(s), {jobs} at a time with {args.threads} thread(s) each")
+    sys.stdout.flush()
+    return run_pool(runs, commands, deriv_root, logdir, jobs, args.threads)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
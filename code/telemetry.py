@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+"""Record and report per-command resource usage as JSON lines.
+
+``telemetry.py exec -- COMMAND`` runs one command the way ``/usr/bin/time``
+would and appends its wall, user, and system time, maximum resident set size,
+and block I/O counts to ``logs/telemetry/rusage.jsonl``. ``run_logged.sh``
+wraps every stage command this way, and ``schedule_jobs.py`` appends one
+record per subject/session/task/run item. ``telemetry.py report`` aggregates
+the records per stage, subject, or run and flags regressions of the newest
+batch against the median of earlier batches.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import re
+import resource
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from collections.abc import Iterable, Mapping, Sequence
+from datetime import datetime
+from pathlib import Path
+from typing import Any
+
+from pipeline_utils import tsv_records, write_tsv_records
+
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+TELEMETRY_FILE = PROJECT_ROOT / "logs" / "telemetry" / "rusage.jsonl"
+BATCH_ENV = "RF1_TELEMETRY_BATCH"
+FILE_ENV = "RF1_TELEMETRY_FILE"
+ENTITY_RE = re.compile(r"(sub|ses|task|run)-([A-Za-z0-9]+)")
+ENTITY_FIELDS = {"sub": "subject", "ses": "session", "task": "task", "run": "run"}
+GROUP_FIELDS = {
+    "stage": ("level", "stage"),
+    "subject": ("level", "stage", "subject"),
+    "run": ("level", "stage", "subject", "session", "task", "run"),
+}
+METRICS = ("wall_s", "cpu_s", "max_rss_mb")
+DEFAULT_THRESHOLD = 1.25
+
+
+def telemetry_file() -> Path:
+    return Path(os.environ.get(FILE_ENV) or TELEMETRY_FILE)
+
+
+def default_batch(stage: str) -> str:
+    """Return the enclosing ``run_logged.sh`` batch, or a new timestamped one."""
+    return os.environ.get(BATCH_ENV) or f"{time.strftime('%Y%m%d-%H%M%S')}_{stage}"
+
+
+def key_entities(key: str) -> dict[str, str]:
+    """Return subject/session/task/run parsed from a BIDS-style item key."""
+    return {ENTITY_FIELDS[entity]: value for entity, value in ENTITY_RE.findall(key)}
+
+
+def rusage_record(
+    usage: resource.struct_rusage, wall_s: float, returncode: int, **fields: Any
+) -> dict[str, Any]:
+    """Return one telemetry record; ``ru_maxrss`` is in kilobytes on Linux."""
+    return {
+        **fields,
+        "host": socket.gethostname(),
+        "wall_s": round(wall_s, 3),
+        "user_s": round(usage.ru_utime, 3),
+        "sys_s": round(usage.ru_stime, 3),
+        "max_rss_mb": round(usage.ru_maxrss / 1024, 1),
+        "inblock": usage.ru_inblock,
+        "oublock": usage.ru_oublock,
+        "exit": returncode,
+    }
+
+
+def append_record(path: Path, record: Mapping[str, Any]) -> None:
+    """Append one JSON line with a single ``O_APPEND`` write, safe across processes."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    line = (json.dumps(record, sort_keys=True) + "\n").encode()
+    fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        os.write(fd, line)
+    finally:
+        os.close(fd)
+
+
+def run_measured(command: Sequence[str]) -> tuple[int, resource.struct_rusage, float]:
+    """Run ``command`` and return its exit code, rusage, and wall seconds.
+
+    Like ``/usr/bin/time``, the wrapper ignores interrupts while it waits so
+    the command alone decides how to handle them. Counts cover the command
+    and every descendant it waited for; the RSS is that of the largest one.
+    """
+    started = time.monotonic()
+    process = subprocess.Popen(command)
+    previous = signal.signal(signal.SIGINT, signal.SIG_IGN)
+    try:
+        _, status, usage = os.wait4(process.pid, 0)
+    finally:
+        signal.signal(signal.SIGINT, previous)
+    returncode = os.waitstatus_to_exitcode(status)
+    process.returncode = returncode
+    return returncode, usage, time.monotonic() - started
+
+
+def read_records(path: Path) -> list[dict[str, Any]]:
+    """Return every parseable record; a torn final line is skipped."""
+    records = []
+    try:
+        with path.open() as handle:
+            for line in handle:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if isinstance(record, dict):
+                    record["cpu_s"] = record.get("user_s", 0) + record.get("sys_s", 0)
+                    records.append(record)
+    except FileNotFoundError:
+        return []
+    return records
+
+
+def _median(values: Iterable[Any]) -> float | None:
+    present = [float(value) for value in values if value is not None]
+    return statistics.median(present) if present else None
+
+
+def report_rows(
+    records: Sequence[Mapping[str, Any]],
+    by: str = "stage",
+    batch: str | None = None,
+    threshold: float = DEFAULT_THRESHOLD,
+) -> list[dict[str, Any]]:
+    """Summarize ``batch`` (default: the newest) per group against earlier batches.
+
+    Batches are ordered by their first record's start time. A metric regresses
+    when the batch median exceeds ``threshold`` times the median of the same
+    group's successful records in all earlier batches.
+    """
+    started: dict[str, str] = {}
+    for record in records:
+        name = record.get("batch")
+        if name and (name not in started or record.get("started", "") < started[name]):
+            started[name] = record.get("started", "")
+    order = sorted(started, key=lambda name: (started[name], name))
+    if not order:
+        return []
+    current = batch or order[-1]
+    earlier = set(order[: order.index(current)]) if current in order else set()
+    fields = GROUP_FIELDS[by]
+
+    groups: dict[tuple, dict[str, list[Mapping[str, Any]]]] = {}
+    for record in records:
+        if by != "stage" and not record.get("subject"):
+            continue
+        key = tuple(record.get(field) or "" for field in fields)
+        slot = groups.setdefault(key, {"current": [], "baseline": []})
+        if record.get("batch") == current:
+            slot["current"].append(record)
+        elif record.get("batch") in earlier and record.get("exit") == 0:
+            slot["baseline"].append(record)
+
+    rows = []
+    for key, slot in sorted(groups.items()):
+        if not slot["current"]:
+            continue
+        row: dict[str, Any] = dict(zip(fields, key))
+        row.update(
+            batch=current,
+            n=len(slot["current"]),
+            failed=sum(record.get("exit") != 0 for record in slot["current"]),
+            baseline_n=len(slot["baseline"]),
+        )
+        regressions = []
+        for metric in METRICS:
+            value = _median(record.get(metric) for record in slot["current"])
+            baseline = _median(record.get(metric) for record in slot["baseline"])
+            row[metric] = value
+            row[f"baseline_{metric}"] = baseline
+            ratio = value / baseline if value is not None and baseline else None
+            row[f"{metric}_ratio"] = ratio
+            if ratio is not None and ratio > threshold:
+                regressions.append(metric)
+        row["regressions"] = ";".join(regressions)
+        rows.append(row)
+    return rows
+
+
+def report_columns(by: str) -> list[str]:
+    return [
+        *GROUP_FIELDS[by],
+        "batch",
+        "n",
+        "failed",
+        "baseline_n",
+        *(column for metric in METRICS for column in (metric, f"baseline_{metric}", f"{metric}_ratio")),
+        "regressions",
+    ]
+
+
+def _format_cell(value: Any) -> Any:
+    if value is None:
+        return "n/a"
+    if isinstance(value, float):
+        return f"{value:.4g}"
+    return value
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--telemetry", type=Path, help=f"JSONL file (default: {FILE_ENV} or logs/telemetry/rusage.jsonl)."
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run = subparsers.add_parser("exec", help="run one command and append its resource usage")
+    run.add_argument("--stage", required=True, help="Stage label, e.g. the run_logged.sh label.")
+    run.add_argument("--batch", help=f"Batch ID (default: {BATCH_ENV} or a new timestamp).")
+    run.add_argument("--item", default="", help="Optional sub-/ses-/task-/run- item key.")
+    run.add_argument("--level", default="command", choices=("command", "check", "item"))
+    run.add_argument("cmd", nargs=argparse.REMAINDER, help="Command after --.")
+
+    report = subparsers.add_parser("report", help="aggregate records and flag regressions")
+    report.add_argument("--by", choices=sorted(GROUP_FIELDS), default="stage")
+    report.add_argument("--batch", help="Batch to compare (default: the newest).")
+    report.add_argument("--stage", help="Only report this stage.")
+    report.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    report.add_argument("--out", type=Path, help="Also write the report as a TSV.")
+    args = parser.parse_args(argv)
+    path = args.telemetry or telemetry_file()
+
+    if args.command == "exec":
+        command = args.cmd[1:] if args.cmd[:1] == ["--"] else args.cmd
+        if not command:
+            parser.error("exec needs a command after --")
+        when = datetime.now().astimezone().isoformat(timespec="seconds")
+        try:
+            returncode, usage, wall_s = run_measured(command)
+        except OSError as exc:
+            print(f"telemetry: cannot run {command[0]}: {exc}", file=sys.stderr)
+            return 127
+        record = rusage_record(
+            usage,
+            wall_s,
+            returncode,
+            batch=args.batch or default_batch(args.stage),
+            level=args.level,
+            stage=args.stage,
+            item=args.item,
+            **key_entities(args.item),
+            started=when,
+            command=" ".join(command),
+        )
+        try:
+            append_record(path, record)
+        except OSError as exc:
+            print(f"telemetry: could not append to {path}: {exc}", file=sys.stderr)
+        print(
+            f"RESOURCES[{args.level}]: wall {record['wall_s']:.1f} s, user {record['user_s']:.1f} s, "
+            f"sys {record['sys_s']:.1f} s, max RSS {record['max_rss_mb']:.0f} MB, "
+            f"blocks in/out {record['inblock']}/{record['oublock']}",
+            file=sys.stderr,
+        )
+        return returncode if returncode >= 0 else 128 - returncode
+
+    records = [
+        record for record in read_records(path) if args.stage is None or record.get("stage") == args.stage
+    ]
+    rows = report_rows(records, args.by, args.batch, args.threshold)
+    if not rows:
+        print(f"No telemetry records for the selected batch in {path}")
+        return 1
+    columns = report_columns(args.by)
+    write_tsv_records(sys.stdout, columns, tsv_records(rows, columns, default=_format_cell))
+    if args.out:
+        args.out.parent.mkdir(parents=True, exist_ok=True)
+        with args.out.open("w", encoding="utf-8", newline="") as handle:
+            write_tsv_records(handle, columns, tsv_records(rows, columns, default=_format_cell))
+    flagged = [row for row in rows if row["regressions"]]
+    print(
+        f"Telemetry report: {len(rows)} group(s) in batch {rows[0]['batch']}, "
+        f"{len(flagged)} regression(s) above {args.threshold:g}x the earlier median",
+        file=sys.stderr,
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
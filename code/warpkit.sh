@@ -231,20 +231,23 @@ fi
 command -v fslroi >/dev/null 2>&1 || { echo "Required command not found: fslroi" >&2; exit 1; }
 
 if ((overwrite)); then
-  for old in "${cleanup_default_gre[@]}" "$fmap_out" "$mag_out" "$fmap_json" "$mag_json"; do
-    [[ -e "$old" ]] || continue
-    python3 "${scriptdir}/check_pipeline_state.py" safe-child "$fmapdir" "$old" >/dev/null
-    echo "Removing prior generated output: $old"
-    rm -f "$old"
-  done
-  for old in "${cleanup_warpkit_derivatives[@]}"; do
+  # Confirm every existing output is under its expected root in one Python
+  # process before anything is removed.
+  {
+    for old in "${cleanup_default_gre[@]}" "$fmap_out" "$mag_out" "$fmap_json" "$mag_json"; do
+      [[ -e "$old" ]] && rf1_batch_line check-pipeline-state safe-child "$fmapdir" "$old"
+    done
+    for old in "${cleanup_warpkit_derivatives[@]}" "$doneflag"; do
+      [[ -e "$old" ]] && rf1_batch_line check-pipeline-state safe-child "$outdir" "$old"
+    done
+    true
+  } | python3 "${scriptdir}/rf1.py" batch --stop-on-error >/dev/null
+  for old in "${cleanup_default_gre[@]}" "$fmap_out" "$mag_out" "$fmap_json" "$mag_json" "${cleanup_warpkit_derivatives[@]}"; do
     [[ -e "$old" ]] || continue
-    python3 "${scriptdir}/check_pipeline_state.py" safe-child "$outdir" "$old" >/dev/null
     echo "Removing prior generated output: $old"
     rm -f "$old"
   done
   if [[ -e "$doneflag" ]]; then
-    python3 "${scriptdir}/check_pipeline_state.py" safe-child "$outdir" "$doneflag" >/dev/null
     echo "Removing prior completion marker: $doneflag"
     rm -f "$doneflag"
   fi
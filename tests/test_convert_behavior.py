@@ -9,19 +9,37 @@ import pytest
 sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "code"))
 
 from check_events import audit_subject_session
-from audit_openneuro_events import audit_key
+from check_events import main as check_events_main
+from audit_openneuro_events import (
+    PrivateRecordIndex,
+    _trial_list,
+    audit_key,
+    build_reference_index,
+)
+from audit_openneuro_events import main as audit_openneuro_main
 from convert_behavior import (
     _atomic_write_tsv,
     ConversionError,
+    EventRows,
     RunKey,
+    approvals_by_session,
     convert_behavior,
     convert_source,
     event_path,
+    events_sha256,
     load_curation_approvals,
     preserve_existing_events,
     resolve_sources,
     ugr_broad_trial_epoch,
 )
+from convert_behavior import main as convert_behavior_main
+from events_manifest import (
+    check_events_manifest,
+    read_events_digests,
+    read_manifest,
+    record_events_digest,
+    update_events_manifest,
+)
 
 
 def write_delimited(
@@ -528,6 +546,54 @@ def test_competing_doors_source_uses_unique_historical_fingerprint(
     assert "historical canonical events fingerprint" in resolution.detail
 
 
+def test_doors_disambiguation_compares_identity_columns_without_converting(
+    tmp_path: Path,
+) -> None:
+    behavior = tmp_path / "behavior"
+    source = behavior / "Scan-Social_Doors" / "data" / "10001"
+    historical_rows = social_rows(misses=1, decisions=4)
+    write_delimited(
+        source / "sub-10001_task-doors_run-1_events.tsv",
+        historical_rows,
+        delimiter="\t",
+    )
+    matching = source / "sub-10001_task-socialReward_doorsA1_events.tsv"
+    write_delimited(matching, historical_rows, delimiter="\t")
+    # Differs at its first row, then has a row that would not convert.
+    unconvertible = social_rows(decisions=4)
+    unconvertible[3]["onset"] = "n/a"
+    write_delimited(
+        source / "sub-10001_task-socialReward_doorsA2_events.tsv",
+        unconvertible,
+        delimiter="\t",
+    )
+    write_delimited(
+        source / "sub-10001_task-socialReward_doorsA3_events.tsv",
+        historical_rows[:3],
+        delimiter="\t",
+    )
+    write_delimited(
+        source / "sub-10001_task-socialReward_facesA1_events.tsv",
+        social_rows(),
+        delimiter="\t",
+    )
+
+    listings: dict[Path, list[Path]] = {}
+    resolution = resolve_sources(
+        behavior, "10001", "01", "doors", [1], source_listings=listings
+    )[1]
+    assert resolution.path == matching
+    assert list(listings) == [source]
+    (source / "sub-10001_task-socialReward_facesB1_events.tsv").write_text("")
+    faces = resolve_sources(
+        behavior, "10001", "01", "socialdoors", [1], source_listings=listings
+    )[1]
+    assert faces.status == "available"
+    assert resolve_sources(behavior, "10001", "01", "socialdoors", [1])[1].status == (
+        "ambiguous"
+    )
+
+
 def test_conversion_is_idempotent_with_explicit_overwrite(tmp_path: Path) -> None:
     behavior = tmp_path / "behavior"
     bids = tmp_path / "bids"
@@ -647,6 +713,115 @@ def test_short_run_needs_fingerprint_bound_human_approval(tmp_path: Path) -> Non
     )
 
 
+def test_batch_conversion_parses_curation_once_and_reports_in_subject_order(
+    tmp_path: Path, capsys: pytest.CaptureFixture[str]
+) -> None:
+    behavior = tmp_path / "behavior"
+    bids = tmp_path / "bids"
+    curation = tmp_path / "curation.tsv"
+    approvals_rows = []
+    for subject in ("10002", "10001"):
+        write_bold(bids, RunKey(subject, "01", "trust", 1))
+        raw = behavior / "Scan-Investment_Game" / "logs" / subject / (
+            f"sub-{subject}_task-trust_run-0_raw.csv"
+        )
+        write_delimited(raw, [trust_row()])
+        converted = convert_source("trust", raw)
+        approvals_rows.append(
+            {
+                "subject": subject,
+                "session": "01",
+                "task": "trust",
+                "run": 1,
+                "issue": "unexpected_trial_count",
+                "source_sha256": converted.source_sha256,
+                "trial_fingerprint": converted.trial_fingerprint,
+                "reviewer": "reviewer@example.edu",
+                "note": "Verified against scanner notes and task log.",
+            }
+        )
+    write_delimited(curation, approvals_rows[:1], delimiter="\t")
+    sublist = tmp_path / "sublist.txt"
+    sublist.write_text("10002\n10001\n")
+    argv = [
+        "--sublist",
+        str(sublist),
+        "--session",
+        "01",
+        "--tasks",
+        "trust",
+        "--jobs",
+        "2",
+        "--behavior-root",
+        str(behavior),
+        "--bids-root",
+        str(bids),
+        "--curation-file",
+        str(curation),
+    ]
+
+    approvals = load_curation_approvals(curation)
+    assert load_curation_approvals(curation) == approvals
+    approvals.clear()
+    assert load_curation_approvals(curation)
+    approvals = load_curation_approvals(curation)
+    assert list(approvals_by_session(approvals)) == [("10002", "01")]
+    assert convert_behavior_main(argv) == 1
+    lines = capsys.readouterr().out.splitlines()
+    assert lines[0].startswith("WROTE sub-10002_ses-01_task-trust_run-1_events.tsv")
+    assert lines[-1].startswith(
+        "REVIEW REQUIRED sub-10001_ses-01_task-trust_run-1_events.tsv"
+    )
+
+    write_delimited(curation, approvals_rows, delimiter="\t")
+    assert load_curation_approvals(curation) != approvals
+    assert convert_behavior_main([*argv, "--overwrite"]) == 0
+    assert event_path(bids, RunKey("10001", "01", "trust", 1)).is_file()
+
+
+def test_batch_conversion_isolates_an_unexpected_error_to_its_subject(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture[str]
+) -> None:
+    import convert_behavior as module  # noqa: PLC0415
+
+    convert = module.convert_behavior
+
+    def crash_on_10001(subject, *args, **kwargs):
+        if subject == "10001":
+            raise KeyError("missing column")
+        print(f"converted sub-{subject}")
+        return convert(subject, *args, **kwargs)
+
+    monkeypatch.setattr(module, "convert_behavior", crash_on_10001)
+    sublist = tmp_path / "sublist.txt"
+    sublist.write_text("10001\n10002\n")
+    argv = [
+        "--sublist",
+        str(sublist),
+        "--session",
+        "01",
+        "--tasks",
+        "trust",
+        "--behavior-root",
+        str(tmp_path / "behavior"),
+        "--bids-root",
+        str(tmp_path / "bids"),
+        "--curation-file",
+        str(tmp_path / "none.tsv"),
+    ]
+    assert convert_behavior_main(argv) == 1
+    out = capsys.readouterr().out
+    assert "CONVERSION FAILED sub-10001 ses-01: unexpected error" in out
+    assert "KeyError: 'missing column'" in out
+    assert out.index("KeyError") < out.index("converted sub-10002")
+
+    output, failed = module._convert_item(
+        ("10001", "01"), ("trust",), tmp_path / "behavior", tmp_path / "bids", {}
+    )
+    assert failed == 1 and "Traceback" in output
+    assert capsys.readouterr().out == ""
+
+
 def test_audit_flags_unapproved_short_run_for_human_review(tmp_path: Path) -> None:
     behavior = tmp_path / "behavior"
     bids = tmp_path / "bids"
@@ -677,6 +852,215 @@ def test_audit_flags_unapproved_short_run_for_human_review(tmp_path: Path) -> No
     assert findings[0]["source_sha256"] == converted.source_sha256
 
 
+def test_events_audit_jobs_keep_session_task_subject_report_order(
+    tmp_path: Path, capsys: pytest.CaptureFixture[str]
+) -> None:
+    behavior = tmp_path / "behavior"
+    bids = tmp_path / "bids"
+    for subject in ("10001", "10002"):
+        source = behavior / "Scan-Investment_Game" / "logs" / subject
+        raw = source / f"sub-{subject}_task-trust_run-0_raw.csv"
+        write_delimited(raw, [trust_row()])
+        for task, run in (("trust", 1), ("ugr", 1)):
+            write_bold(bids, RunKey(subject, "01", task, run))
+        key = RunKey(subject, "01", "trust", 1)
+        if subject == "10001":
+            converted = convert_source("trust", raw)
+            _atomic_write_tsv(
+                event_path(bids, key), converted, overwrite=False, dry_run=False
+            )
+    sublist = tmp_path / "sublist.txt"
+    sublist.write_text("10002\n10001\n")
+
+    outputs = []
+    for jobs in ("1", "2"):
+        review = tmp_path / f"review-{jobs}.tsv"
+        status = check_events_main(
+            [
+                "--sublist",
+                str(sublist),
+                "--session",
+                "01",
+                "--tasks",
+                "trust",
+                "ugr",
+                "--behavior-root",
+                str(behavior),
+                "--bids-root",
+                str(bids),
+                "--curation-file",
+                str(tmp_path / "none.tsv"),
+                "--review-tsv",
+                str(review),
+                "--jobs",
+                jobs,
+            ]
+        )
+        assert status == 1
+        stdout = capsys.readouterr().out.replace(str(review), "review.tsv")
+        outputs.append((stdout, review.read_text()))
+
+    assert outputs[0] == outputs[1]
+    lines = outputs[0][0].splitlines()
+    assert [line.split()[2] for line in lines if line.startswith("REVIEW")] == [
+        "sub-10002_ses-01_task-trust_run-1_events.tsv:",
+        "sub-10001_ses-01_task-trust_run-1_events.tsv:",
+        "sub-10002_ses-01_task-ugr_run-1_events.tsv:",
+        "sub-10001_ses-01_task-ugr_run-1_events.tsv:",
+    ]
+    assert lines[3].startswith("EVENTS SIDECAR MISSING")
+    subjects = [row.split("\t")[0] for row in outputs[0][1].splitlines()[1:]]
+    assert subjects == ["10002", "10001", "10002", "10001"]
+
+
+def test_events_audit_streams_finished_subjects_before_a_later_crash(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture[str]
+) -> None:
+    import check_events  # noqa: PLC0415
+
+    bids = tmp_path / "bids"
+    for subject in ("10002", "10001"):
+        write_bold(bids, RunKey(subject, "01", "trust", 1))
+    sublist = tmp_path / "sublist.txt"
+    sublist.write_text("10002\n10001\n")
+    audit_subject_tasks = check_events.audit_subject_tasks
+
+    def crash_on_second(bids_root, behavior_root, subject, *args):
+        if subject == "10001":
+            raise RuntimeError("parser bug")
+        return audit_subject_tasks(bids_root, behavior_root, subject, *args)
+
+    monkeypatch.setattr(check_events, "audit_subject_tasks", crash_on_second)
+    with pytest.raises(RuntimeError, match="parser bug"):
+        check_events_main(
+            [
+                "--sublist",
+                str(sublist),
+                "--session",
+                "01",
+                "--tasks",
+                "trust",
+                "--behavior-root",
+                str(tmp_path / "behavior"),
+                "--bids-root",
+                str(bids),
+                "--curation-file",
+                str(tmp_path / "none.tsv"),
+            ]
+        )
+    out = capsys.readouterr().out
+    assert "sub-10002" in out and "sub-10001" not in out
+
+
+def test_events_digest_record_short_circuits_canonical_comparison(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    import check_events  # noqa: PLC0415
+
+    behavior = tmp_path / "behavior"
+    bids = tmp_path / "bids"
+    key = RunKey("10001", "01", "trust", 1)
+    write_bold(bids, key)
+    raw = behavior / "Scan-Investment_Game" / "logs" / "10001" / (
+        "sub-10001_task-trust_run-0_raw.csv"
+    )
+    write_delimited(raw, [trust_row()])
+    converted = convert_source("trust", raw)
+    destination = event_path(bids, key)
+    _atomic_write_tsv(destination, converted, overwrite=False, dry_run=False)
+    (bids / "task-trust_events.json").write_text("{}\n")
+
+    record = read_events_digests(destination.parent)[destination.name]
+    assert record["sha256"] == events_sha256(converted)
+    assert record["size"] == destination.stat().st_size
+    assert record["trial_fingerprint"] == converted.trial_fingerprint
+
+    def unexpected_read(path: Path) -> None:
+        raise AssertionError(f"read {path}")
+
+    monkeypatch.setattr(check_events, "_validate_event_file", unexpected_read)
+    monkeypatch.setattr(check_events, "sha256_file", unexpected_read)
+    _, counts = audit_subject_session(bids, behavior, "10001", "01", ("trust",))
+    assert counts["OK"] == 1
+    monkeypatch.undo()
+
+    destination.write_text(destination.read_text().replace("\n", "\r\n"))
+    _, counts = audit_subject_session(bids, behavior, "10001", "01", ("trust",))
+    assert counts["OK"] == 1
+    assert counts["conversion failed"] == 0
+
+
+def _record_digests(func_dir: Path, worker: int) -> None:
+    for run in range(20):
+        name = f"sub-10001_ses-01_task-ugr_run-{worker * 100 + run}_events.tsv"
+        record_events_digest(func_dir / name, {"sha256": name})
+
+
+def test_events_digest_records_keep_concurrent_writers_entries(tmp_path: Path) -> None:
+    import multiprocessing  # noqa: PLC0415
+
+    func_dir = tmp_path / "sub-10001" / "ses-01" / "func"
+    func_dir.mkdir(parents=True)
+    context = multiprocessing.get_context("fork")
+    workers = [context.Process(target=_record_digests, args=(func_dir, worker)) for worker in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+        assert worker.exitcode == 0
+
+    assert len(read_events_digests(func_dir)) == 80
+
+
+def test_convert_behavior_maintains_cohort_events_manifest(tmp_path: Path) -> None:
+    behavior = tmp_path / "behavior"
+    bids = tmp_path / "bids"
+    for subject in ("10001", "10002"):
+        write_bold(bids, RunKey(subject, "01", "trust", 1))
+        raw = behavior / "Scan-Investment_Game" / "logs" / subject / (
+            f"sub-{subject}_task-trust_run-0_raw.csv"
+        )
+        trials = [
+            trust_row(
+                TrialNumber=index,
+                onset=index * 20,
+                ISI_onset=index * 20 + 3,
+                outcome_onset=index * 20 + 5,
+                outcome_offset=index * 20 + 7,
+            )
+            for index in range(1, 43)
+        ]
+        write_delimited(raw, trials)
+        assert convert_behavior(subject, "01", ("trust",), behavior, bids) == 0
+
+    index, rows = read_manifest(bids)
+    assert index["Runs"] == 2
+    assert sorted(index["Sessions"]) == ["sub-10001/ses-01", "sub-10002/ses-01"]
+    assert [row["subject"] for row in rows] == ["10001", "10002"]
+    destination = event_path(bids, RunKey("10002", "01", "trust", 1))
+    converted = convert_source("trust", raw)
+    assert rows[1]["events_file"] == str(destination.relative_to(bids))
+    assert rows[1]["events_sha256"] == events_sha256(converted)
+    assert rows[1]["rows"] == str(len(converted.rows))
+    assert rows[1]["trials"] == str(converted.trial_count)
+    assert rows[1]["columns"] == ",".join(converted.columns)
+    assert check_events_manifest(bids) == []
+
+    destination.write_text(destination.read_text().replace("\n", "\r\n"))
+    extra = bids / "sub-10003" / "ses-01" / "func"
+    extra.mkdir(parents=True)
+    (extra / "sub-10003_ses-01_task-trust_run-1_events.tsv").write_text("onset\n")
+    assert check_events_manifest(bids) == [
+        f"EVENTS CHANGED {destination.relative_to(bids)}",
+        "EVENTS UNRECORDED sub-10003/ses-01/func/"
+        "sub-10003_ses-01_task-trust_run-1_events.tsv",
+    ]
+
+    (bids / ".events-manifest" / "events.tsv").unlink()
+    assert update_events_manifest(bids) == 2
+    assert read_manifest(bids)[1] == rows
+
+
 def test_audit_detects_changed_event_contents_even_when_row_count_matches(
     tmp_path: Path,
 ) -> None:
@@ -766,6 +1150,184 @@ def test_openneuro_audit_identifies_likely_run_swap(tmp_path: Path) -> None:
     assert "run(s) [2]" in result["detail"]
 
 
+def test_openneuro_audit_indexes_references_once_and_keeps_report_order(
+    tmp_path: Path,
+) -> None:
+    behavior = tmp_path / "behavior"
+    reference = tmp_path / "openneuro"
+    bids = tmp_path / "bids"
+    sublist = tmp_path / "subjects.txt"
+    sublist.write_text("10003\n10001\n10002\n")
+    mismatched = social_rows(decisions=2)
+    mismatched[1]["resp"] = "right"
+    for subject in ("10001", "10002", "10003"):
+        write_bold(bids, RunKey(subject, "01", "socialdoors", 1))
+        write_delimited(
+            behavior
+            / "Scan-Social_Doors"
+            / "data"
+            / subject
+            / f"sub-{subject}_task-socialReward_facesA1_events.tsv",
+            social_rows(decisions=2),
+            delimiter="\t",
+        )
+    write_delimited(
+        reference / "sub-10001" / "func" / "sub-10001_task-socialdoors_run-1_events.tsv",
+        social_rows(decisions=2),
+        delimiter="\t",
+    )
+    write_delimited(
+        reference / "sub-10003" / "func" / "sub-10003_task-socialdoors_run-1_events.tsv",
+        social_rows(decisions=2),
+        delimiter="\t",
+    )
+    write_delimited(
+        reference
+        / "sub-10003"
+        / "ses-01"
+        / "func"
+        / "sub-10003_ses-01_task-socialdoors_run-1_events.tsv",
+        mismatched,
+        delimiter="\t",
+    )
+
+    index = build_reference_index(reference, ["10001", "10002", "10003"])
+    assert sorted(index.found) == [
+        ("10001", "01", "socialdoors", 1),
+        ("10003", "01", "socialdoors", 1),
+    ]
+    assert "ses-01" in str(index.found[("10003", "01", "socialdoors", 1)][1])
+
+    reports = []
+    for jobs in ("1", "3"):
+        report = tmp_path / f"report-{jobs}.tsv"
+        status = audit_openneuro_main(
+            [
+                "--sublist",
+                str(sublist),
+                "--session",
+                "01",
+                "--tasks",
+                "socialdoors",
+                "--openneuro-root",
+                str(reference),
+                "--behavior-root",
+                str(behavior),
+                "--bids-root",
+                str(bids),
+                "--report-tsv",
+                str(report),
+                "--jobs",
+                jobs,
+            ]
+        )
+        assert status == 1
+        reports.append(report.read_text())
+        for row in csv.DictReader(report.open(), delimiter="\t"):
+            key = RunKey(row["subject"], "01", "socialdoors", 1)
+            assert row == audit_key(key, behavior, reference)
+
+    assert reports[0] == reports[1]
+    rows = list(csv.DictReader(reports[0].splitlines(), delimiter="\t"))
+    assert [(row["subject"], row["status"]) for row in rows] == [
+        ("10003", "reference_mismatch"),
+        ("10001", "match"),
+        ("10002", "reference_unavailable"),
+    ]
+
+
+def test_private_record_index_matches_wildcards_subsequences_and_repeats() -> None:
+    private = [("a", "1"), ("b", "n/a"), ("c", "3"), ("a", "1")]
+    index = PrivateRecordIndex(private)
+
+    assert index.matches(("b", "7")) == 0b10
+    assert index.matches(("a", "1")) == 0b1001
+    assert index.equals([("a", "1"), ("b", "2"), ("c", "3"), ("a", "1")])
+    assert not index.equals([("a", "1"), ("b", "2"), ("c", "3")])
+    assert index.subsequence([("a", "1"), ("c", "3"), ("a", "1")]) == [0, 2, 3]
+    assert index.subsequence([("c", "3"), ("b", "2")]) is None
+    assert index.repeats(private * 2) == 2
+    assert index.repeats(private + [("x", "1")] * 4) == 0
+    assert index.mismatches([("a", "1"), ("x", "2"), ("c", "4"), ("a", "1")]) == [1, 2]
+    assert _trial_list(range(7)) == "1, 2, 3, 4, 5, ... (7 total)"
+
+
+def test_segment_breaks_keep_source_line_numbers_and_precedence(
+    tmp_path: Path,
+) -> None:
+    source = tmp_path / "ugr.csv"
+    write_delimited(
+        source,
+        [
+            ugr_row(TrialNumber=1, nTrial=1, decision_onset=10),
+            ugr_row(TrialNumber=2, nTrial=2, decision_onset=5),
+            ugr_row(TrialNumber=1, nTrial=1, decision_onset=30),
+        ],
+    )
+    source.write_text(source.read_text() + "1,2\n")
+
+    with pytest.raises(
+        ConversionError, match="onset decreases at source row 3$"
+    ):
+        convert_source("ugr", source)
+
+    write_delimited(
+        source,
+        [
+            ugr_row(TrialNumber=1, nTrial=1, decision_onset=10),
+            ugr_row(TrialNumber=2, nTrial=2, decision_onset=20),
+        ],
+    )
+    lines = source.read_text().splitlines()
+    source.write_text("\n".join([lines[0], lines[1], "", lines[2], "1,2", ""]))
+
+    with pytest.raises(ConversionError, match="source row 5 has 2 field"):
+        convert_source("ugr", source)
+
+    write_delimited(
+        source,
+        [
+            ugr_row(TrialNumber="inf", nTrial="inf", decision_onset=10),
+            ugr_row(TrialNumber=2, nTrial=2, decision_onset=20),
+        ],
+    )
+    assert convert_source("ugr", source).trial_count == 2
+
+
+def test_schema_converters_keep_event_columns_and_build_rows_on_access(
+    tmp_path: Path,
+) -> None:
+    source = tmp_path / "trust.csv"
+    write_delimited(
+        source,
+        [trust_row(), trust_row(TrialNumber=2, onset=30.0, resp=999, ISI_onset="")],
+    )
+
+    converted = convert_source("trust", source)
+
+    assert isinstance(converted.rows, EventRows)
+    assert list(converted.rows.columns) == list(converted.columns)
+    assert converted.rows.columns["trial_type"] == [
+        "choice_friend",
+        "outcome_friend_recip",
+        "missed_trial",
+    ]
+    assert converted.rows[-1] == {
+        "onset": 30.0,
+        "duration": 3.0,
+        "trial_type": "missed_trial",
+        "response_time": "n/a",
+        "trust_value": "n/a",
+        "choice": "n/a",
+        "cLow": 2,
+        "cHigh": 4,
+        "partner": "friend",
+        "reciprocate": "n/a",
+        "trial_id": "2",
+    }
+    assert [row["onset"] for row in converted.rows[:2]] == [10.0, 15.0]
+
+
 def test_preserve_existing_events_copies_only_matching_bold_runs(
     tmp_path: Path,
 ) -> None:
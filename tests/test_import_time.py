@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+
+CODE_DIR = Path(__file__).resolve().parents[1] / "code"
+SCIENCE_MODULES = {"numpy", "pandas", "nibabel", "matplotlib", "scipy"}
+# Entry point -> cumulative import budget in milliseconds, measured with
+# ``python -X importtime`` after bytecode is cached. Budgets are roughly three
+# times the Linux2 timings. Wall-clock limits flake on loaded or NFS-backed
+# nodes, so they are checked only when RF1_IMPORT_BUDGETS=1; the science-stack
+# check below always runs.
+IMPORT_BUDGET_MS = {
+    "addIntendedFor": 150,
+    "audit_openneuro_events": 200,
+    "build_run_qc": 150,
+    "check_events": 150,
+    "check_pipeline_state": 150,
+    "confounds_cache": 150,
+    "convert_behavior": 150,
+    "events_manifest": 150,
+    "extract_icv_fmriprep": 150,
+    "flair_to_mni_flirt": 250,
+    "flair_wm_metrics": 250,
+    "fmriprep_resources": 150,
+    "fmriprep_geometry": 150,
+    "genTedanaConfounds": 150,
+    "make_repair_runlists": 150,
+    "mriqc_iqms": 150,
+    "print_subjects": 150,
+    "record_warpkit_reuse": 150,
+    "rf1": 150,
+    "schedule_jobs": 150,
+    "shiftdates": 150,
+    "tedana_runs": 150,
+    "telemetry": 150,
+    "validate_repo": 150,
+}
+CHECK_BUDGETS = os.environ.get("RF1_IMPORT_BUDGETS") == "1"
+
+
+def run_python(code: str, pycache: Path, *options: str) -> subprocess.CompletedProcess:
+    env = {**os.environ, "PYTHONPYCACHEPREFIX": str(pycache)}
+    env.pop("PYTHONDONTWRITEBYTECODE", None)
+    return subprocess.run(
+        [sys.executable, *options, "-c", code],
+        cwd=CODE_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+
+@pytest.fixture(scope="module")
+def pycache(tmp_path_factory: pytest.TempPathFactory) -> Path:
+    """Bytecode cache warmed by importing every entry point once."""
+    path = tmp_path_factory.mktemp("pycache")
+    run_python("; ".join(f"import {module}" for module in IMPORT_BUDGET_MS), path)
+    return path
+
+
+def import_profile(module: str, pycache: Path) -> dict[str, int]:
+    """Return cumulative microseconds by imported module name for one fresh process."""
+    result = run_python(f"import {module}", pycache, "-X", "importtime")
+    profile: dict[str, int] = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _self, cumulative, name = line.removeprefix("import time:").split("|")
+        if cumulative.strip().isdigit():
+            profile[name.strip()] = int(cumulative)
+    return profile
+
+
+def test_every_python_entry_point_has_an_import_budget() -> None:
+    entry_points = {
+        path.stem
+        for path in CODE_DIR.glob("*.py")
+        if "def main(" in path.read_text() and path.stem != "downloadXNAT"
+    }
+    assert entry_points == set(IMPORT_BUDGET_MS)
+
+
+@pytest.mark.parametrize("module", sorted(IMPORT_BUDGET_MS))
+def test_entry_point_import_skips_science_stack(module: str, pycache: Path) -> None:
+    assert not SCIENCE_MODULES & set(import_profile(module, pycache))
+
+
+@pytest.mark.skipif(not CHECK_BUDGETS, reason="set RF1_IMPORT_BUDGETS=1 to check import times")
+@pytest.mark.parametrize("module", sorted(IMPORT_BUDGET_MS))
+def test_entry_point_import_meets_budget(module: str, pycache: Path) -> None:
+    profiles = [import_profile(module, pycache) for _ in range(2)]
+    fastest_ms = min(profile[module] for profile in profiles) / 1000
+    assert fastest_ms <= IMPORT_BUDGET_MS[module], (
+        f"{module} imported in {fastest_ms:.0f} ms; budget {IMPORT_BUDGET_MS[module]} ms"
+    )
@@ -1,10 +1,15 @@
 from __future__ import annotations
 
+import csv
+import io
 import json
 import importlib.util
 import os
+import shutil
+import signal
 import subprocess
 import sys
+import time
 from datetime import date
 from pathlib import Path
 
@@ -25,10 +30,16 @@ from pipeline_utils import (  # noqa: E402
     missing_paths,
     read_subject_list,
     runs_for_task,
+    scans_have_dicoms,
+    sha256_file,
+    source_manifest,
+    source_manifest_path,
     subject_t1w_inputs,
     tasks_for_session,
     tedana_expected_outputs,
+    tsv_records,
     warpkit_required_inputs,
+    write_tsv_records,
 )
 
 
@@ -53,6 +64,7 @@ def load_gen_tedana_confounds():
     spec = importlib.util.spec_from_file_location("gen_tedana_confounds", CODE_DIR / "genTedanaConfounds.py")
     assert spec is not None and spec.loader is not None
     module = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = module
     spec.loader.exec_module(module)
     return module
 
@@ -214,6 +226,94 @@ def test_repair_runlists_accept_12018_malformed_source_layout(tmp_path: Path) ->
     assert module.missing_required_sources(tmp_path, ["12018"]) == set()
 
 
+def write_source_series(scans: Path, series: str, count: int, mtime: int) -> Path:
+    files = scans / series / "resources" / "DICOM" / "files"
+    files.mkdir(parents=True)
+    for index in range(count):
+        dicom = files / f"{index:04d}.dcm"
+        dicom.write_text("dicom")
+        os.utime(dicom, (mtime, mtime))
+    (files / "catalog.xml").write_text("<catalog/>")
+    return files
+
+
+def test_source_manifest_counts_series_and_reuses_cached_counts(tmp_path: Path) -> None:
+    scans = tmp_path / "Smith-SRA-10001" / "Smith-SRA-10001" / "scans"
+    cache = tmp_path / "manifests"
+    write_source_series(scans, "1-T1w", 3, 1_700_000_000)
+    write_source_series(scans, "2-ugr", 2, 1_741_000_000)
+    (scans / "3-empty" / "resources" / "DICOM" / "files").mkdir(parents=True)
+
+    manifest = source_manifest(scans, cache)
+
+    assert (manifest.series_count, manifest.file_count) == (2, 5)
+    assert int(manifest.newest_mtime) == 1_741_000_000
+    cached = json.loads(source_manifest_path(cache, scans).read_text())
+    cached["series"]["1-T1w"]["file_count"] = 30
+    source_manifest_path(cache, scans).write_text(json.dumps(cached))
+    assert source_manifest(scans, cache).file_count == 32
+
+    new_files = write_source_series(scans, "4-trust", 1, 1_750_000_000)
+    assert source_manifest(scans, cache).file_count == 33
+    (new_files / "0000.dcm").unlink()
+    os.utime(new_files, ns=(0, 0))
+    assert source_manifest(scans, cache).newest_mtime == 1_741_000_000
+
+
+def test_source_dicom_probe_uses_xnat_layout_and_positive_cache(tmp_path: Path) -> None:
+    scans = tmp_path / "scans"
+    cache = tmp_path / "manifests"
+    loose = scans / "1-T1w" / "resources" / "secondary"
+    loose.mkdir(parents=True)
+    (loose / "image.dcm").write_text("dicom")
+    assert not scans_have_dicoms(scans, cache)
+    assert not scans_have_dicoms(tmp_path / "missing", cache)
+
+    files = write_source_series(scans, "2-ugr", 1, 1_700_000_000)
+    assert scans_have_dicoms(scans)
+    source_manifest(scans, cache)
+    (files / "0000.dcm").unlink()
+    assert scans_have_dicoms(scans, cache)
+    assert not scans_have_dicoms(scans)
+
+
+def test_source_manifest_command_reports_counts_for_prepdata(tmp_path: Path) -> None:
+    scans = tmp_path / "scans"
+    write_source_series(scans, "1-T1w", 2, 1_741_046_400)
+    result = subprocess.run(
+        [
+            sys.executable,
+            str(CODE_DIR / "check_pipeline_state.py"),
+            "source-manifest",
+            "--cache-dir",
+            str(tmp_path / "manifests"),
+            str(scans),
+        ],
+        check=True,
+        text=True,
+        capture_output=True,
+    )
+    assert result.stdout == "2\t1\t1741046400\n"
+
+    dry_cache = tmp_path / "dry-manifests"
+    dry = subprocess.run(
+        [
+            sys.executable,
+            str(CODE_DIR / "check_pipeline_state.py"),
+            "source-manifest",
+            "--cache-dir",
+            str(dry_cache),
+            "--no-write",
+            str(scans),
+        ],
+        check=True,
+        text=True,
+        capture_output=True,
+    )
+    assert dry.stdout == result.stdout
+    assert not dry_cache.exists()
+
+
 def test_repair_runlists_report_excluded_sources(tmp_path: Path) -> None:
     module = load_make_repair_runlists()
     (tmp_path / "Smith-SRA-10001").mkdir()
@@ -389,6 +489,49 @@ def test_shift_scans_tsv_accepts_mixed_iso_acq_times(tmp_path: Path) -> None:
     ]
 
 
+def test_tsv_record_writer_matches_dict_writer_output() -> None:
+    columns = ["name", "value", "note"]
+    rows = [
+        {"name": "a\tb", "value": 1.5, "note": 'say "hi"'},
+        {"name": "c", "value": None},
+        {"name": "d", "value": True, "note": "line\nbreak"},
+    ]
+    expected = io.StringIO()
+    writer = csv.DictWriter(
+        expected, fieldnames=columns, delimiter="\t", lineterminator="\n"
+    )
+    writer.writeheader()
+    writer.writerows(rows)
+
+    observed = io.StringIO()
+    write_tsv_records(observed, columns, tsv_records(rows, columns))
+    assert observed.getvalue() == expected.getvalue()
+
+    formatted = io.StringIO()
+    write_tsv_records(
+        formatted,
+        columns,
+        tsv_records(rows, columns, {"value": lambda value: f"<{value}>"}, default=str),
+    )
+    assert formatted.getvalue().splitlines()[2] == "c\t<None>\tNone"
+
+
+def test_atomic_write_scans_tsv_keeps_columns_and_adds_operator(tmp_path: Path) -> None:
+    from shiftdates import atomic_write_tsv, shift_scans_tsv  # noqa: PLC0415
+
+    scans_tsv = tmp_path / "sub-11982_ses-01_scans.tsv"
+    scans_tsv.write_text(
+        "filename\tacq_time\nanat/sub-11982_ses-01_T1w.nii.gz\t2026-06-12T17:51:05\n"
+    )
+
+    atomic_write_tsv(shift_scans_tsv(scans_tsv, months=1200), scans_tsv)
+
+    assert scans_tsv.read_text() == (
+        "filename\tacq_time\toperator\n"
+        "anat/sub-11982_ses-01_T1w.nii.gz\t1926-06-12T17:51:05.000000\ttubric\n"
+    )
+
+
 def test_safe_child_path_refuses_root_and_outside(tmp_path: Path) -> None:
     root = tmp_path / "bids"
     root.mkdir()
@@ -565,3 +708,979 @@ def test_add_intended_for_dry_run_skips_missing_bids_root(tmp_path: Path, capsys
 
     captured = capsys.readouterr()
     assert "SKIP BIDS root not found" in captured.out
+
+
+def make_confound_inputs(root: Path, sub: str, run: str) -> tuple[Path, Path, Path]:
+    func = root / "fmriprep" / f"sub-{sub}" / "ses-01" / "func"
+    tedana = root / "tedana" / f"sub-{sub}" / "ses-01"
+    func.mkdir(parents=True, exist_ok=True)
+    tedana.mkdir(parents=True, exist_ok=True)
+    stem = f"sub-{sub}_ses-01_task-ugr_run-{run}"
+    confounds = func / f"{stem}_part-mag_desc-confounds_timeseries.tsv"
+    confounds.write_text(
+        "global_signal\ttrans_x\tcosine00\tframewise_displacement\tnon_steady_state_outlier00\trot_z\n"
+        "101.5\t0.1234567890123\t0.5\tn/a\t1\t-0.0001\n"
+        "99.25\t0.2\t-0.5\t0.03333333333333333\t0\t0.00002\n"
+        "98.0\t-1e-05\t0.25\t0.1\t0\t0.3\n"
+    )
+    mixing = tedana / f"{stem}_desc-ICA_mixing.tsv"
+    mixing.write_text(
+        "ICA_00\tICA_01\tICA_02\n"
+        "0.1\t1.0\t-2.123456789\n"
+        "0.2\t2.0\t3.5\n"
+        "0.3\t3.0\t4.75\n"
+    )
+    metrics = tedana / f"{stem}_desc-tedana_metrics.tsv"
+    metrics.write_text(
+        "Component\tkappa\tclassification\n"
+        "ICA_00\t10\taccepted\n"
+        "ICA_01\t20\trejected\n"
+        "ICA_02\t30\trejected\n"
+    )
+    return confounds, mixing, metrics
+
+
+def test_tedana_confounds_read_only_needed_columns_and_match_full_read(tmp_path: Path) -> None:
+    import pandas as pd  # noqa: PLC0415
+
+    module = load_gen_tedana_confounds()
+    confounds, mixing, metrics = make_confound_inputs(tmp_path, "10001", "1")
+
+    built = module.build_confounds(confounds, mixing, metrics)
+
+    full = pd.read_csv(confounds, sep="\t")
+    expected = pd.concat(
+        [
+            full[["trans_x", "rot_z", "framewise_displacement", "cosine00", "non_steady_state_outlier00"]].fillna(0),
+            pd.read_csv(mixing, sep="\t").iloc[:, [1, 2]],
+        ],
+        axis=1,
+    )
+    assert built.to_csv(index=False, header=False, sep="\t") == expected.to_csv(
+        index=False, header=False, sep="\t"
+    )
+    assert "global_signal" not in built.columns
+
+
+def test_tedana_confound_jobs_write_atomically_and_report_failures_in_order(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture[str]
+) -> None:
+    module = load_gen_tedana_confounds()
+    make_confound_inputs(tmp_path, "10001", "1")
+    make_confound_inputs(tmp_path, "10001", "2")
+    _, bad_mixing, _ = make_confound_inputs(tmp_path, "10002", "1")
+    bad_mixing.write_text("ICA_00\tICA_01\tICA_02\n0.1\t1.0\t2.0\n")
+    _, missing_mixing, _ = make_confound_inputs(tmp_path, "10003", "1")
+    missing_mixing.unlink()
+    output = tmp_path / "confounds"
+
+    serial_output = tmp_path / "serial"
+    for outdir, jobs in ((serial_output, "1"), (output, "3")):
+        monkeypatch.setattr(
+            sys,
+            "argv",
+            [
+                "genTedanaConfounds.py",
+                "--fmriprep-dir",
+                str(tmp_path / "fmriprep"),
+                "--tedana-dir",
+                str(tmp_path / "tedana"),
+                "--output-dir",
+                str(outdir),
+                "--jobs",
+                jobs,
+            ],
+        )
+        assert module.main() == 1
+
+    lines = capsys.readouterr().out.splitlines()
+    report = lines[len(lines) // 2 :]
+    assert report[0].startswith("Making confounds: sub-10001 ses-01 task-ugr run-1")
+    assert report[1].startswith("Making confounds: sub-10001 ses-01 task-ugr run-2")
+    assert report[2].startswith("Making confounds: sub-10002 ses-01 task-ugr run-1")
+    assert report[3].startswith("Failed sub-10002 ses-01 task-ugr run-1: Row count mismatch")
+    assert report[4] == "Missing confound input for sub-10003 ses-01 task-ugr run-1:"
+    assert report[-2] == "Processed 4 TEDANA metric file(s)."
+    assert report[-1] == "Confound outputs: 2 built, 0 skipped as current, 2 failed."
+    assert lines[: len(lines) // 2] == [
+        line.replace(str(output), str(serial_output)) for line in report
+    ]
+    for name in ("sub-10001_ses-01_task-ugr_run-1", "sub-10001_ses-01_task-ugr_run-2"):
+        path = f"sub-10001/{name}_desc-TedanaPlusConfounds.tsv"
+        assert (output / path).read_bytes() == (serial_output / path).read_bytes()
+    assert not list(output.rglob(".*.tmp"))
+
+
+def test_tedana_confounds_skip_current_outputs_until_inputs_change(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture[str]
+) -> None:
+    module = load_gen_tedana_confounds()
+    make_confound_inputs(tmp_path, "10001", "1")
+    _, _, metrics = make_confound_inputs(tmp_path, "10001", "2")
+    output = tmp_path / "confounds"
+
+    def run(*extra: str) -> list[str]:
+        monkeypatch.setattr(
+            sys,
+            "argv",
+            [
+                "genTedanaConfounds.py",
+                "--fmriprep-dir",
+                str(tmp_path / "fmriprep"),
+                "--tedana-dir",
+                str(tmp_path / "tedana"),
+                "--output-dir",
+                str(output),
+                *extra,
+            ],
+        )
+        assert module.main() == 0
+        return capsys.readouterr().out.splitlines()
+
+    assert run()[-1] == "Confound outputs: 2 built, 0 skipped as current, 0 failed."
+    sidecar = output / "sub-10001" / "sub-10001_ses-01_task-ugr_run-1_desc-TedanaPlusConfounds.json"
+    recorded = json.loads(sidecar.read_text())["Inputs"]
+    assert [Path(record["path"]).name for record in recorded] == [
+        "sub-10001_ses-01_task-ugr_run-1_part-mag_desc-confounds_timeseries.tsv",
+        "sub-10001_ses-01_task-ugr_run-1_desc-ICA_mixing.tsv",
+        "sub-10001_ses-01_task-ugr_run-1_desc-tedana_metrics.tsv",
+    ]
+    assert {"size", "mtime_ns", "sha256"} <= set(recorded[0])
+
+    assert run()[-1] == "Confound outputs: 0 built, 2 skipped as current, 0 failed."
+    os.utime(metrics, ns=(1, 1))
+    assert run()[-1] == "Confound outputs: 0 built, 2 skipped as current, 0 failed."
+
+    metrics.write_text(metrics.read_text().replace("ICA_02\t30\trejected", "ICA_02\t30\taccepted"))
+    lines = run("--dry-run")
+    assert lines[-1] == "Confound outputs: 1 would build, 1 skipped as current, 0 failed."
+    assert lines[0].startswith("Current confounds: sub-10001 ses-01 task-ugr run-1")
+    assert lines[1].startswith("Making confounds: sub-10001 ses-01 task-ugr run-2")
+    assert run()[-1] == "Confound outputs: 1 built, 1 skipped as current, 0 failed."
+    assert run("--force")[-1] == "Confound outputs: 2 built, 0 skipped as current, 0 failed."
+
+    sidecar.write_text("[]")
+    assert run("--dry-run")[-1] == "Confound outputs: 1 would build, 1 skipped as current, 0 failed."
+    assert run()[-1] == "Confound outputs: 1 built, 1 skipped as current, 0 failed."
+    assert json.loads(sidecar.read_text())["Version"] == module.SIDECAR_VERSION
+
+
+def test_confounds_cache_memory_maps_columns_keyed_by_source_hash(tmp_path: Path) -> None:
+    np = pytest.importorskip("numpy")
+    module = load_gen_tedana_confounds()
+    from confounds_cache import cache_confounds, load_confounds  # noqa: PLC0415
+
+    confounds, mixing, metrics = make_confound_inputs(tmp_path, "10001", "1")
+    cache = tmp_path / "cache"
+
+    entry, built = cache_confounds(confounds, cache)
+    assert built
+    assert entry.name == sha256_file(confounds)
+    assert cache_confounds(confounds, cache) == (entry, False)
+
+    table = load_confounds(confounds, cache)
+    assert isinstance(table.column("trans_x"), np.memmap)
+    assert table.columns == load_confounds(confounds).columns
+    assert table.to_frame().equals(load_confounds(confounds).to_frame())
+    assert str(table.column("non_steady_state_outlier00").dtype) == "int64"
+
+    direct = module.build_confounds(confounds, mixing, metrics)
+    cached = module.build_confounds(confounds, mixing, metrics, cache)
+    assert cached.to_csv(index=False, header=False, sep="\t") == direct.to_csv(
+        index=False, header=False, sep="\t"
+    )
+
+    confounds.write_text(confounds.read_text().replace("98.0\t-1e-05", "98.0\t-2e-05"))
+    changed, built = cache_confounds(confounds, cache)
+    assert built and changed != entry and not entry.exists()
+    assert load_confounds(confounds, cache).column("trans_x")[2] == -2e-05
+
+    text = tmp_path / "text_confounds.tsv"
+    text.write_text("label\tvalue\nsteady\t1.0\nn/a\tn/a\n")
+    table = load_confounds(text, cache)
+    pd = pytest.importorskip("pandas")
+    assert table.column("label")[0] == "steady" and pd.isna(table.column("label")[1])
+    assert table.to_frame().equals(load_confounds(text).to_frame())
+
+
+def load_flair_to_mni():
+    spec = importlib.util.spec_from_file_location("flair_to_mni_flirt", CODE_DIR / "flair_to_mni_flirt.py")
+    assert spec is not None and spec.loader is not None
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_flair_to_mni_runs_sessions_concurrently_and_skips_current_steps(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture[str]
+) -> None:
+    module = load_flair_to_mni()
+    fsl = tmp_path / "fsl"
+    (fsl / "data" / "standard").mkdir(parents=True)
+    for name in ("MNI152_T1_2mm.nii.gz", "MNI152_T1_2mm_brain.nii.gz"):
+        (fsl / "data" / "standard" / name).write_text("template")
+    os.utime(fsl / "data" / "standard" / "MNI152_T1_2mm.nii.gz", ns=(1, 1))
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    fake = (
+        "#!/usr/bin/env bash\n"
+        'case "$*" in *sub-10002_ses-01_T1w.nii.gz*-dof\\ 12*) [[ -e "$FAIL" ]] && exit 3;; esac\n'
+        'echo "start $2"; sleep 0.1; echo "end $2"\n'
+        'while (($#)); do case "$1" in -out|-omat) touch "$2"; shift;; esac; shift; done\n'
+    )
+    for tool in ("flirt", "convert_xfm"):
+        (bin_dir / tool).write_text(fake)
+        (bin_dir / tool).chmod(0o755)
+    monkeypatch.setenv("FSLDIR", str(fsl))
+    monkeypatch.setenv("PATH", f"{bin_dir}{os.pathsep}{os.environ['PATH']}")
+    monkeypatch.setenv("FAIL", str(tmp_path / "fail"))
+    bids = tmp_path / "bids"
+    for subject in ("10001", "10002"):
+        anat = bids / f"sub-{subject}" / "ses-01" / "anat"
+        anat.mkdir(parents=True)
+        for suffix in ("T1w", "FLAIR"):
+            (anat / f"sub-{subject}_ses-01_{suffix}.nii.gz").write_text(suffix)
+            os.utime(anat / f"sub-{subject}_ses-01_{suffix}.nii.gz", ns=(1, 1))
+    (bids / "sub-10003" / "anat").mkdir(parents=True)
+    logs = tmp_path / "logs"
+
+    def run(*extra: str) -> tuple[int, list[str]]:
+        monkeypatch.setattr(
+            sys,
+            "argv",
+            [
+                "flair_to_mni_flirt.py",
+                "--bids-dir",
+                str(bids),
+                "--deriv-root",
+                str(tmp_path / "flirt"),
+                "--log-dir",
+                str(logs),
+                "--jobs",
+                "2",
+                *extra,
+            ],
+        )
+        status = module.main()
+        return status, capsys.readouterr().out.splitlines()
+
+    status, lines = run()
+    assert status == 0
+    assert "Skipping sub-10003 None: missing T1w or FLAIR" in lines
+    assert "sub-10001_ses-01: t1_to_mni=ran, flair_to_t1=ran, concat=ran, apply=ran" in lines
+    assert (tmp_path / "flirt" / "sub-10002" / "ses-01" / "anat" / "sub-10002_ses-01_space-MNI152_FLAIR.nii.gz").is_file()
+    session_log = (logs / "sub-10002_ses-01.log").read_text()
+    assert "Running flair_to_t1" in session_log
+    t1_input = str(bids / "sub-10002" / "ses-01" / "anat" / "sub-10002_ses-01_T1w.nii.gz")
+    flair_input = str(bids / "sub-10002" / "ses-01" / "anat" / "sub-10002_ses-01_FLAIR.nii.gz")
+    assert f"start {t1_input}\nend {t1_input}\nRunning flair_to_t1" in session_log
+    assert f"start {flair_input}\nend {flair_input}\n" in session_log
+    assert (logs / "steps" / "sub-10002_ses-01_t1_to_mni.log").is_file()
+    with (logs / "steps.tsv").open(newline="") as handle:
+        summary = list(csv.DictReader(handle, delimiter="\t"))
+    assert [(row["label"], row["step"]) for row in summary[:4]] == [
+        ("sub-10001_ses-01", "t1_to_mni"),
+        ("sub-10001_ses-01", "flair_to_t1"),
+        ("sub-10001_ses-01", "concat"),
+        ("sub-10001_ses-01", "apply"),
+    ]
+    assert {row["status"] for row in summary} == {"ran"}
+
+    status, lines = run()
+    assert "sub-10002_ses-01: t1_to_mni=current, flair_to_t1=current, concat=current, apply=current" in lines
+
+    for output in (tmp_path / "flirt").rglob("*.*"):
+        os.utime(output, ns=(2, 2))
+    flair = bids / "sub-10001" / "ses-01" / "anat" / "sub-10001_ses-01_FLAIR.nii.gz"
+    os.utime(flair, ns=(3, 3))
+    status, lines = run("--dry-run")
+    assert "sub-10001_ses-01: t1_to_mni=current, flair_to_t1=planned, concat=planned, apply=planned" in lines
+    planned = [line.split(":")[0].strip() for line in lines if line.startswith("  Would run ")]
+    assert planned == ["Would run flair_to_t1", "Would run concat", "Would run apply"]
+    assert any(line.startswith("  Would run flair_to_t1: flirt ") and str(flair) in line for line in lines)
+
+    (tmp_path / "fail").touch()
+    t1 = bids / "sub-10002" / "ses-01" / "anat" / "sub-10002_ses-01_T1w.nii.gz"
+    os.utime(t1, ns=(3, 3))
+    status, lines = run()
+    assert status == 1
+    assert "sub-10001_ses-01: t1_to_mni=current, flair_to_t1=ran, concat=ran, apply=ran" in lines
+    assert "sub-10002_ses-01: t1_to_mni=failed, flair_to_t1=ran, concat=blocked, apply=blocked" in lines
+    assert lines[-1] == "FLAIR to MNI: 2 session(s), 1 failed (sub-10002_ses-01)."
+
+
+def test_flair_to_mni_reuses_fmriprep_transform_in_one_resampling(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture[str]
+) -> None:
+    module = load_flair_to_mni()
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    calls = tmp_path / "calls.txt"
+    fake = (
+        "#!/usr/bin/env bash\n"
+        f'echo "$(basename "$0") $*" >> "{calls}"\n'
+        'while (($#)); do case "$1" in -out|-omat|-oitk|--output) touch "$2"; shift;; esac; shift; done\n'
+    )
+    for tool in ("flirt", "apptainer"):
+        (bin_dir / tool).write_text(fake)
+        (bin_dir / tool).chmod(0o755)
+    monkeypatch.setenv("PATH", f"{bin_dir}{os.pathsep}{os.environ['PATH']}")
+    monkeypatch.delenv("APPTAINER", raising=False)
+    image = tmp_path / "fmriprep.simg"
+    image.write_text("image")
+    mask = tmp_path / "templateflow" / "tpl-MNI152NLin6Asym_res-02_desc-brain_mask.nii.gz"
+    mask.parent.mkdir()
+    mask.write_text("mask")
+    bids = tmp_path / "bids"
+    fmriprep = tmp_path / "fmriprep"
+    for subject in ("10001", "10002"):
+        anat = bids / f"sub-{subject}" / "ses-01" / "anat"
+        anat.mkdir(parents=True)
+        for suffix in ("T1w", "FLAIR"):
+            (anat / f"sub-{subject}_ses-01_{suffix}.nii.gz").write_text(suffix)
+    anat = fmriprep / "sub-10001" / "anat"
+    anat.mkdir(parents=True)
+    (anat / "sub-10001_desc-preproc_T1w.nii.gz").write_text("t1")
+    (anat / "sub-10001_space-MNI152NLin6Asym_desc-preproc_T1w.nii.gz").write_text("t1")
+    xfm = anat / "sub-10001_from-T1w_to-MNI152NLin6Asym_mode-image_xfm.h5"
+    xfm.write_text("xfm")
+    monkeypatch.setattr(
+        sys,
+        "argv",
+        [
+            "flair_to_mni_flirt.py",
+            "--bids-dir",
+            str(bids),
+            "--deriv-root",
+            str(tmp_path / "flirt"),
+            "--log-dir",
+            str(tmp_path / "logs"),
+            "--fmriprep-dir",
+            str(fmriprep),
+            "--template-brain-mask",
+            str(mask),
+            "--image",
+            str(image),
+        ],
+    )
+
+    assert module.main() == 0
+    lines = capsys.readouterr().out.splitlines()
+    assert "Skipping sub-10002_ses-01: no unique fMRIPrep T1w and T1w→MNI152NLin6Asym transform" in lines
+    assert "sub-10001_ses-01: flair_to_t1=ran, fsl_to_itk=ran, apply=ran" in lines
+    flirt, c3d, ants = calls.read_text().splitlines()
+    assert "-applyxfm" not in flirt and "-dof 6" in flirt
+    assert f"-ref {anat / 'sub-10001_desc-preproc_T1w.nii.gz'}" in flirt
+    assert "c3d_affine_tool" in c3d and "-fsl2ras" in c3d
+    out_dir = tmp_path / "flirt" / "sub-10001" / "ses-01" / "anat"
+    assert ants.endswith(
+        f"--reference-image {mask} "
+        f"--output {out_dir / 'sub-10001_ses-01_space-MNI152NLin6Asym_res-02_FLAIR.nii.gz'} "
+        f"--interpolation LanczosWindowedSinc --transform {xfm} "
+        f"--transform {out_dir / 'sub-10001_ses-01_from-FLAIR_to-T1w_desc-fmriprep_rigid.txt'}"
+    )
+    assert "MNI152_T1_2mm" not in calls.read_text()
+
+
+def test_flair_wm_metrics_match_check_wm_mask_and_flag_iqr_outliers(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture[str]
+) -> None:
+    nib = pytest.importorskip("nibabel")
+    np = pytest.importorskip("numpy")
+    spec = importlib.util.spec_from_file_location("flair_wm_metrics", CODE_DIR / "flair_wm_metrics.py")
+    assert spec is not None and spec.loader is not None
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+
+    affine = np.eye(4)
+    mask = np.zeros((6, 5, 7), dtype=np.uint8)
+    mask[1:5, 1:4, 1:6] = 1
+    nib.save(nib.Nifti1Image(mask, affine), str(tmp_path / "wm.nii.gz"))
+    flirt = tmp_path / "flirt"
+    for index, subject in enumerate(("10001", "10002", "10003", "10004", "10005")):
+        data = np.full(mask.shape, 100.0 + index, dtype=np.float32)
+        if subject == "10005":
+            data[:, :, :4] = 0.0
+        anat = flirt / f"sub-{subject}" / "ses-01" / "anat"
+        anat.mkdir(parents=True)
+        nib.save(nib.Nifti1Image(data, affine), str(anat / f"sub-{subject}_ses-01_space-MNI152_FLAIR.nii.gz"))
+    anat = flirt / "sub-10006" / "ses-01" / "anat"
+    anat.mkdir(parents=True)
+    nib.save(nib.Nifti1Image(np.ones((3, 3, 3), dtype=np.float32), affine), str(anat / "sub-10006_ses-01_space-MNI152_FLAIR.nii.gz"))
+
+    row = module.flair_metrics(flirt / "sub-10005" / "ses-01" / "anat" / "sub-10005_ses-01_space-MNI152_FLAIR.nii.gz", mask != 0, slab_slices=2)
+    assert (row["wm_voxels"], row["covered_voxels"], row["missing_voxels"]) == (60, 24, 36)
+    assert row["pct_missing"] == pytest.approx(60.0)
+    assert row["wm_median"] == pytest.approx(104.0)
+
+    out = tmp_path / "metrics.tsv"
+    outliers = tmp_path / "outliers.txt"
+    monkeypatch.setattr(
+        sys,
+        "argv",
+        [
+            "flair_wm_metrics.py",
+            "--wm-mask",
+            str(tmp_path / "wm.nii.gz"),
+            "--deriv-root",
+            str(flirt),
+            "--out-tsv",
+            str(out),
+            "--outlier-sublist",
+            str(outliers),
+            "--jobs",
+            "2",
+        ],
+    )
+    assert module.main() == 1
+    lines = capsys.readouterr().out.splitlines()
+    assert lines[0].startswith("Failed ") and "does not match WM mask" in lines[0]
+    with out.open(newline="") as handle:
+        rows = list(csv.DictReader(handle, delimiter="\t"))
+    assert [row["subject"] for row in rows] == ["10001", "10002", "10003", "10004", "10005", "10006"]
+    assert rows[0]["pct_missing"] == "0" and rows[0]["pct_missing_outlier"] == "false"
+    assert rows[4]["pct_missing_outlier"] == "true" and rows[4]["outlier_reasons"] == "pct_missing"
+    assert rows[5]["flair_outlier"] == "false" and rows[5]["pct_missing_outlier"] == ""
+    assert outliers.read_text() == "10005\n"
+
+
+def test_flair_wm_metrics_measure_fmriprep_outputs_against_their_own_grid(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture[str]
+) -> None:
+    nib = pytest.importorskip("nibabel")
+    np = pytest.importorskip("numpy")
+    spec = importlib.util.spec_from_file_location("flair_wm_metrics", CODE_DIR / "flair_wm_metrics.py")
+    assert spec is not None and spec.loader is not None
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+    flair_to_mni = load_flair_to_mni()
+
+    # FSL MNI152 2 mm and TemplateFlow res-02 grids differ in shape and origin.
+    fsl_affine = np.diag([-2.0, 2.0, 2.0, 1.0])
+    nlin6_affine = np.diag([2.0, 2.0, 2.0, 1.0])
+    nlin6_affine[:3, 3] = (-96.0, -132.0, -78.0)
+    fsl_mask = np.zeros((6, 5, 7), dtype=np.uint8)
+    fsl_mask[1:5, 1:4, 1:6] = 1
+    nlin6_mask = np.zeros((5, 6, 4), dtype=np.uint8)
+    nlin6_mask[1:4, 1:5, 1:3] = 1
+    nib.save(nib.Nifti1Image(fsl_mask, fsl_affine), str(tmp_path / "wm.nii.gz"))
+    nib.save(nib.Nifti1Image(nlin6_mask, nlin6_affine), str(tmp_path / "wm-nlin6.nii.gz"))
+
+    flirt = tmp_path / "flirt"
+    job = flair_to_mni.SessionJob(
+        "sub-10002_ses-01", tmp_path / "t1.nii.gz", tmp_path / "flair.nii.gz",
+        flirt / "sub-10002" / "ses-01" / "anat",
+        fmriprep_t1=tmp_path / "preproc_T1w.nii.gz", fmriprep_xfm=tmp_path / "xfm.h5",
+    )
+    reuse = flair_to_mni.FmriprepReuse("apptainer", tmp_path / "fmriprep.sif", tmp_path / "ref.nii.gz", ())
+    fmriprep_output = flair_to_mni.fmriprep_stages(job, reuse)[-1][0].outputs[0]
+    job.out_dir.mkdir(parents=True)
+    nib.save(nib.Nifti1Image(np.full((5, 6, 4), 50.0, dtype=np.float32), nlin6_affine), str(fmriprep_output))
+    flirt_output = flirt / "sub-10001" / "ses-01" / "anat" / "sub-10001_ses-01_space-MNI152_FLAIR.nii.gz"
+    flirt_output.parent.mkdir(parents=True)
+    nib.save(nib.Nifti1Image(np.full((6, 5, 7), 100.0, dtype=np.float32), fsl_affine), str(flirt_output))
+    assert module.discover_flairs(flirt) == [flirt_output, fmriprep_output]
+
+    out = tmp_path / "metrics.tsv"
+
+    def run(*masks: str) -> tuple[int, list[str], list[dict[str, str]]]:
+        monkeypatch.setattr(
+            sys,
+            "argv",
+            ["flair_wm_metrics.py", *masks, "--deriv-root", str(flirt), "--out-tsv", str(out)],
+        )
+        status = module.main()
+        with out.open(newline="") as handle:
+            rows = list(csv.DictReader(handle, delimiter="\t"))
+        return status, capsys.readouterr().out.splitlines(), rows
+
+    status, lines, rows = run("--wm-mask", str(tmp_path / "wm.nii.gz"))
+    assert status == 1
+    assert "no WM mask for space MNI152NLin6Asym_res-02; pass --nlin6asym-wm-mask" in lines[0]
+    assert rows[0]["wm_voxels"] == "60" and rows[1]["wm_voxels"] == ""
+
+    status, lines, rows = run(
+        "--wm-mask", str(tmp_path / "wm.nii.gz"), "--nlin6asym-wm-mask", str(tmp_path / "wm-nlin6.nii.gz")
+    )
+    assert status == 0
+    assert [(row["space"], row["wm_voxels"], row["pct_missing"]) for row in rows] == [
+        ("MNI152", "60", "0"),
+        ("MNI152NLin6Asym_res-02", "24", "0"),
+    ]
+    assert rows[1]["wm_median"] == "50"
+
+    shifted = nlin6_affine.copy()
+    shifted[0, 3] += 2.0
+    nib.save(nib.Nifti1Image(nlin6_mask, shifted), str(tmp_path / "wm-shifted.nii.gz"))
+    status, lines, rows = run("--nlin6asym-wm-mask", str(tmp_path / "wm-shifted.nii.gz"))
+    assert status == 1
+    assert any("FLAIR affine does not match the WM mask grid" in line for line in lines)
+
+
+def test_rf1_batch_runs_quoted_tool_lines_in_one_process(tmp_path: Path) -> None:
+    sublist = tmp_path / "subject list.txt"
+    sublist.write_text("sub-10001\n10002\n")
+    status_file = tmp_path / "status.tsv"
+    command = (
+        f'source "{CODE_DIR / "pipeline_common.sh"}"; '
+        "{ "
+        f'rf1_batch_line print-subjects "{sublist}"; '
+        "echo '# comment'; "
+        f'rf1_batch_line check-pipeline-state safe-child "{tmp_path}" /etc/passwd; '
+        "rf1_batch_line no-such-tool; "
+        "rf1_batch_line print-subjects --bogus; "
+        f'rf1_batch_line print-subjects "{sublist}"; '
+        f'}} | python3 "{CODE_DIR / "rf1.py"}" batch --status-file "{status_file}"'
+    )
+    result = subprocess.run(["bash", "-c", command], text=True, capture_output=True)
+    assert result.returncode == 2
+    assert result.stdout == "10001\n10002\n10001\n10002\n"
+    assert "Path is outside expected root" in result.stderr
+    assert "unknown tool 'no-such-tool'" in result.stderr
+    assert "usage: print_subjects.py" in result.stderr
+    statuses = [line.split("\t")[0] for line in status_file.read_text().splitlines()]
+    assert statuses == ["0", "1", "2", "2", "0"]
+
+    stopped = subprocess.run(
+        [sys.executable, str(CODE_DIR / "rf1.py"), "batch", "--stop-on-error"],
+        input=f"print-subjects --bogus\nprint-subjects {sublist.as_posix()!r}\n",
+        text=True,
+        capture_output=True,
+    )
+    assert stopped.returncode == 2 and stopped.stdout == ""
+
+    single = subprocess.run(
+        [sys.executable, str(CODE_DIR / "rf1.py"), "print-subjects", str(sublist)],
+        text=True,
+        capture_output=True,
+        check=True,
+    )
+    assert single.stdout == "10001\n10002\n"
+
+
+def test_schedule_jobs_expands_runs_and_skips_complete_outputs(tmp_path: Path) -> None:
+    import schedule_jobs
+
+    (tmp_path / "bids" / "sub-10001" / "ses-01").mkdir(parents=True)
+    (tmp_path / "bids" / "sub-10002" / "ses-02").mkdir(parents=True)
+    for path in tedana_expected_outputs(tmp_path / "derivatives", "10001", "01", "ugr", "1"):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.touch()
+
+    items, complete = schedule_jobs.expand_items("tedana", ["10001", "10002"], tmp_path, 2, 8000)
+    assert complete == ["sub-10001_ses-01_task-ugr_run-1"]
+    assert len(items) == 7 + 4
+    assert items[0].command[-4:] == ("10001", "01", "ugr", "2")
+    assert dict(items[0].env)["OMP_NUM_THREADS"] == "2"
+
+    reuse_file = tmp_path / "warpkit_reuse.tsv"
+    reuse_file.write_text("subject\tsession\ttask\trun\tsource_run\treason\n10001\t01\ttrust\t2\t1\tphase\n")
+    items, _ = schedule_jobs.expand_items("warpkit", ["10001"], tmp_path, 4, 6000, reuse_file=reuse_file)
+    assert [(item.key, item.after) for item in items if item.phase] == [
+        ("sub-10001_ses-01_task-trust_run-2", ("sub-10001_ses-01_task-trust_run-1",))
+    ]
+
+    items, _ = schedule_jobs.expand_items("mriqc", ["10001", "10002"], tmp_path, 8, 20480)
+    assert [item.key for item in items] == ["sub-10001_ses-01", "sub-10002_ses-02"]
+
+
+def test_scheduler_respects_budgets_retries_and_resumes(tmp_path: Path) -> None:
+    import schedule_jobs
+
+    running = tmp_path / "running"
+    running.mkdir()
+    # Each item records how many items were running when it started.
+    script = (
+        "import os, sys, time; from pathlib import Path; "
+        f"d = Path({str(running)!r}); me = d / sys.argv[1]; me.touch(); time.sleep(0.1); "
+        "(d.parent / f'seen-{os.getpid()}').write_text(str(len(list(d.iterdir())))); "
+        "time.sleep(0.1); me.unlink(); "
+        "flaky = d.parent / 'flaky'; "
+        "sys.exit(1 if sys.argv[1] == 'b' and not flaky.exists() and flaky.touch() is None else 0)"
+    )
+    items = [
+        schedule_jobs.WorkItem(key, (sys.executable, "-c", script, key), slots=2, mem_mb=1000)
+        for key in ("a", "b", "c", "d")
+    ]
+    items.append(
+        schedule_jobs.WorkItem("late", (sys.executable, "-c", "pass"), slots=1, mem_mb=1, phase=1)
+    )
+    state = tmp_path / "state.json"
+    out = io.StringIO()
+    telemetry = tmp_path / "rusage.jsonl"
+    scheduler = schedule_jobs.Scheduler(
+        items,
+        4,
+        3000,
+        state,
+        tmp_path / "logs",
+        retries=1,
+        poll_seconds=0.02,
+        stage="demo",
+        telemetry=telemetry,
+        batch="b1",
+        out=out,
+    )
+    assert scheduler.run() == 0
+    assert max(int(path.read_text()) for path in tmp_path.glob("seen-*")) == 2
+    assert "RETRY b (exit 1; attempt 1 of 2)" in out.getvalue()
+    assert out.getvalue().index("START late") > out.getvalue().index("DONE  d")
+    recorded = json.loads(state.read_text())["Items"]
+    assert recorded["b"]["attempts"] == 2 and recorded["late"]["status"] == "done"
+    usage = [json.loads(line) for line in telemetry.read_text().splitlines()]
+    assert sorted((record["item"], record["exit"]) for record in usage) == [
+        ("a", 0), ("b", 0), ("b", 1), ("c", 0), ("d", 0), ("late", 0)
+    ]
+    assert {(record["batch"], record["level"], record["stage"]) for record in usage} == {("b1", "item", "demo")}
+
+    resumed = schedule_jobs.Scheduler(items, 4, 3000, state, tmp_path / "logs", out=io.StringIO())
+    assert resumed.run() == 0
+    assert len(resumed.resumed) == 5 and not resumed.done
+
+    failing = [
+        schedule_jobs.WorkItem("bad", (sys.executable, "-c", "print('boom'); raise SystemExit(3)"), 1, 1)
+    ]
+    out = io.StringIO()
+    scheduler = schedule_jobs.Scheduler(
+        failing, 4, 3000, state, tmp_path / "logs", poll_seconds=0.02, out=out
+    )
+    assert scheduler.run() == 1
+    assert "FAILED bad (exit 3)" in out.getvalue() and "boom" in out.getvalue()
+    assert json.loads(state.read_text())["Items"]["bad"]["status"] == "failed"
+
+
+def test_scheduler_blocks_items_whose_prerequisite_failed(tmp_path: Path) -> None:
+    import schedule_jobs
+
+    marker = tmp_path / "reuse-ran"
+    items = [
+        schedule_jobs.WorkItem("source", (sys.executable, "-c", "raise SystemExit(2)"), 1, 1),
+        schedule_jobs.WorkItem("other", (sys.executable, "-c", "pass"), 1, 1),
+        schedule_jobs.WorkItem(
+            "reuse", (sys.executable, "-c", f"open({str(marker)!r}, 'w')"), 1, 1, phase=1, after=("source",)
+        ),
+        schedule_jobs.WorkItem("late", (sys.executable, "-c", "pass"), 1, 1, phase=1, after=("other",)),
+    ]
+    state = tmp_path / "state.json"
+    out = io.StringIO()
+    scheduler = schedule_jobs.Scheduler(items, 4, 3000, state, tmp_path / "logs", poll_seconds=0.02, out=out)
+    assert scheduler.run() == 1
+    assert not marker.exists()
+    assert "BLOCKED reuse (source failed)" in out.getvalue()
+    assert scheduler.blocked == ["reuse"] and sorted(scheduler.done) == ["late", "other"]
+    recorded = json.loads(state.read_text())["Items"]
+    assert recorded["reuse"] == {"status": "blocked", "attempts": 0, "after": "source"}
+
+
+def test_scheduler_terminates_children_and_keeps_state_on_sigterm(tmp_path: Path) -> None:
+    import schedule_jobs
+
+    started = tmp_path / "sleeper-started"
+    sleeper = f"import time; open({str(started)!r}, 'w'); time.sleep(30)"
+    killer = (
+        "import os, signal, time; from pathlib import Path; "
+        f"[time.sleep(0.02) for _ in range(500) if not Path({str(started)!r}).exists()]; "
+        "os.kill(os.getppid(), signal.SIGTERM)"
+    )
+    items = [
+        schedule_jobs.WorkItem("quick", (sys.executable, "-c", "pass"), 1, 1),
+        schedule_jobs.WorkItem("sleeper", (sys.executable, "-c", sleeper), 1, 1, phase=1),
+        schedule_jobs.WorkItem("killer", (sys.executable, "-c", killer), 1, 1, phase=1),
+    ]
+    state = tmp_path / "state.json"
+    out = io.StringIO()
+    scheduler = schedule_jobs.Scheduler(items, 4, 3000, state, tmp_path / "logs", poll_seconds=0.02, out=out)
+    handler = signal.getsignal(signal.SIGTERM)
+    begun = time.monotonic()
+    assert scheduler.run() == 143
+    assert time.monotonic() - begun < 20
+    assert "Terminated;" in out.getvalue()
+    assert all(job.process.returncode is not None for job in scheduler.running)
+    assert json.loads(state.read_text())["Items"]["quick"]["status"] == "done"
+    assert signal.getsignal(signal.SIGTERM) is handler
+
+
+def test_scheduler_interrupt_stops_the_children_an_item_launched(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    import schedule_jobs
+
+    monkeypatch.setattr(schedule_jobs, "TERMINATE_GRACE_SECONDS", 0.5)
+    pids = tmp_path / "pids"
+    # The wrapper shell backgrounds a sleep and a child that ignores SIGTERM.
+    stubborn = f"{sys.executable} -c 'import signal, time; signal.signal(signal.SIGTERM, signal.SIG_IGN); time.sleep(60)'"
+    wrapper = f"sleep 60 & echo $! >> {pids}; {stubborn} & echo $! >> {pids}; wait"
+    killer = (
+        "import os, signal, time\nfrom pathlib import Path\n"
+        f"p = Path({str(pids)!r})\n"
+        "while not p.exists() or len(p.read_text().split()) < 2:\n    time.sleep(0.02)\n"
+        "time.sleep(0.2)\nos.kill(os.getppid(), signal.SIGTERM)\n"
+    )
+    items = [
+        schedule_jobs.WorkItem("wrapper", ("sh", "-c", wrapper), 1, 1),
+        schedule_jobs.WorkItem("killer", (sys.executable, "-c", killer), 1, 1),
+    ]
+    scheduler = schedule_jobs.Scheduler(
+        items, 4, 3000, tmp_path / "state.json", tmp_path / "logs", poll_seconds=0.02, out=io.StringIO()
+    )
+    assert scheduler.run() == 143
+
+    def alive(pid: int) -> bool:
+        stat = Path(f"/proc/{pid}/stat")
+        try:
+            return stat.read_text().rsplit(")", 1)[1].split()[0] != "Z"
+        except FileNotFoundError:
+            return False
+
+    children = [int(pid) for pid in pids.read_text().split()]
+    assert len(children) == 2
+    deadline = time.monotonic() + 5
+    while any(map(alive, children)) and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert not any(map(alive, children))
+
+
+def test_tedana_runs_prefetch_echo_times_and_run_a_bounded_pool(
+    tmp_path: Path, capsys: pytest.CaptureFixture[str]
+) -> None:
+    import tedana_runs
+
+    subject = "10001"
+    func = tmp_path / "derivatives" / "fmriprep" / f"sub-{subject}" / "ses-01" / "func"
+    bidsfunc = tmp_path / "bids" / f"sub-{subject}" / "ses-01" / "func"
+    func.mkdir(parents=True)
+    bidsfunc.mkdir(parents=True)
+    for task, run in (("socialdoors", "1"), ("doors", "1"), ("trust", "1"), ("trust", "2")):
+        for echo in tedana_runs.ECHOES:
+            stem = f"sub-{subject}_ses-01_task-{task}_run-{run}_echo-{echo}_part-mag"
+            (func / f"{stem}_desc-preproc_bold.nii.gz").touch()
+            (bidsfunc / f"{stem}_bold.json").write_text(json.dumps({"EchoTime": 0.01 * echo}))
+    for path in tedana_expected_outputs(tmp_path / "derivatives", subject, "01", "ugr", "1"):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.touch()
+
+    running = tmp_path / "running"
+    running.mkdir()
+    # The fake TEDANA records its thread cap and how many runs overlapped it.
+    fake = tmp_path / "tedana"
+    fake.write_text(
+        f"#!{sys.executable}\n"
+        "import os, sys, time\nfrom pathlib import Path\n"
+        "args = sys.argv[1:]\nprefix = args[args.index('--prefix') + 1]\n"
+        "out = Path(args[args.index('--out-dir') + 1])\n"
+        f"running = Path({str(running)!r})\n"
+        "(running / prefix).touch(); time.sleep(0.2)\n"
+        "seen = len(list(running.iterdir())); (running / prefix).unlink()\n"
+        "print(prefix, os.environ['OMP_NUM_THREADS'], seen, args[args.index('-e') + 1:args.index('-e') + 5])\n"
+        "if 'trust_run-2' in prefix: sys.exit(4)\n"
+        "for suffix in ('desc-denoised_bold.nii.gz', 'desc-ICA_mixing.tsv', 'desc-tedana_metrics.tsv'):\n"
+        "    (out / f'{prefix}_{suffix}').touch()\n"
+    )
+    fake.chmod(0o755)
+
+    argv = ["--project-root", str(tmp_path), "--tedana-cmd", str(fake), "--threads", "2", "--slots", "4"]
+    assert tedana_runs.main([*argv, subject]) == 1
+    captured = capsys.readouterr()
+    assert "EXISTS (skipping): TEDANA sub-10001 ses-01 task-ugr run-1" in captured.out
+    assert "4 run(s), 2 at a time with 2 thread(s) each" in captured.out
+    assert captured.out.count("DONE: TEDANA") == 3
+    assert "TEDANA failed for sub-10001 ses-01 task-trust run-2 (exit 4)" in captured.err
+    logs = tmp_path / "logs"
+    assert sorted((logs / "missing-tedanaInput.log").read_text().splitlines()) == [
+        f"Missing TEDANA input for sub-10001 ses-01 task-{task} run-{run} echo-1"
+        for task, run in (("sharedreward", "1"), ("sharedreward", "2"), ("ugr", "2"))
+    ]
+    run_log = (logs / "runs" / "tedana" / "sub-10001_ses-01_task-doors_run-1.log").read_text()
+    assert run_log.split()[1] == "2"
+    assert "['0.01', '0.02', '0.03', '0.04']" in run_log
+    combined = (logs / "tedana_output.log").read_text().splitlines()
+    assert len(combined) == 4
+    assert max(int(line.split()[2]) for line in combined) == 2
+
+    assert tedana_runs.main([*argv, "--dry-run", subject, "01", "trust", "2"]) == 0
+    captured = capsys.readouterr()
+    assert "EXISTS" not in captured.out and captured.out.count("TEDANA command:") == 1
+    assert "--prefix sub-10001_ses-01_task-trust_run-2" in captured.out
+
+
+def write_nifti_header(path: Path, shape: tuple[int, ...]) -> None:
+    import gzip
+    import struct
+
+    header = bytearray(352)
+    struct.pack_into("<i", header, 0, 348)
+    struct.pack_into("<8h", header, 40, len(shape), *shape, *([1] * (7 - len(shape))))
+    header[344:348] = b"n+1\0"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with gzip.open(path, "wb") as handle:
+        handle.write(bytes(header))
+
+
+def test_fmriprep_resources_sizes_subjects_from_inventory_and_refits(
+    tmp_path: Path, capsys: pytest.CaptureFixture[str]
+) -> None:
+    import fmriprep_resources
+
+    func = tmp_path / "bids" / "sub-10001" / "ses-01" / "func"
+    for task in ("ugr", "trust"):
+        for echo in range(1, 5):
+            name = f"sub-10001_ses-01_task-{task}_run-1_echo-{echo}_part-mag_bold.nii.gz"
+            write_nifti_header(func / name, (4, 4, 2, 300))
+    light_func = tmp_path / "bids" / "sub-10002" / "ses-01" / "func"
+    write_nifti_header(light_func / "sub-10002_ses-01_task-ugr_run-1_echo-1_part-mag_bold.nii.gz", (4, 4, 2, 100))
+    (tmp_path / "derivatives" / "freesurfer" / "sub-10002" / "scripts").mkdir(parents=True)
+    (tmp_path / "derivatives" / "freesurfer" / "sub-10002" / "scripts" / "recon-all.done").touch()
+
+    heavy = fmriprep_resources.subject_inventory(tmp_path / "bids", tmp_path / "derivatives", "10001")
+    light = fmriprep_resources.subject_inventory(tmp_path / "bids", tmp_path / "derivatives", "10002")
+    assert (heavy.bold_runs, heavy.echo_images, heavy.echo_volumes) == (2, 8, 2400)
+    assert heavy.freesurfer_missing
+    assert (light.bold_runs, light.echo_volumes, light.freesurfer_missing) == (1, 100, False)
+
+    model = fmriprep_resources.DEFAULT_MODEL
+    plans = fmriprep_resources.plan_subjects([light, heavy], model, 96, 196000, 2, 8)
+    assert [plan.inventory.subject for plan in plans] == ["10001", "10002"]
+    assert plans[0].nprocs > 48 > plans[1].nprocs >= fmriprep_resources.MIN_NPROCS
+    assert plans[0].mem_mb > plans[1].mem_mb == fmriprep_resources.MIN_MEM_MB
+    fixed = fmriprep_resources.plan_subjects([light, heavy], model, 96, 196000, 2, 8, 2, 4000)
+    assert {(plan.nprocs, plan.omp_nthreads, plan.mem_mb) for plan in fixed} == {(2, 2, 4000)}
+
+    observations = [
+        {
+            "echo_volumes": volumes,
+            "freesurfer_missing": missing,
+            "runtime_s": 1000 + 2 * volumes + 5000 * missing,
+            "peak_rss_mb": "",
+        }
+        for volumes, missing in [(100, 0), (500, 1), (900, 0), (1300, 1), (2000, 0)]
+    ]
+    fitted = fmriprep_resources.fit_model(observations)
+    assert [round(value, 6) for value in fitted["runtime_s"]] == [1000, 2, 5000]
+    assert fitted["peak_rss_mb"] == model["peak_rss_mb"]
+
+    state = {
+        "sub-10001": {"status": "done", "seconds": 7200.0, "peak_rss_mb": 15000},
+        "sub-10002": {"status": "done", "seconds": 5.0},
+    }
+    rows = fmriprep_resources.observation_rows(plans, state, {"10001"}, {"sub-10001", "sub-10002"})
+    # A subject left "done" by an interrupted batch was not run by this one.
+    resumed = fmriprep_resources.observation_rows(plans, state, {"10001", "10002"}, {"sub-10001"})
+    assert [row["subject"] for row in resumed] == ["10001"]
+    table = tmp_path / "logs" / "fmriprep_resources.tsv"
+    fmriprep_resources.append_observations(table, rows)
+    fmriprep_resources.append_observations(table, rows)
+    recorded = fmriprep_resources.read_observations(table)
+    assert [(row["subject"], row["runtime_s"], row["peak_rss_mb"]) for row in recorded] == [
+        ("10001", "7200.0", "15000")
+    ] * 2
+
+    sublist = tmp_path / "subjects.txt"
+    sublist.write_text("10001\n10002\n")
+    assert fmriprep_resources.main(["plan", "--sublist", str(sublist), "--project-root", str(tmp_path)]) == 0
+    output = capsys.readouterr().out
+    assert "Cost model: defaults" in output
+    assert output.index("sub-10001\t2\t8\t2400\ttodo") < output.index("sub-10002\t1\t1\t100\tdone")
+
+
+def test_telemetry_records_rusage_and_flags_regressions(tmp_path: Path) -> None:
+    import telemetry
+
+    path = tmp_path / "rusage.jsonl"
+    result = subprocess.run(
+        [
+            sys.executable,
+            str(CODE_DIR / "telemetry.py"),
+            "--telemetry",
+            str(path),
+            "exec",
+            "--stage",
+            "demo",
+            "--batch",
+            "b0",
+            "--item",
+            "sub-10001_ses-01_task-ugr_run-2",
+            "--",
+            sys.executable,
+            "-c",
+            "import sys; data = bytearray(64 * 2**20); sys.exit(3)",
+        ],
+        text=True,
+        capture_output=True,
+    )
+    assert result.returncode == 3
+    assert result.stderr.startswith("RESOURCES[command]: wall ")
+    (record,) = telemetry.read_records(path)
+    assert (record["batch"], record["stage"], record["exit"]) == ("b0", "demo", 3)
+    assert (record["subject"], record["session"], record["task"], record["run"]) == ("10001", "01", "ugr", "2")
+    assert record["max_rss_mb"] >= 64
+
+
+    def item(batch: str, started: str, subject: str, wall: float, rss: float) -> dict:
+        return {
+            "batch": batch,
+            "started": started,
+            "level": "item",
+            "stage": "tedana",
+            "subject": subject,
+            "wall_s": wall,
+            "user_s": wall / 2,
+            "sys_s": 0.0,
+            "max_rss_mb": rss,
+            "exit": 0,
+        }
+
+    records = [
+        item("b2", "2026-02-01T00:00:00", "10001", 100.0, 1000.0),
+        item("b1", "2026-01-01T00:00:00", "10001", 100.0, 1000.0),
+        item("b1", "2026-01-01T00:00:05", "10002", 90.0, 1000.0),
+        item("b3", "2026-03-01T00:00:00", "10001", 140.0, 1100.0),
+        item("b3", "2026-03-01T00:00:00", "10002", 95.0, 1000.0),
+    ]
+    for record in records:
+        record["cpu_s"] = record["user_s"] + record["sys_s"]
+    rows = {row["subject"]: row for row in telemetry.report_rows(records, by="subject")}
+    assert rows["10001"]["batch"] == "b3" and rows["10001"]["baseline_n"] == 2
+    assert rows["10001"]["wall_s_ratio"] == pytest.approx(1.4)
+    assert rows["10001"]["regressions"] == "wall_s;cpu_s"
+    assert rows["10002"]["regressions"] == ""
+    (stage,) = telemetry.report_rows(records, by="stage", batch="b2")
+    assert (stage["n"], stage["baseline_n"], stage["regressions"]) == (1, 2, "")
+
+def test_run_logged_takes_each_resources_line_from_its_own_level(tmp_path: Path) -> None:
+    code = tmp_path / "code"
+    code.mkdir()
+    for name in ("run_logged.sh", "pipeline_common.sh", "telemetry.py", "pipeline_utils.py"):
+        shutil.copy(CODE_DIR / name, code / name)
+    env = {**os.environ, "RF1_TELEMETRY_FILE": str(tmp_path / "rusage.jsonl")}
+
+    def record(label: str, *command: str) -> str:
+        subprocess.run(
+            ["bash", str(code / "run_logged.sh"), "--label", label, "--", *command],
+            env=env,
+            capture_output=True,
+            text=True,
+        )
+        (path,) = (tmp_path / "logs" / "records").glob(f"*_{label}.md")
+        return path.read_text()
+
+    # The wrapped command's own RESOURCES output must not stand in for ours.
+    nested = record(
+        "nested",
+        sys.executable,
+        "-c",
+        "for level in (': ', '[command]: ', '[check]: '): print(f'RESOURCES{level}nested')",
+        "--check",
+        sys.executable,
+        "-c",
+        "pass",
+    )
+    assert "- Command resources: wall " in nested and "- Check resources: wall " in nested
+    assert "nested" not in nested.split("## Command")[0].split("- Summary")[1]
+
+    # A command that cannot start prints no summary; the skipped check has none either.
+    missing = record("missing", str(tmp_path / "no-such-tool"), "--check", sys.executable, "-c", "pass")
+    assert "- Command exit: 127" in missing
+    assert "resources:" not in missing
@@ -187,6 +187,64 @@ def test_mriqc_index_uses_only_echo2_part_mag(tmp_path: Path) -> None:
     assert len(next(iter(index.values()))) == 1
 
 
+def test_mriqc_iqm_table_is_typed_incremental_and_read_by_run_qc(
+    tmp_path: Path,
+) -> None:
+    import mriqc_iqms
+
+    mriqc = tmp_path / "mriqc"
+    table = tmp_path / "iqms"
+    anat = mriqc / "sub-10001" / "ses-01" / "anat"
+    func = mriqc / "sub-10001" / "ses-01" / "func"
+    anat.mkdir(parents=True)
+    func.mkdir(parents=True)
+    (anat / "sub-10001_ses-01_T2w.json").write_text(
+        json.dumps({"cjv": 0.5, "size_x": 176, "bids_meta": {"EchoTime": 0.1}})
+    )
+    bold = func / "sub-10001_ses-01_task-trust_run-1_echo-2_part-mag_bold.json"
+    bold.write_text('{"tsnr": 42.5, "fd_mean": NaN, "dummy_trs": null}')
+    (func / "broken_bold.json").write_text("{")
+
+    files, counts = mriqc_iqms.update_index(mriqc, table)
+    assert counts == {"parsed": 3, "current": 0, "removed": 0, "invalid": 1}
+    t2w = mriqc_iqms.read_table(table, "T2w")
+    assert t2w["subject"] == ["10001"] and t2w["size_x"] == [176]
+    assert t2w["cjv"] == [0.5] and "bids_meta" not in t2w
+    bold_table = mriqc_iqms.read_table(table, "bold")
+    assert bold_table["echo"] == ["2"] and bold_table["dummy_trs"] == [None]
+    assert np.isnan(bold_table["fd_mean"][0])
+    assert mriqc_iqms.export_rows(table, "T2w", ["cjv", "cnr"], "01") == [
+        {"subject": "sub-10001", "cjv": 0.5, "cnr": None}
+    ]
+
+    (anat / "sub-10001_ses-01_T2w.json").unlink()
+    _, counts = mriqc_iqms.update_index(mriqc, table)
+    assert counts == {"parsed": 0, "current": 2, "removed": 1, "invalid": 1}
+    assert not (table / "iqms_T2w.tsv").exists()
+
+    # A table lost after its index was written is rebuilt on the next update.
+    (table / "iqms_bold.tsv").unlink()
+    _, counts = mriqc_iqms.update_index(mriqc, table)
+    assert counts == {"parsed": 0, "current": 2, "removed": 0, "invalid": 1}
+    assert mriqc_iqms.read_table(table, "bold")["tsnr"] == [42.5]
+    assert not list(table.glob(".iqms_*"))
+
+    index = mriqc_iqms.read_index(table)
+    key = "sub-10001/ses-01/func/" + bold.name
+    index[key]["iqms"]["tsnr"] = 50.0
+
+    def read(path: Path) -> dict:
+        return mriqc_iqms.read_iqms(path, mriqc, index)
+
+    assert qc.extract_mriqc([bold], read)[0]["tsnr"] == 50.0
+    assert qc.extract_mriqc([func / "broken_bold.json"], read)[1] == [
+        "tsnr:invalid_mriqc_json",
+        "fd_mean:invalid_mriqc_json",
+    ]
+    bold.write_text('{"tsnr": 43.0, "fd_mean": 0.2}')
+    assert qc.extract_mriqc([bold], read)[0] == {"tsnr": 43.0, "fd_mean": 0.2}
+
+
 def test_tedana_final_classification_counts(tmp_path: Path) -> None:
     source = tmp_path / "metrics.tsv"
     source.write_text(
@@ -228,6 +286,27 @@ def test_coverage_resamples_target_to_run_mask_grid(tmp_path: Path) -> None:
     assert qc.compute_coverage(target, run) == 100.0
 
 
+def test_icv_streamed_probseg_sum_matches_full_volume_sum(tmp_path: Path) -> None:
+    import extract_icv_fmriprep as icv  # noqa: PLC0415
+
+    rng = np.random.default_rng(7)
+    volumes = [rng.random((9, 8, 11)).astype(np.float32) for _ in range(3)]
+    paths = []
+    for label, data in zip(("GM", "WM", "CSF"), volumes):
+        path = tmp_path / "sub-10001" / "anat" / f"sub-10001_label-{label}_probseg.nii.gz"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        nib.save(nib.Nifti1Image(data, np.diag([2.0, 2.0, 2.5, 1.0])), path)
+        paths.append(path)
+
+    expected = float(np.sum(volumes[0] + volumes[1] + volumes[2])) * 10.0 / 1000.0
+    for slab_slices in (1, 4, 11, 64):
+        assert icv.compute_from_probsegs(*paths, slab_slices=slab_slices) == pytest.approx(
+            expected, rel=1e-6
+        )
+    row = icv.probseg_row({"gm": paths[0], "wm": paths[1], "csf": tmp_path / "missing.nii.gz"})
+    assert row["method"] == "GM+WM+CSF_probseg (FAILED)"
+
+
 def make_upstream_run(project: Path, subject: str, task: str, value: float) -> None:
     prefix = f"sub-{subject}_ses-01_task-{task}_run-1"
     bids = project / "bids" / f"sub-{subject}" / "ses-01" / "func"